@@ -0,0 +1,51 @@
+""" testing the benchmark harness """
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from radis import SpectrumFactory
+from src.helpers.lineStore import LineStoreRegistry
+from src.helpers.timing import span
+from benchmarks.linelists import build_local_line_stores, offline_databanks
+from benchmarks.run import run_case, compare
+
+
+def test_run_case_and_compare():
+    """
+    testing that a case is timed without its setup, with its phases, and compared to a baseline
+    """
+    setups = []
+
+    def run(state):
+        with span("eq_spectrum"):
+            pass
+        return {"points": state}
+
+    # cases.py is only imported by the runner, once the benchmark environment is set
+    case = SimpleNamespace(name="fake", description="A fake benchmark", setup=lambda: setups.append(1) or 10, run=run)
+    result = run_case(case, repeat=3, warmup=1)
+
+    assert len(setups) == 4 and len(result["times"]) == 3
+    assert result["sizes"] == {"points": 10}
+    assert set(result["phases"]) == {"eq_spectrum"}
+
+    results = {"benchmarks": {"fake": {**result, "median": 1.5}, "new": {**result, "median": 1.0}}}
+    baseline = {"benchmarks": {"fake": {"median": 1.0}}}
+    comparison = compare(results, baseline, threshold=0.2)
+    assert list(comparison) == ["fake"]
+    assert comparison["fake"]["ratio"] == 1.5 and comparison["fake"]["regression"] is True
+    assert compare(results, baseline, threshold=0.6)["fake"]["regression"] is False
+
+
+def test_offline_databanks(tmp_path):
+    """
+    testing that SpectrumFactory loads the local line lists, and refuses ranges they do not cover
+    """
+    build_local_line_stores(str(tmp_path), synthetic_lines=0)
+    with patch("benchmarks.linelists.line_stores", LineStoreRegistry(str(tmp_path))), offline_databanks():
+        sf = SpectrumFactory(wmin=2100, wmax=2110, wunit="cm-1", molecule="CO", isotope="1", verbose=0)
+        sf.fetch_databank("hitran")
+        assert len(sf.df0) > 0 and sf.df0.wav.between(2100, 2110).all()
+
+        sf = SpectrumFactory(wmin=2200, wmax=2400, wunit="cm-1", molecule="CO", isotope="1", verbose=0)
+        with pytest.raises(ValueError, match="No local hitran lines of CO"):
+            sf.fetch_databank("hitran")
@@ -0,0 +1,71 @@
+""" testing the load-test harness """
+import json
+import random
+import asyncio
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from benchmarks.loadtest import DEFAULT_MIX, load_mix, render_payload, parse_metrics, run_load
+
+METRICS = """# TYPE process_resident_memory_bytes gauge
+process_resident_memory_bytes 2e+08
+radis_worker_resident_memory_bytes{pid="12"} 3e+08
+radis_worker_resident_memory_bytes{pid="13"} 4e+08
+radis_executor_queue_depth 2
+"""
+
+
+def fake_server():
+    """An app answering the calculations with an error when tgas > 2000, and fixed metrics"""
+    app = FastAPI()
+
+    @app.post("/calculate-spectrum")
+    async def calculate(request: Request):
+        payload = await request.json()
+        if payload["tgas"] > 2000:
+            return JSONResponse({"error": "too hot"})
+        return {"data": payload["species"][0]["mole_fraction"]}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(METRICS)
+
+    return app
+
+
+def test_mix_and_variations(tmp_path):
+    """
+    testing the mix defaults and that variations are drawn in their range, reproducibly
+    """
+    path = tmp_path / "mix.jsonl"
+    entry = {"path": "/calculate-spectrum", "payload": {"tgas": 300, "species": [{"mole_fraction": 0.1}]},
+             "vary": {"tgas": [1000, 3000], "species.0.mole_fraction": [0.2, 0.3]}}
+    path.write_text(json.dumps(entry) + "\n")
+    entries = load_mix(str(path))
+
+    assert entries[0]["name"] == "/calculate-spectrum" and entries[0]["weight"] == 1
+    payload = render_payload(entries[0], random.Random(1))
+    assert 1000 <= payload["tgas"] <= 3000 and 0.2 <= payload["species"][0]["mole_fraction"] <= 0.3
+    assert payload == render_payload(entries[0], random.Random(1))
+    assert entries[0]["payload"]["tgas"] == 300
+    assert all(entry["payload"]["database"] == "synthetic" for entry in load_mix(DEFAULT_MIX))
+
+
+def test_run_load(tmp_path):
+    """
+    testing the request count, error rate, percentiles and peak memory of a load test
+    """
+    path = tmp_path / "mix.json"
+    path.write_text(json.dumps([{"name": "calc", "path": "/calculate-spectrum",
+                                 "payload": {"tgas": 300, "species": [{"mole_fraction": 0.1}]},
+                                 "vary": {"tgas": [1000, 3000]}}]))
+    transport = httpx.ASGITransport(app=fake_server())
+    summary = asyncio.run(run_load("http://test", load_mix(str(path)), concurrency=3, max_requests=40,
+                                   transport=transport))
+
+    assert summary["requests"] == 40 and summary["by_name"]["calc"]["requests"] == 40
+    assert 0 < summary["errors"] < 40 and summary["errors_by_kind"] == {"error: too hot": summary["errors"]}
+    assert summary["latency"]["p50"] <= summary["latency"]["p95"] <= summary["latency"]["p99"] <= summary["latency"]["max"]
+    assert summary["peak_memory_bytes"] == {"server": 2e8, "worker_max": 4e8, "total": 9e8}
+    assert summary["peak_queue_depth"] == 2
+    assert parse_metrics("radis_executor_queue_depth 0\n")["workers"] == []
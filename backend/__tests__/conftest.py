@@ -0,0 +1,4 @@
+import os
+
+# run the radis work in threads during tests so `unittest.mock.patch` applies to it
+os.environ.setdefault("EXECUTOR_KIND", "thread")
@@ -0,0 +1,122 @@
+""" testing calculateBatch.py """
+import json
+import struct
+from unittest.mock import patch, MagicMock
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from fastapi.testclient import TestClient
+from radis.misc.warning import EmptyDatabaseError
+from src.main import app
+from src.models.payload import calcPayload
+from src.helpers.batch import batch_chunks
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_calculate_spectrum(payload, slit_unit=None):
+    """A 5-point spectrum whose values are the gas temperature, fails at 999 K"""
+    if payload.tgas == 999:
+        raise EmptyDatabaseError("Empty DB")
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), np.full(5, payload.tgas))
+    return mock_spectrum
+
+
+def batch_payload(temperatures):
+    return {
+        "payloads": [
+            {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm", "tgas": tgas}
+            for tgas in temperatures
+        ]
+    }
+
+
+def test_batch_chunks_group_by_range():
+    """
+    testing that payloads are grouped by range and spread over the workers
+    """
+    payloads = [calcPayload(**{**payload_data, "tgas": 300 + i}) for i in range(8)]
+    payloads.append(calcPayload(**{**payload_data, "max_wavenumber_range": 2400}))
+    chunks = batch_chunks(payloads, max_workers=2)
+    assert sorted(len(chunk) for chunk in chunks) == [1, 4, 4]
+    assert sorted(index for chunk in chunks for index, _ in chunk) == list(range(9))
+    assert [index for index, _ in chunks[-1]] == [8]
+
+
+@patch("src.helpers.batch.calculate_spectrum", fake_calculate_spectrum)
+def test_batch_ndjson():
+    """
+    testing /calculate-spectrum/batch streaming NDJSON, with one failing payload
+    """
+    temperatures = [300, 400, 999, 500]
+    response = client.post("/calculate-spectrum/batch", json=batch_payload(temperatures))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = {item["index"]: item for item in map(json.loads, response.text.splitlines())}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[2] == {"index": 2, "error": "No line in the specified wavenumber range"}
+    assert results[3]["data"]["y"] == [500.0] * 5
+
+
+@patch("src.helpers.batch.calculate_spectrum", fake_calculate_spectrum)
+def test_batch_multipart():
+    """
+    testing /calculate-spectrum/batch as multipart/mixed raw binary parts
+    """
+    response = client.post(
+        "/calculate-spectrum/batch",
+        json=batch_payload([300, 400]),
+        headers={"Accept": "multipart/mixed; dtype=float32"},
+    )
+
+    assert response.status_code == 200
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/mixed; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    parts = response.content.split(b"--" + boundary)[1:-1]
+    assert len(parts) == 2
+    for part in parts:
+        head, body = part.split(b"\r\n\r\n", 1)
+        body = body[:-2]
+        header_length = struct.unpack("<I", body[:4])[0]
+        header = json.loads(body[4:4 + header_length])
+        y = next(array for array in header["arrays"] if array["name"] == "y")
+        assert y["dtype"] == "<f4"
+        assert b"X-Batch-Index" in head
+
+
+def test_batch_executor_failure():
+    """
+    testing that payloads of a chunk whose worker call fails still get one error result each
+    """
+    async def run_retrying(fn, items, options, retry_delay):
+        if any(payload.tgas == 400 for _, payload in items):
+            raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+        return fn(items, options)
+
+    temperatures = [300, 300, 400, 400, 400]
+    payloads = [
+        {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm", "tgas": tgas,
+         "max_wavenumber_range": 2010 if tgas == 400 else 2020}
+        for tgas in temperatures
+    ]
+    with patch("src.helpers.batch.calculate_spectrum", fake_calculate_spectrum), \
+            patch("src.routes.calculateBatch.spectrum_executor.run_retrying", run_retrying):
+        response = client.post("/calculate-spectrum/batch", json={"payloads": payloads})
+        multipart = client.post(
+            "/calculate-spectrum/batch", json={"payloads": payloads}, headers={"Accept": "multipart/mixed"}
+        )
+
+    assert response.status_code == 200
+    results = sorted(map(json.loads, response.text.splitlines()), key=lambda item: item["index"])
+    assert [item["index"] for item in results] == [0, 1, 2, 3, 4]
+    assert "data" in results[0] and "data" in results[1]
+    assert all("terminated abruptly" in item["error"] for item in results[2:])
+    boundary = multipart.headers["content-type"].split("boundary=")[1]
+    assert multipart.text.count(f"--{boundary}\r\n") == 5
+    assert multipart.text.endswith(f"--{boundary}--\r\n")
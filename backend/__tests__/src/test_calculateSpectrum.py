@@ -1,9 +1,15 @@
 """ testing calculateSpectrum.py """
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
+import io
+import json
+import struct
 import numpy as np
+import pytest
 from radis.misc.warning import EmptyDatabaseError
 from src.main import app
+from src.models.payload import calcPayload
+from src.helpers.calculateSpectrum import _shard_windows, _load_factory
 from __tests__.helpers.payload_data import payload_data
 
 client = TestClient(app)
@@ -90,3 +96,358 @@ def test_calc_spectrum_large_payload(mock_calc):
 
     assert "x" in result and "y" in result and "units" in result
     assert len(result["x"]) < 10000
+
+
+@patch("src.routes.calculateSpectrum.spectrum_executor.in_flight", 10**6)
+def test_calc_spectrum_executor_busy():
+    """
+    testing /calculate-spectrum endpoint when the executor queue is full
+    """
+    response = client.post("/calculate-spectrum", json=payload_data)
+    assert response.status_code == 503
+    assert "error" in response.json()
+
+
+def mock_small_spectrum(mock_calc):
+    """Configure the mocked calculate_spectrum to return a 5 point spectrum"""
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), np.arange(5.0))
+    mock_calc.return_value = mock_spectrum
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_raw_binary(mock_calc):
+    """
+    testing /calculate-spectrum endpoint with Accept: application/octet-stream
+    """
+    mock_small_spectrum(mock_calc)
+    payload = {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm"}
+
+    response = client.post(
+        "/calculate-spectrum",
+        json=payload,
+        headers={"Accept": "application/octet-stream; dtype=float32"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    body = response.content
+    (header_length,) = struct.unpack("<I", body[:4])
+    header = json.loads(body[4:4 + header_length])
+    assert header["meta"]["units"] == "default"
+    arrays = {}
+    for array in header["arrays"]:
+        start = 4 + header_length + array["offset"]
+        arrays[array["name"]] = np.frombuffer(body, dtype=array["dtype"], count=array["shape"][0], offset=start)
+    np.testing.assert_allclose(arrays["y"], np.arange(5.0))
+    np.testing.assert_allclose(arrays["x"], np.linspace(2000, 2000.4, 5), rtol=1e-6)
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_npy(mock_calc):
+    """
+    testing /calculate-spectrum endpoint with Accept: application/x-npy
+    """
+    mock_small_spectrum(mock_calc)
+    payload = {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm"}
+
+    response = client.post("/calculate-spectrum", json=payload, headers={"Accept": "application/x-npy"})
+    assert response.status_code == 200
+    stacked = np.load(io.BytesIO(response.content))
+    assert stacked.shape == (2, 5)
+    assert json.loads(response.headers["x-spectrum-meta"])["arrays"] == ["x", "y"]
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_implicit_x(mock_calc):
+    """
+    testing /calculate-spectrum endpoint with a uniform grid sent as {x0, dx, n}
+    """
+    mock_small_spectrum(mock_calc)
+    payload = {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm"}
+
+    response = client.post("/calculate-spectrum", json=payload, params={"implicit_x": True})
+    assert response.status_code == 200
+    result = response.json()["data"]
+    assert "x" not in result
+    assert result["x0"] == 2000
+    assert abs(result["dx"] - 0.1) < 1e-9
+    assert result["n"] == 5
+    assert len(result["y"]) == 5
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_implicit_x_falls_back_in_nm(mock_calc):
+    """
+    testing that the non-uniform nm axis is still sent as an array
+    """
+    mock_small_spectrum(mock_calc)
+    payload = {**payload_data, "mode": "absorbance", "wavelength_units": "u.nm"}
+
+    response = client.post("/calculate-spectrum", json=payload, params={"implicit_x": True})
+    assert response.status_code == 200
+    result = response.json()["data"]
+    assert len(result["x"]) == 5
+    assert "x0" not in result
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_points_keeps_peaks(mock_calc):
+    """
+    testing /calculate-spectrum endpoint downsampling to a target number of points
+    """
+    x = np.linspace(2000, 2100, 100000)
+    y = np.zeros_like(x)
+    y[12345] = 1.0  # a single-point absorption line
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = len(x)
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (x, y)
+    mock_calc.return_value = mock_spectrum
+    payload = {**payload_data, "mode": "absorbance", "wavelength_units": "1/u.cm"}
+
+    for method in ("minmax", "lttb"):
+        response = client.post(
+            "/calculate-spectrum", json=payload, params={"points": 200, "downsample": method}
+        )
+        assert response.status_code == 200
+        result = response.json()["data"]
+        assert len(result["x"]) <= 204
+        assert max(result["y"]) == 1.0
+
+
+@patch("src.helpers.calculateSpectrum.SPECTRUM_SHARD_WIDTH", 1000)
+def test_shard_windows_cover_range_with_overlap():
+    """
+    testing that range shards tile the window on a common grid, with overlap
+    """
+    payload = calcPayload(**{
+        **payload_data,
+        "wavelength_units": "1/u.cm",
+        "min_wavenumber_range": 500,
+        "max_wavenumber_range": 4000.005,
+    })
+    shards = _shard_windows(payload)
+    assert len(shards) == 4
+    assert shards[0].core_min == 500 and shards[-1].core_max == 4000.005
+    for shard, next_shard in zip(shards, shards[1:]):
+        assert shard.core_max == next_shard.core_min
+        assert abs(round(shard.core_max / 0.01) * 0.01 - shard.core_max) < 1e-9
+    for shard in shards:
+        assert shard.calc_min >= 500 - 1e-9 and shard.calc_max <= 4000.01 + 1e-9
+        assert shard.calc_min <= max(shard.core_min - 50, 500) + 1e-9
+        assert shard.calc_max >= min(shard.core_max + 50, 4000.005)
+
+
+@patch("src.helpers.calculateSpectrum.SPECTRUM_SHARD_WIDTH", 1000)
+def test_shard_windows_narrow_range():
+    """
+    testing that windows narrower than the shard width are not split
+    """
+    payload = calcPayload(**payload_data)
+    assert _shard_windows(payload) == []
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calc_spectrum_several_modes(mock_calc):
+    """
+    testing /calculate-spectrum with a list of modes sharing one x axis
+    """
+    x = np.linspace(2000, 2000.4, 5)
+    convolved = np.array([np.nan, 0.2, 0.3, 0.4, np.nan])
+    quantities = {"absorbance": np.arange(5.0), "transmittance": convolved}
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "", "transmittance": ""}
+    mock_spectrum.get.side_effect = lambda mode, **kwargs: (x, quantities[mode])
+    mock_calc.return_value = mock_spectrum
+    payload = {
+        **payload_data,
+        "wavelength_units": "1/u.cm",
+        "modes": ["absorbance", "transmittance"],
+    }
+
+    response = client.post("/calculate-spectrum", json=payload)
+    assert response.status_code == 200
+    result = response.json()["data"]
+    np.testing.assert_allclose(result["x"], [2000.1, 2000.2, 2000.3])
+    assert result["y"]["absorbance"] == [1.0, 2.0, 3.0]
+    assert result["y"]["transmittance"] == [0.2, 0.3, 0.4]
+    assert result["units"] == {"absorbance": "", "transmittance": ""}
+
+    npy = client.post("/calculate-spectrum", json=payload, headers={"Accept": "application/x-npy"})
+    assert np.load(io.BytesIO(npy.content)).shape == (3, 3)
+    assert json.loads(npy.headers["x-spectrum-meta"])["arrays"] == ["x", "y.absorbance", "y.transmittance"]
+
+
+@pytest.mark.parametrize("parallelism", [2, 1])
+def test_compute_spectrum_sharded(tmp_path, monkeypatch, parallelism):
+    """
+    testing that a sharded calculation, in parallel or not, gives the unsharded spectrum, for windows in cm-1 and in nm
+    """
+    from src.helpers.lineStore import LineStoreRegistry
+    from src.helpers.syntheticLines import build_synthetic_line_store
+    from src.helpers.calculateSpectrum import compute_spectrum, _shutdown_species_executor
+    from src.helpers.factoryPool import factory_pool
+
+    build_synthetic_line_store("CO", 20000, 1900, 2400, directory=str(tmp_path))
+    # the spawned shard workers read the line stores from their environment
+    monkeypatch.setenv("LINE_STORE_DIRECTORY", str(tmp_path))
+    windows = {"1/u.cm": (2000, 2300), "u.nm": (1e7 / 2300, 1e7 / 2000)}
+    _shutdown_species_executor()
+    try:
+        with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True), \
+                patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))), \
+                patch("src.helpers.calculateSpectrum.SPECTRUM_SHARD_WIDTH", 100):
+            for units, (wmin, wmax) in windows.items():
+                payload = calcPayload(**{
+                    **payload_data,
+                    "database": "synthetic",
+                    "use_simulate_slit": False,
+                    "wavelength_units": units,
+                    "min_wavenumber_range": wmin,
+                    "max_wavenumber_range": wmax,
+                })
+                with patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", parallelism):
+                    sharded = compute_spectrum(payload)
+                with patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 1), \
+                        patch("src.helpers.calculateSpectrum.SPECTRUM_SHARD_WIDTH", 0):
+                    unsharded = compute_spectrum(payload, wstep=0.01)
+                w, absorbance = sharded.get("absorbance", wunit="cm-1")
+                w_ref, absorbance_ref = unsharded.get("absorbance", wunit="cm-1")
+                assert w[0] == pytest.approx(2000) and w[-1] == pytest.approx(2300)
+                # the grids differ in nm, where radis places the unsharded one: compare the band areas
+                common = (w >= max(w[0], w_ref[0])) & (w <= min(w[-1], w_ref[-1]))
+                common_ref = (w_ref >= max(w[0], w_ref[0])) & (w_ref <= min(w[-1], w_ref[-1]))
+                assert np.trapz(absorbance[common], w[common]) == pytest.approx(
+                    np.trapz(absorbance_ref[common_ref], w_ref[common_ref]), rel=1e-3)
+                if units == "1/u.cm":
+                    # radis may add a last grid point past the window
+                    absorbance_ref = absorbance_ref[: len(w)]
+                    np.testing.assert_allclose(w_ref[: len(w)], w)
+                    np.testing.assert_allclose(absorbance, absorbance_ref, rtol=1e-3, atol=1e-6 * absorbance_ref.max())
+    finally:
+        _shutdown_species_executor()
+        factory_pool.clear()
+
+
+def test_compute_spectrum_in_pooled_window(tmp_path):
+    """
+    testing that a window inside a pooled one gives the spectrum of a factory loaded on it
+    """
+    from src.helpers.lineStore import LineStoreRegistry
+    from src.helpers.syntheticLines import build_synthetic_line_store
+    from src.helpers.calculateSpectrum import compute_spectrum
+    from src.helpers.factoryPool import factory_pool
+
+    build_synthetic_line_store("CO", 20000, 1900, 2400, directory=str(tmp_path))
+    factory_pool.clear()
+    try:
+        with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True), \
+                patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))), \
+                patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 1):
+            wide, narrow = [calcPayload(**{
+                **payload_data,
+                "database": "synthetic",
+                "use_simulate_slit": False,
+                "min_wavenumber_range": wmin,
+                "max_wavenumber_range": wmax,
+            }) for wmin, wmax in [(2000, 2300), (2100, 2150)]]
+            compute_spectrum(wide)
+            derived = compute_spectrum(narrow)
+            assert factory_pool.stats()["factories"] == 2
+            factory_pool.clear()
+            fresh = compute_spectrum(narrow)
+    finally:
+        factory_pool.clear()
+
+    w, absorbance = derived.get("absorbance", wunit="cm-1")
+    w_ref, absorbance_ref = fresh.get("absorbance", wunit="cm-1")
+    np.testing.assert_array_equal(w, w_ref)
+    np.testing.assert_allclose(absorbance, absorbance_ref, rtol=1e-12)
+
+
+def test_compute_spectrum_in_nm_uses_warmed_factory(tmp_path):
+    """
+    testing that a calculation in nm gets its lines from a factory warmed in cm-1, as a fresh one would
+    """
+    from src.helpers.lineStore import LineStoreRegistry
+    from src.helpers.syntheticLines import build_synthetic_line_store
+    from src.helpers.calculateSpectrum import compute_spectrum, warm_factory
+    from src.helpers.factoryPool import factory_pool
+
+    build_synthetic_line_store("CO", 20000, 1900, 2400, directory=str(tmp_path))
+    factory_pool.clear()
+    try:
+        with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True), \
+                patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))), \
+                patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 1), \
+                patch("src.helpers.calculateSpectrum._load_factory", wraps=_load_factory) as loads:
+            payload = calcPayload(**{
+                **payload_data,
+                "database": "synthetic",
+                "use_simulate_slit": False,
+                "wavelength_units": "u.nm",
+                "min_wavenumber_range": 1e7 / 2300,
+                "max_wavenumber_range": 1e7 / 2000,
+            })
+            warm_factory("synthetic", "CO", "1", 1900, 2400)
+            derived = compute_spectrum(payload)
+            assert loads.call_count == 1
+            factory_pool.clear()
+            fresh = compute_spectrum(payload)
+    finally:
+        factory_pool.clear()
+
+    w, absorbance = derived.get("absorbance", wunit="nm")
+    w_ref, absorbance_ref = fresh.get("absorbance", wunit="nm")
+    np.testing.assert_array_equal(w, w_ref)
+    np.testing.assert_allclose(absorbance, absorbance_ref, rtol=1e-12)
+
+
+def test_compute_spectrum_mixture_in_parallel(tmp_path, monkeypatch):
+    """
+    testing that the species of a mixture computed in the species workers give the serial spectrum
+    """
+    from src.helpers.lineStore import LineStoreRegistry
+    from src.helpers.syntheticLines import build_synthetic_line_store
+    from src.helpers.calculateSpectrum import compute_spectrum, _shutdown_species_executor
+    from src.helpers.factoryPool import factory_pool
+
+    for molecule in ["CO", "CO2"]:
+        build_synthetic_line_store(molecule, 5000, 1900, 2400, directory=str(tmp_path))
+    # the spawned species workers read the line stores from their environment
+    monkeypatch.setenv("LINE_STORE_DIRECTORY", str(tmp_path))
+    _shutdown_species_executor()
+    try:
+        with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True), \
+                patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))):
+            payload = calcPayload(**{
+                **payload_data,
+                "species": [
+                    {"molecule": "CO", "mole_fraction": 0.1, "is_all_isotopes": False},
+                    {"molecule": "CO2", "mole_fraction": 0.05, "is_all_isotopes": False},
+                ],
+                "database": "synthetic",
+                "use_simulate_slit": False,
+                "min_wavenumber_range": 2000,
+                "max_wavenumber_range": 2300,
+            })
+            # only the spawned workers may compute the species
+            with patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 2), \
+                    patch("src.helpers.calculateSpectrum._compute_species", side_effect=AssertionError):
+                parallel = compute_spectrum(payload)
+            with patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 1):
+                serial = compute_spectrum(payload)
+    finally:
+        _shutdown_species_executor()
+        factory_pool.clear()
+
+    w, absorbance = parallel.get("absorbance", wunit="cm-1")
+    w_ref, absorbance_ref = serial.get("absorbance", wunit="cm-1")
+    np.testing.assert_array_equal(w, w_ref)
+    np.testing.assert_allclose(absorbance, absorbance_ref, rtol=1e-12)
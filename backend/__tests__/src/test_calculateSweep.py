@@ -0,0 +1,96 @@
+""" testing calculateSweep.py """
+import json
+import struct
+from unittest.mock import patch, MagicMock
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from src.main import app
+from src.models.payload import sweepPayload
+from src.helpers.sweep import sweep_conditions, sweep_payload
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_compute_spectrum(payload, wstep="auto"):
+    """A 5-point spectrum whose values are tgas * pressure, NaN on its first point"""
+    assert wstep == 0.1
+    y = np.full(5, payload.tgas * payload.pressure)
+    y[0] = np.nan
+    mock_spectrum = MagicMock()
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), y)
+    return mock_spectrum
+
+
+def sweep_data(axes):
+    base = {**payload_data, "mode": "absorbance", "pressure": 1, "use_simulate_slit": False}
+    return {"base": base, "axes": axes, "wstep": 0.1}
+
+
+def test_sweep_conditions():
+    """
+    testing that every combination of the axes is calculated, last axis fastest
+    """
+    conditions = sweep_conditions({"tgas": [300, 600], "pressure": [1, 2]})
+    assert conditions == [
+        {"tgas": 300, "pressure": 1},
+        {"tgas": 300, "pressure": 2},
+        {"tgas": 600, "pressure": 1},
+        {"tgas": 600, "pressure": 2},
+    ]
+    sweep = sweepPayload(**sweep_data({"mole_fraction": [0.5]}))
+    payload = sweep_payload(sweep.base, {"mole_fraction": 0.5})
+    assert payload.species[0].mole_fraction == 0.5
+    assert sweep.base.species[0].mole_fraction != 0.5
+
+
+def test_sweep_validation():
+    """
+    testing that sweeps of unused parameters are rejected
+    """
+    with pytest.raises(ValidationError):
+        sweepPayload(**sweep_data({"tvib": [1000, 2000]}))
+    with pytest.raises(ValidationError):
+        sweepPayload(**sweep_data({"tgas": []}))
+    with pytest.raises(ValidationError):
+        sweepPayload(**sweep_data({"mole_fraction": [0.5, 1.5]}))
+
+
+@patch("src.helpers.sweep.compute_spectrum", fake_compute_spectrum)
+def test_sweep_json():
+    """
+    testing /calculate-spectrum/sweep as JSON, NaN columns removed from every row
+    """
+    response = client.post("/calculate-spectrum/sweep", json=sweep_data({"tgas": [300, 600], "pressure": [1, 2]}))
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["x"]) == 4
+    assert data["y"] == [[300.0] * 4, [600.0] * 4, [600.0] * 4, [1200.0] * 4]
+    assert data["conditions"] == {"tgas": [300, 300, 600, 600], "pressure": [1, 2, 1, 2]}
+    assert data["units"] == "default"
+
+
+@patch("src.helpers.sweep.compute_spectrum", fake_compute_spectrum)
+def test_sweep_raw():
+    """
+    testing /calculate-spectrum/sweep as one 2-D array in the raw binary format
+    """
+    response = client.post(
+        "/calculate-spectrum/sweep",
+        json=sweep_data({"tgas": [300, 600, 900]}),
+        headers={"Accept": "application/octet-stream"},
+    )
+
+    assert response.status_code == 200
+    (header_length,) = struct.unpack("<I", response.content[:4])
+    header = json.loads(response.content[4:4 + header_length])
+    layout = {array["name"]: array for array in header["arrays"]}
+    assert layout["y"]["shape"] == [3, 4]
+    start = 4 + header_length + layout["y"]["offset"]
+    y = np.frombuffer(response.content[start:start + 3 * 4 * 8], dtype="<f8").reshape(3, 4)
+    np.testing.assert_array_equal(y[:, 0], [300, 600, 900])
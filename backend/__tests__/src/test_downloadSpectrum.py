@@ -1,8 +1,11 @@
 """ testing downloadSpectrum.py """
 from unittest.mock import patch
+import numpy as np
 from fastapi.testclient import TestClient
+from radis import Spectrum
 from radis.misc.warning import EmptyDatabaseError
 from src.main import app
+from src.helpers.artifactCache import artifact_cache
 from __tests__.helpers.payload_data import payload_data
 
 client = TestClient(app)
@@ -49,3 +52,31 @@ def test_download_spec_generic_exception(mock_calc):
 
     assert response.status_code == 200
     assert response.json() == {"error": "Unexpected error"}
+
+
+@patch("src.routes.downloadSpectrum.calculate_spectrum")
+def test_download_spec_cached_artifact(mock_calc):
+    """
+    testing that a repeated /download-spectrum is served from the artifact cache
+    """
+    artifact_cache.clear()
+    w = np.linspace(2000, 2010, 1001)
+    mock_calc.return_value = Spectrum.from_array(
+        w, np.exp(-((w - 2005) ** 2)), "absorbance", wunit="cm-1", unit=""
+    )
+    payload = {**payload_data, "tgas": 321}
+
+    first = client.post("/download-spectrum", json=payload)
+    second = client.post("/download-spectrum", json=payload)
+
+    assert mock_calc.call_count == 1
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert int(second.headers["content-length"]) == len(second.content)
+
+    not_modified = client.post(
+        "/download-spectrum", json=payload, headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+    assert mock_calc.call_count == 1
@@ -1,5 +1,9 @@
 """ testing downloadTxt.py """
-from unittest.mock import patch
+import io
+import gzip
+from unittest.mock import patch, MagicMock
+import numpy as np
+from radis import Spectrum
 from fastapi.testclient import TestClient
 from radis.misc.warning import EmptyDatabaseError
 from src.main import app
@@ -52,3 +56,73 @@ def test_download_txt_generic_exception(mock_calc):
 
     assert response.status_code == 200
     assert response.json() == {"error": "Unexpected error"}
+
+
+def mock_csv_spectrum(n_points):
+    x = np.linspace(2000, 2100, n_points)
+    mock_spectrum = MagicMock()
+    mock_spectrum.get_name.return_value = "CO spectrum"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (x, np.sin(x))
+    return mock_spectrum, x
+
+
+@patch("src.routes.downloadTxt.calculate_spectrum")
+def test_download_txt_streams_csv(mock_calc):
+    """
+    testing that /download-txt streams every row, across several chunks
+    """
+    mock_spectrum, x = mock_csv_spectrum(150000)
+    mock_calc.return_value = mock_spectrum
+
+    response = client.post("/download-txt", json={**payload_data, "mode": "absorbance"})
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "# Wavenumber (cm-1)\tabsorbance (default)"
+    assert len(lines) == len(x) + 1
+    values = np.loadtxt(io.StringIO(response.text))
+    np.testing.assert_array_equal(values[:, 0], x)
+    np.testing.assert_array_equal(values[:, 1], np.sin(x))
+
+
+@patch("src.routes.downloadTxt.calculate_spectrum")
+def test_download_txt_reads_back(mock_calc, tmp_path):
+    """
+    testing that a downloaded CSV has the Spectrum.savetxt layout and loads with Spectrum.from_txt, as /fit-spectrum does
+    """
+    w = np.linspace(2000, 2010, 1001)
+    spectrum = Spectrum.from_array(w, np.exp(-((w - 2005) ** 2)), "radiance_noslit", wunit="cm-1", unit="mW/cm2/sr/cm-1")
+    mock_calc.return_value = spectrum
+    response = client.post(
+        "/download-txt",
+        json={**payload_data, "mode": "radiance_noslit", "wavelength_units": "1/u.cm", "use_simulate_slit": False},
+    )
+
+    assert response.status_code == 200
+    path = tmp_path / "spectrum.csv"
+    path.write_bytes(response.content)
+    spectrum.savetxt(str(tmp_path / "savetxt.csv"), "radiance_noslit", wunit="cm-1")
+    assert response.text == (tmp_path / "savetxt.csv").read_text()
+    loaded = Spectrum.from_txt(str(path), "radiance_noslit", wunit="cm-1", unit="mW/cm2/sr/cm-1")
+    np.testing.assert_array_equal(loaded.get("radiance_noslit", wunit="cm-1")[0], w)
+    np.testing.assert_array_equal(loaded.get("radiance_noslit", wunit="cm-1")[1], spectrum.get("radiance_noslit")[1])
+
+
+@patch("src.routes.downloadTxt.calculate_spectrum")
+def test_download_txt_gzip(mock_calc):
+    """
+    testing /download-txt?gzip=true
+    """
+    mock_spectrum, x = mock_csv_spectrum(1000)
+    mock_calc.return_value = mock_spectrum
+
+    response = client.post(
+        "/download-txt", json={**payload_data, "mode": "absorbance"}, params={"gzip": True}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith(".csv.gz")
+    text = gzip.decompress(response.content).decode()
+    assert len(text.splitlines()) == len(x) + 1
@@ -0,0 +1,50 @@
+""" testing downsample.py """
+import numpy as np
+from src.helpers.downsample import minmax_indices, lttb_indices, downsample_columns
+
+
+def test_minmax_indices_keeps_extrema_and_endpoints():
+    """
+    testing that min/max bucketing keeps the global extrema and both ends
+    """
+    y = np.sin(np.linspace(0, 20, 10001))
+    y[777] = 5.0
+    y[4242] = -5.0
+    indices = minmax_indices(y, 100)
+    assert len(indices) <= 102
+    assert {0, 777, 4242, 10000} <= set(indices.tolist())
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_indices_returns_requested_count():
+    """
+    testing that LTTB selects exactly n_out sorted points including the ends
+    """
+    x = np.linspace(0, 1, 50000)
+    y = np.random.default_rng(0).normal(size=x.size)
+    indices = lttb_indices(x, y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == x.size - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_small_inputs_are_untouched():
+    """
+    testing that inputs smaller than the target are returned as is
+    """
+    assert len(minmax_indices(np.arange(10.0), 100)) == 10
+    assert len(lttb_indices(np.arange(10.0), np.arange(10.0), 100)) == 10
+
+
+def test_downsample_columns_keeps_peaks_of_every_column():
+    """
+    testing that several columns are reduced on one shared x axis
+    """
+    x = np.linspace(0, 1, 20000)
+    ys = {"a": np.zeros_like(x), "b": np.zeros_like(x)}
+    ys["a"][1234] = 1.0
+    ys["b"][15000] = -1.0
+    x_out, ys_out = downsample_columns(x, ys, 200)
+    assert len(x_out) <= 204
+    assert all(len(y) == len(x_out) for y in ys_out.values())
+    assert ys_out["a"].max() == 1.0 and ys_out["b"].min() == -1.0
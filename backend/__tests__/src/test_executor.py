@@ -0,0 +1,34 @@
+""" testing executor.py """
+import asyncio
+import threading
+import pytest
+from src.helpers.executor import SpectrumExecutor, ExecutorBusyError
+
+
+def test_cancelled_call_holds_its_slot_until_done():
+    """
+    testing that a cancelled call keeps counting in flight while its worker still runs
+    """
+    executor = SpectrumExecutor("thread", max_workers=1, max_queue=0)
+    started, finish = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        finish.wait(5)
+
+    async def run():
+        task = asyncio.create_task(executor.run(work))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert executor.in_flight == 1
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(work)
+        finish.set()
+        while executor.in_flight:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    executor.shutdown()
+    assert executor.in_flight == 0
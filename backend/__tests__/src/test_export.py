@@ -0,0 +1,97 @@
+""" testing export.py """
+import io
+import json
+from unittest.mock import patch
+import h5py
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from radis import Spectrum
+from radis.misc.warning import EmptyDatabaseError
+from src.main import app
+from src.helpers.artifactCache import artifact_cache
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+payload = {
+    **payload_data,
+    "mode": "absorbance",
+    "tgas": 333,
+    "use_simulate_slit": False,
+    "wavelength_units": "1/u.cm",
+}
+
+
+def small_spectrum():
+    w = np.linspace(2000, 2010, 1001)
+    return Spectrum.from_array(w, np.exp(-((w - 2005) ** 2)), "absorbance", wunit="cm-1", unit="")
+
+
+@patch("src.routes.export.calculate_spectrum")
+def test_export_formats_compute_once_per_format(mock_calc):
+    """
+    testing /export in JSON, CSV and HDF5, each served from cache the second time
+    """
+    artifact_cache.clear()
+    mock_calc.return_value = small_spectrum()
+
+    for export_format in ("json", "csv", "hdf5"):
+        first = client.post("/export", json=payload, params={"format": export_format})
+        second = client.post("/export", json=payload, params={"format": export_format})
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert first.headers["etag"] == second.headers["etag"]
+    assert mock_calc.call_count == 3
+
+    data = json.loads(client.post("/export", json=payload, params={"format": "json"}).content)["data"]
+    assert len(data["x"]) == 1001
+
+    content = client.post("/export", json=payload, params={"format": "hdf5"}).content
+    with h5py.File(io.BytesIO(content), "r") as f:
+        assert f["absorbance"].shape == (1001,)
+        assert f["Wavenumber (cm-1)"].attrs["unit"] == "cm-1"
+
+
+@patch("src.routes.export.calculate_spectrum")
+def test_export_parquet(mock_calc):
+    """
+    testing /export?format=parquet columns, units and conditions
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    artifact_cache.clear()
+    mock_calc.return_value = small_spectrum()
+
+    response = client.post("/export", json=payload, params={"format": "parquet"})
+
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == ["Wavenumber (cm-1)", "absorbance"]
+    assert table.num_rows == 1001
+    np.testing.assert_allclose(table["absorbance"].to_numpy(), small_spectrum().get("absorbance")[1])
+    assert json.loads(table.schema.metadata[b"units"])["Wavenumber (cm-1)"] == "cm-1"
+    assert b"conditions" in table.schema.metadata
+
+
+@patch("src.helpers.exportSpectrum.pq", None)
+def test_export_parquet_without_pyarrow():
+    """
+    testing /export?format=parquet when pyarrow is missing
+    """
+    response = client.post("/export", json=payload, params={"format": "parquet"})
+    assert response.status_code == 400
+    assert "pyarrow" in response.json()["error"]
+
+
+@patch("src.routes.export.calculate_spectrum")
+def test_export_empty_database_error(mock_calc):
+    """
+    testing /export when EmptyDatabaseError occurs
+    """
+    artifact_cache.clear()
+    mock_calc.side_effect = EmptyDatabaseError("Empty DB")
+
+    response = client.post("/export", json=payload, params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.json() == {"error": "No line in the specified wavenumber range"}
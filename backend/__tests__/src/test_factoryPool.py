@@ -0,0 +1,54 @@
+""" testing factoryPool.py """
+import pandas as pd
+from src.helpers.factoryPool import FactoryPool
+
+KEY = ("CO", "1", "hitran", "equilibrium", "cm-1")
+
+
+class FakeFactory:
+    """Stand-in for a SpectrumFactory without a loaded databank"""
+    df0 = None
+
+
+def test_acquire_reuses_covering_window():
+    """
+    testing that a request inside a loaded window reuses the factory
+    """
+    pool = FactoryPool(max_bytes=1e9)
+    factory = FakeFactory()
+    pool.add(KEY, 1900, 2300, factory)
+
+    pooled = pool.acquire(KEY, 2000, 2200)
+    assert pooled is not None
+    assert pooled.factory is factory
+    assert not pooled.is_exact(2000, 2200)
+
+
+def test_acquire_misses_outside_window_and_other_keys():
+    """
+    testing that windows not covered or other molecules are not reused
+    """
+    pool = FactoryPool(max_bytes=1e9)
+    pool.add(KEY, 1900, 2300, FakeFactory())
+
+    assert pool.acquire(KEY, 1800, 2000) is None
+    assert pool.acquire(("CO2",) + KEY[1:], 2000, 2100) is None
+    assert pool.stats()["misses"] == 2
+
+
+def test_acquire_exact_and_lines():
+    """
+    testing the exact-window lookup and the lines handed over to a narrower window
+    """
+    pool = FactoryPool(max_bytes=1e9)
+    factory = FakeFactory()
+    factory.df0 = pd.DataFrame({"wav": [1950.0, 2050.0, 2150.0, 2250.0]})
+    factory.df0.attrs["molecule"] = "CO"
+    pool.add(KEY, 1900, 2300, factory)
+
+    assert pool.acquire(KEY, 2000, 2200, exact=True) is None
+    assert pool.acquire(KEY, 1900, 2300, exact=True).factory is factory
+    lines = pool.acquire(KEY, 2000, 2200).lines(2000, 2200)
+    assert list(lines["wav"]) == [2050.0, 2150.0]
+    assert lines.attrs["molecule"] == "CO"
+    assert len(factory.df0) == 4
@@ -0,0 +1,72 @@
+""" testing jobs.py """
+import json
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from radis.misc.warning import EmptyDatabaseError
+from src.main import app
+from src.helpers.jobs import job_manager
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_calculation_job(payload, slit_unit, spec_path, json_path):
+    """Writes a tiny result instead of running radis"""
+    with open(json_path, "w") as f:
+        json.dump({"x": [2000.0, 2000.1], "y": [0.1, 0.2], "units": "default"}, f)
+    return {"name": "fake"}
+
+
+@patch("src.routes.jobs.run_calculation_job", fake_calculation_job)
+def test_calculation_job_result_json():
+    """
+    testing /jobs/calculate followed by status polling and JSON result retrieval
+    """
+    response = client.post("/jobs/calculate", json=payload_data)
+    assert response.status_code == 202
+    job_id = response.json()["data"]["id"]
+
+    status = client.get(f"/jobs/{job_id}").json()["data"]
+    assert status["status"] == "done"
+    assert status["progress"] == 1.0
+
+    result = client.get(f"/jobs/{job_id}/result", params={"format": "json"})
+    assert result.status_code == 200
+    assert result.json()["x"] == [2000.0, 2000.1]
+
+
+@patch("src.helpers.jobs.calculate_spectrum")
+def test_calculation_job_empty_database_error(mock_calc):
+    """
+    testing that a failing calculation marks the job as failed
+    """
+    mock_calc.side_effect = EmptyDatabaseError("Empty DB")
+
+    job_id = client.post("/jobs/calculate", json=payload_data).json()["data"]["id"]
+
+    status = client.get(f"/jobs/{job_id}").json()["data"]
+    assert status["status"] == "failed"
+    assert status["error"] == "No line in the specified wavenumber range"
+
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 409
+
+
+def test_job_result_not_finished():
+    """
+    testing the result endpoint of a queued job
+    """
+    job = job_manager.create("calculate", meta={"mode": "absorbance", "wavelength_units": "1/u.cm"})
+
+    response = client.get(f"/jobs/{job['id']}/result")
+    assert response.status_code == 409
+    assert response.json() == {"error": "Job is queued"}
+
+
+def test_unknown_job():
+    """
+    testing /jobs/{job_id} with an unknown id
+    """
+    response = client.get("/jobs/does-not-exist")
+    assert response.status_code == 404
+    assert response.json() == {"error": "Job not found"}
@@ -0,0 +1,83 @@
+""" testing lineStore.py """
+import os
+import numpy as np
+import radis
+from radis import SpectrumFactory
+from src.helpers.lineStore import LineStore, LineStoreRegistry, load_lines, write_line_store
+
+LINES_FILE = os.path.join(os.path.dirname(radis.__file__), "test", "files", "hitran_co_3iso_2000_2300cm.par")
+
+
+def co_factory(wmin=2050, wmax=2150):
+    return SpectrumFactory(wmin=wmin, wmax=wmax, wunit="cm-1", molecule="CO", isotope="1", wstep=0.01, verbose=0)
+
+
+def co_lines():
+    """CO lines of the radis test files, as fetch_databank leaves them"""
+    sf = co_factory(2000, 2300)
+    sf.load_databank(path=LINES_FILE, format="hitran", parfuncfmt="hapi")
+    return sf.df0
+
+
+def test_line_store_slices_by_wavenumber(tmp_path):
+    """
+    testing that a store written in two chunks returns the lines of a window
+    """
+    df = co_lines()
+    chunks = [
+        (df[df.wav < 2150].reset_index(drop=True), (2000, 2150)),
+        (df[df.wav >= 2150].reset_index(drop=True), (2150, 2300)),
+    ]
+    for chunk, _ in chunks:
+        chunk.attrs.update(df.attrs)
+    store = LineStore(write_line_store(chunks, str(tmp_path / "hitran_CO_1_equilibrium")))
+
+    assert store.count == len(df)
+    assert store.covers(2050, 2250) and not store.covers(1990, 2250)
+    lines = store.lines(2100, 2200)
+    expected = df[(df.wav >= 2100) & (df.wav <= 2200)]
+    np.testing.assert_array_equal(lines.wav, expected.wav)
+    np.testing.assert_array_equal(lines.int, expected.int)
+    assert lines.id.unique().tolist() == [df.attrs["id"]]
+
+
+def test_load_lines_gives_same_spectrum(tmp_path):
+    """
+    testing that lines from the store give the spectrum of the radis loader
+    """
+    sf = co_factory()
+    sf.load_databank(path=LINES_FILE, format="hitran", parfuncfmt="hapi")
+    expected = sf.eq_spectrum(Tgas=700, pressure=1, mole_fraction=0.1, path_length=1)
+
+    df = co_lines()
+    write_line_store([(df, (2000, 2300))], str(tmp_path / "hitran_CO_1_equilibrium"))
+    store = LineStoreRegistry(str(tmp_path)).get("hitran", "CO", "1", "equilibrium")
+    sf = co_factory()
+    load_lines(sf, store.lines(sf.params.wavenum_min_calc, sf.params.wavenum_max_calc), "hitran")
+    spectrum = sf.eq_spectrum(Tgas=700, pressure=1, mole_fraction=0.1, path_length=1)
+
+    np.testing.assert_allclose(spectrum.get("abscoeff")[1], expected.get("abscoeff")[1])
+    assert LineStoreRegistry(str(tmp_path)).get("exomol", "CO", "1", "equilibrium") is None
+
+
+def test_load_lines_sets_up_factory_as_radis_loader():
+    """
+    testing that load_lines leaves a factory as load_databank does (it relies on radis internals)
+    """
+    expected = co_factory()
+    expected.input.isotope = "all"
+    expected.load_databank(path=LINES_FILE, format="hitran", parfuncfmt="hapi")
+    sf = co_factory()
+    sf.input.isotope = "all"
+    load_lines(sf, expected.df0.copy(), "hitran")
+
+    for name in ["dbformat", "parfuncfmt", "parfuncpath", "levelsfmt", "db_use_cached", "lvl_use_cached"]:
+        assert getattr(sf.params, name) == getattr(expected.params, name), name
+    assert sf.input.isotope == expected.input.isotope == "1,2,3"
+    assert sf.misc.load_energies == expected.misc.load_energies
+    assert sf.dataframe_type == expected.dataframe_type
+    assert sorted(sf.df0.columns) == sorted(expected.df0.columns)
+
+    spectrum = sf.eq_spectrum(Tgas=1500, pressure=1, mole_fraction=0.1, path_length=1)
+    reference = expected.eq_spectrum(Tgas=1500, pressure=1, mole_fraction=0.1, path_length=1)
+    np.testing.assert_allclose(spectrum.get("abscoeff")[1], reference.get("abscoeff")[1])
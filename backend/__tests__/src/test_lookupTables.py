@@ -0,0 +1,119 @@
+""" testing lookupTables.py """
+import json
+from unittest.mock import patch
+import numpy as np
+from radis.lbl.base import BaseFactory
+from src.models.payload import calcPayload
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.lookupTables import LookupTableStore, lookup_spectrum
+from src.helpers.spectrumData import get_spectrum_data
+from __tests__.helpers.payload_data import payload_data
+
+
+def write_table(directory, molecule="CO"):
+    """A CO table whose absorption coefficient is Tgas * pressure / 1e4 (cm-1)"""
+    tgas = [300, 1000]
+    pressure = [0.1, 10]
+    table = np.empty((2, 2, 401), dtype=np.float32)
+    for i, t in enumerate(tgas):
+        for j, p in enumerate(pressure):
+            table[i, j] = t * p / 1e4
+    np.save(directory / f"{molecule}.npy", table)
+    meta = {
+        "molecule": molecule, "database": "hitran", "isotope": "1", "mole_fraction": 0.1,
+        "tgas": tgas, "pressure": pressure, "wmin": 1900, "wmax": 2300, "points": 401,
+    }
+    (directory / f"{molecule}.json").write_text(json.dumps(meta))
+    return LookupTableStore(str(directory))
+
+
+def test_lookup_spectrum_interpolates(tmp_path):
+    """
+    testing interpolation in Tgas and log(pressure), scaled by mole fraction and path length
+    """
+    store = write_table(tmp_path)
+    spectrum = lookup_spectrum(store, [("CO", "1", 0.2)], "hitran", 650, 1, 10, (2000, 2100))
+
+    w, absorbance = spectrum.get("absorbance", wunit="cm-1")
+    assert w[0] == 2000 and w[-1] == 2100
+    # halfway between both temperatures, and the pressure grid points
+    k = (300 * 0.1 + 1000 * 0.1 + 300 * 10 + 1000 * 10) / 4 / 1e4
+    np.testing.assert_allclose(absorbance, k * 0.2 / 0.1 * 10, rtol=1e-6)
+    assert "radiance_noslit" in spectrum.get_vars()
+
+
+def test_lookup_spectrum_not_covered(tmp_path):
+    """
+    testing that requests outside the tables are not answered from them
+    """
+    store = write_table(tmp_path)
+    assert lookup_spectrum(store, [("CO", "1", 0.2)], "hitran", 2000, 1, 10, (2000, 2100)) is None
+    assert lookup_spectrum(store, [("CO", "1", 0.2)], "hitran", 650, 1, 10, (1800, 2100)) is None
+    assert lookup_spectrum(store, [("CO", "1", 0.2), ("CO2", "1", 0.1)], "hitran", 650, 1, 10, (2000, 2100)) is None
+    assert lookup_spectrum(store, [("CO", "1", 0.2)], "hitemp", 650, 1, 10, (2000, 2100)) is None
+
+
+@patch("src.helpers.calculateSpectrum.compute_spectrum")
+def test_calculate_spectrum_fast(mock_compute, tmp_path):
+    """
+    testing that fast calculations covered by a table skip the line-by-line calculation
+    """
+    store = write_table(tmp_path)
+    payload = calcPayload(**{**payload_data, "fast": True, "use_simulate_slit": False, "path_length_units": "u.cm"})
+    with patch("src.helpers.calculateSpectrum.lookup_table_store", store):
+        spectrum = calculate_spectrum(payload)
+
+    mock_compute.assert_not_called()
+    assert spectrum.conditions["lookup_table"] is True
+    assert spectrum.get("absorbance", wunit="cm-1")[0][0] == 1900
+
+
+def test_lookup_spectrum_radiance_units(tmp_path):
+    """
+    testing that fast radiance has the units and values of the line-by-line one
+    """
+    from src.helpers.lineStore import LineStoreRegistry
+    from src.helpers.syntheticLines import build_synthetic_line_store
+    from src.helpers.calculateSpectrum import compute_spectrum
+
+    build_synthetic_line_store("CO", 5000, 1950, 2050, directory=str(tmp_path))
+    with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True), \
+            patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))), \
+            patch("src.helpers.calculateSpectrum.SPECIES_MAX_PARALLELISM", 1):
+        payload = calcPayload(**{
+            **payload_data, "database": "synthetic", "tgas": 1000, "pressure": 1, "pressure_units": "u.bar",
+            "path_length": 1, "path_length_units": "u.cm", "min_wavenumber_range": 2000, "max_wavenumber_range": 2010,
+        })
+        exact = compute_spectrum(payload, wstep=0.01)
+
+    # a table holding the exact absorption coefficient at every grid point
+    w, k = exact.get("abscoeff", wunit="cm-1")
+    table = np.broadcast_to(k * 0.1 / 0.2, (2, 2, len(w))).astype(np.float32)
+    np.save(tmp_path / "CO.npy", table)
+    (tmp_path / "CO.json").write_text(json.dumps({
+        "molecule": "CO", "database": "synthetic", "isotope": "1", "mole_fraction": 0.1,
+        "tgas": [900, 1100], "pressure": [0.5, 2], "wmin": w[0], "wmax": w[-1], "points": len(w),
+    }))
+    store = LookupTableStore(str(tmp_path))
+    fast = lookup_spectrum(store, [("CO", "1", 0.2)], "synthetic", 1000, 1, 1, (w[0], w[-1]))
+
+    for name in ("radiance_noslit", "emisscoeff"):
+        assert fast.units[name] == exact.units[name]
+        w_fast, fast_values = fast.get(name, wunit="cm-1", Iunit=fast.units[name])
+        _, exact_values = exact.get(name, wunit="cm-1", Iunit=exact.units[name])
+        np.testing.assert_allclose(w_fast, w)
+        np.testing.assert_allclose(fast_values, exact_values, rtol=1e-3, atol=1e-4 * exact_values.max())
+    # as answered by /calculate-spectrum
+    fast_data = get_spectrum_data(fast, "radiance_noslit", "1/u.cm")
+    exact_data = get_spectrum_data(exact, "radiance_noslit", "1/u.cm")
+    assert fast_data["units"] == exact_data["units"]
+    np.testing.assert_allclose(fast_data["y"], exact_data["y"], rtol=1e-3, atol=1e-4 * max(exact_data["y"]))
+
+    # with a radis calculating radiance per nm, the fast spectrum follows
+    per_nm = {**BaseFactory.units0, "radiance_noslit": "mW/cm2/sr/nm", "emisscoeff": "mW/cm3/sr/nm"}
+    with patch.object(BaseFactory, "units0", per_nm):
+        fast = lookup_spectrum(store, [("CO", "1", 0.2)], "synthetic", 1000, 1, 1, (w[0], w[-1]))
+    assert fast.units["radiance_noslit"] == "mW/cm2/sr/nm"
+    _, fast_values = fast.get("radiance_noslit", wunit="cm-1", Iunit="mW/cm2/sr/nm")
+    _, exact_values = exact.get("radiance_noslit", wunit="cm-1", Iunit="mW/cm2/sr/nm")
+    np.testing.assert_allclose(fast_values, exact_values, rtol=1e-3, atol=1e-4 * exact_values.max())
@@ -0,0 +1,121 @@
+""" testing metrics.py """
+import os
+import sys
+import time
+import signal
+import subprocess
+from unittest.mock import MagicMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from src.main import app
+from src.helpers.metrics import (
+    Histogram, Counter, cache_lookups, calculation_requests, request_duration, phase_duration, requests_in_flight,
+    collect_memory, descendant_pids,
+)
+from src.helpers.timing import span
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_calculate_spectrum(payload, slit_unit=None):
+    """A 5-point spectrum missing the cache, with the spans of a calculation"""
+    with span("cache_get") as timing:
+        timing["hit"] = False
+    with span("eq_spectrum", molecule="CO") as timing:
+        timing["lines"] = 1500
+        timing["points"] = 5
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), np.ones(5))
+    return mock_spectrum
+
+
+def test_histogram_render():
+    """
+    testing the cumulative buckets, sum and count of a histogram, and label escaping
+    """
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, route='/a"b')
+    histogram.observe(0.5, route='/a"b')
+
+    assert histogram.render().split("\n") == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{route="/a\\"b",le="1.0"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 2',
+        'test_seconds_sum{route="/a\\"b"} 0.55',
+        'test_seconds_count{route="/a\\"b"} 2',
+    ]
+    assert Counter("test_total", "Test.").render().endswith("# TYPE test_total counter")
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum", fake_calculate_spectrum)
+def test_metrics_after_calculation():
+    """
+    testing that a calculation is counted, timed, and its sizes and cache lookup recorded
+    """
+    requests = calculation_requests.value(database="hitran", molecule="CO")
+    misses = cache_lookups.value(cache="spectrum", result="miss")
+    latencies = request_duration.count(method="POST", route="/calculate-spectrum", status=200)
+
+    assert client.post("/calculate-spectrum", json={**payload_data, "use_simulate_slit": False}).status_code == 200
+
+    assert calculation_requests.value(database="hitran", molecule="CO") == requests + 1
+    assert cache_lookups.value(cache="spectrum", result="miss") == misses + 1
+    assert request_duration.count(method="POST", route="/calculate-spectrum", status=200) == latencies + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'radis_lines_calculated_bucket{molecule="CO",le="10000.0"}' in text
+    assert 'radis_grid_points_count{molecule="CO"}' in text
+    assert 'radis_phase_duration_seconds_count{phase="queue"}' in text
+    assert 'radis_cache_hit_ratio{cache="spectrum"}' in text
+    assert 'http_requests_in_flight{method="GET",route="/metrics"} 1' in text
+    assert "radis_executor_queue_depth 0" in text
+    assert 'radis_executor_capacity{slots="workers"}' in text
+
+
+
+def test_worker_memory_includes_species_pools():
+    """
+    testing that the memory of the processes started by the executor workers is reported too
+    """
+    child = "import time; time.sleep(30)"
+    worker = subprocess.Popen([sys.executable, "-c", f"import subprocess, sys; subprocess.run([sys.executable, '-c', {child!r}])"])
+    try:
+        for _ in range(100):
+            if descendant_pids(worker.pid):
+                break
+            time.sleep(0.05)
+        with patch("src.helpers.metrics.spectrum_executor.worker_pids", return_value=[worker.pid]):
+            text = collect_memory()[1].render()
+        assert f'radis_worker_resident_memory_bytes{{pid="{worker.pid}"}}' in text
+        assert text.count("radis_worker_resident_memory_bytes{") == 2
+    finally:
+        for pid in descendant_pids(worker.pid):
+            os.kill(pid, signal.SIGKILL)
+        worker.kill()
+
+
+@patch("src.helpers.batch.calculate_spectrum", fake_calculate_spectrum)
+def test_metrics_of_streamed_response():
+    """
+    testing that a streamed response is measured once its body is sent, with the spans of its streaming
+    """
+    route = "/calculate-spectrum/batch"
+    latencies = request_duration.count(method="POST", route=route, status=200)
+    phases = phase_duration.count(phase="eq_spectrum")
+    payloads = [{**payload_data, "use_simulate_slit": False, "tgas": tgas} for tgas in (300, 400)]
+
+    response = client.post(route, json={"payloads": payloads})
+
+    assert response.status_code == 200 and len(response.text.splitlines()) == 2
+    assert request_duration.count(method="POST", route=route, status=200) == latencies + 1
+    assert phase_duration.count(phase="eq_spectrum") == phases + 2
+    assert requests_in_flight.value(method="POST", route=route) == 0
@@ -0,0 +1,137 @@
+""" testing prefetch.py """
+import json
+import asyncio
+import threading
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app, prefetch_databanks
+from src.helpers.executor import SpectrumExecutor
+from src.helpers.prefetch import load_manifest, prefetch, warm_up, warm_up_state
+
+client = TestClient(app)
+
+
+def write_manifest(tmp_path, databanks):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"databanks": databanks}))
+    return str(path)
+
+
+def test_load_manifest(tmp_path):
+    """
+    testing that a manifest is expanded into one entry per molecule and range
+    """
+    path = write_manifest(tmp_path, [
+        {"database": "hitran", "molecules": ["CO", "NO"], "isotope": "all", "ranges": None},
+        {"database": "hitemp", "molecules": ["CO2"], "isotope": "1", "ranges": [[50, 1050], [1050, 2050]], "warm": True},
+    ])
+    entries = load_manifest(path)
+    assert [entry.key for entry in entries] == [
+        "hitran/CO/all/full", "hitran/NO/all/full", "hitemp/CO2/1/50-1050", "hitemp/CO2/1/1050-2050",
+    ]
+    assert [entry.warm for entry in entries] == [False, False, True, True]
+
+    with pytest.raises(ValueError):
+        load_manifest(write_manifest(tmp_path, [{"database": "hitran", "molecules": ["CO"], "warm": True}]))
+
+
+def test_prefetch_resumes(tmp_path):
+    """
+    testing that intact entries are skipped, and changed or failed ones fetched again
+    """
+    cached = tmp_path / "CO.h5"
+    calls = []
+
+    def fake_fetch(molecule, cache=True, **kwargs):
+        calls.append((molecule, cache))
+        if molecule == "XX" and cache is True:
+            raise OSError("corrupted file")
+        cached.write_bytes(b"lines")
+        return pd.DataFrame({"wav": [1.0, 2.0]}), str(cached)
+
+    entries = load_manifest(write_manifest(tmp_path, [{"database": "hitran", "molecules": ["CO", "XX"]}]))
+    state_path = str(tmp_path / "state.json")
+    with patch.dict("src.helpers.prefetch.FETCHERS", {"hitran": fake_fetch}):
+        summary = prefetch(entries, workers=1, state_path=state_path)
+        assert summary["fetched"] == ["hitran/CO/all/full", "hitran/XX/all/full"]
+        # the unreadable cache was parsed again
+        assert calls == [("CO", True), ("XX", True), ("XX", "regen")]
+
+        calls.clear()
+        assert prefetch(entries, workers=1, state_path=state_path)["skipped"] == [entry.key for entry in entries]
+        assert calls == []
+
+        cached.write_bytes(b"truncated lines")
+        summary = prefetch(entries, workers=1, state_path=state_path)
+        assert sorted(summary["fetched"]) == ["hitran/CO/all/full", "hitran/XX/all/full"]
+
+
+def test_ready():
+    """
+    testing /ready while the warm-up runs and once it is done
+    """
+    with patch.dict(warm_up_state, {"ready": False, "phase": "prefetch"}):
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["phase"] == "prefetch"
+    assert client.get("/ready").status_code == 200
+
+
+@patch("src.helpers.prefetch.prefetch")
+@patch("src.helpers.prefetch.warm_factory")
+def test_warm_up_starts_warm_workers(mock_warm, mock_prefetch, tmp_path):
+    """
+    testing that the startup warm-up loads the `warm` databanks in the workers before reporting ready
+    """
+    path = write_manifest(tmp_path, [
+        {"database": "hitran", "molecules": ["CO"], "isotope": "1", "ranges": [[1900, 2300]], "warm": True},
+        {"database": "hitran", "molecules": ["NO"]},
+    ])
+    executor = SpectrumExecutor("thread", max_workers=2, max_queue=0)
+    with patch.dict(warm_up_state):
+        asyncio.run(warm_up(executor, path))
+        assert warm_up_state["ready"] is True and warm_up_state["error"] is None
+    executor.shutdown()
+
+    mock_prefetch.assert_called_once()
+    # worker threads share the factory pool: warmed once, with only the warm entry
+    mock_warm.assert_called_once_with("hitran", "CO", "1", 1900, 2300)
+
+
+def test_initializer_applies_to_running_executor():
+    """
+    testing that workers started before set_initializer are replaced by workers running it
+    """
+    executor = SpectrumExecutor("thread", max_workers=1, max_queue=0)
+    warmed = []
+
+    async def run():
+        await executor.run(threading.get_ident)
+        executor.set_initializer(lambda: warmed.append(threading.get_ident()))
+        return await executor.run(threading.get_ident)
+
+    worker = asyncio.run(run())
+    executor.shutdown()
+    assert warmed == [worker]
+
+
+def test_not_ready_before_warm_up_starts():
+    """
+    testing that /ready answers 503 as soon as the startup hook has scheduled the warm-up
+    """
+    started = []
+
+    async def fake_warm_up(executor):
+        started.append(executor)
+
+    async def startup():
+        with patch("src.main.PREFETCH_ON_STARTUP", True), patch("src.main.warm_up", fake_warm_up):
+            await prefetch_databanks()
+        assert warm_up_state["ready"] is False and started == []
+        await app.state.warm_up
+        assert started
+
+    with patch.dict(warm_up_state):
+        asyncio.run(startup())
@@ -0,0 +1,81 @@
+""" testing profiling.py """
+import json
+import time
+from unittest.mock import MagicMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from src.main import app
+from src.helpers.profiling import profile_call
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_calculate_spectrum(payload, slit_unit=None):
+    """A 5-point spectrum"""
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), np.ones(5))
+    return mock_spectrum
+
+
+def slow_call():
+    """Sleep long enough to be sampled"""
+    time.sleep(0.1)
+    return 42
+
+
+def test_sampling_profile(tmp_path):
+    """
+    testing that the sampling profiler saves the sampled stacks as speedscope JSON
+    """
+    path = tmp_path / "profile.speedscope.json"
+    assert profile_call("sampling", str(path), slow_call) == 42
+
+    report = json.loads(path.read_text())
+    profile = report["profiles"][0]
+    assert profile["type"] == "sampled" and len(profile["samples"]) > 0
+    frames = report["shared"]["frames"]
+    assert "slow_call" in {frames[index]["name"] for index in profile["samples"][0]}
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum", fake_calculate_spectrum)
+def test_profiled_request(tmp_path):
+    """
+    testing that an admin can profile a calculation and download its report
+    """
+    headers = {"X-Admin-Token": "secret"}
+    with patch("src.helpers.profiling.PROFILE_ADMIN_TOKEN", "secret"), \
+            patch("src.helpers.profiling.PROFILE_DIRECTORY", str(tmp_path)):
+        response = client.post(
+            "/calculate-spectrum",
+            json={**payload_data, "use_simulate_slit": False},
+            headers={**headers, "X-Profile": "cprofile"},
+        )
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        artifacts = client.get(f"/profiles/{profile_id}", headers=headers).json()["data"]["artifacts"]
+        assert len(artifacts) == 1 and artifacts[0].endswith(".prof")
+        report = client.get(f"/profiles/{profile_id}/{artifacts[0]}?format=text", headers=headers)
+        assert "fake_calculate_spectrum" in report.text
+
+        assert client.get("/profiles").status_code == 403
+        assert client.get(f"/profiles/{profile_id}/../x.prof", headers=headers).status_code == 404
+
+
+def test_profiling_needs_admin_token():
+    """
+    testing that profiling is refused without the admin token or with an unknown profiler, and off by default
+    """
+    with patch("src.helpers.profiling.PROFILE_ADMIN_TOKEN", "secret"):
+        response = client.get("/", headers={"X-Profile": "cprofile", "X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+        response = client.get("/", headers={"X-Profile": "perf", "X-Admin-Token": "secret"})
+        assert response.status_code == 400
+        assert "Unknown profiler" in response.json()["error"]
+    response = client.get("/?profile=sampling", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 403
+    assert "X-Profile-Id" not in client.get("/").headers
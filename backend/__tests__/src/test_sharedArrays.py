@@ -0,0 +1,25 @@
+""" testing sharedArrays.py """
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from src.helpers.sharedArrays import arrays_to_shared, arrays_from_shared
+
+
+def test_shared_arrays_round_trip():
+    """
+    testing that arrays come back identical and the block is freed
+    """
+    arrays = {
+        "wavespace": np.linspace(2000, 2100, 1001),
+        "abscoeff": np.random.default_rng(1).random(1001),
+        "flags": np.arange(7, dtype=np.int32),
+    }
+    block_name, layout = arrays_to_shared(arrays)
+    result = arrays_from_shared(block_name, layout)
+
+    assert list(result) == list(arrays)
+    for name, array in arrays.items():
+        assert result[name].dtype == array.dtype
+        np.testing.assert_array_equal(result[name], array)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=block_name)
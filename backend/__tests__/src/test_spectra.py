@@ -0,0 +1,125 @@
+""" testing spectra.py """
+import os
+import time
+from unittest.mock import patch, MagicMock
+import numpy as np
+from fastapi.testclient import TestClient
+from src.main import app
+from src.helpers.spectrumPyramid import PyramidStore, build_pyramid, pyramid_view
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def mock_wide_spectrum():
+    x = np.linspace(1000, 3000, 400001)
+    y = np.zeros_like(x)
+    y[123457] = 2.0  # a single-point line at 1617.285 cm-1
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = len(x)
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (x, y)
+    return mock_spectrum
+
+
+def test_pyramid_levels_keep_peaks():
+    """
+    testing that every pyramid level keeps the extrema and shrinks
+    """
+    x = np.linspace(0, 1, 100000)
+    y = np.sin(x * 50)
+    y[4321] = 3.0
+    levels = build_pyramid(x, y, factor=4, min_points=1000)
+    assert len(levels) > 2
+    for (x_fine, _), (x_coarse, y_coarse) in zip(levels, levels[1:]):
+        assert len(x_coarse) < len(x_fine)
+        assert y_coarse.max() == 3.0
+        assert np.all(np.diff(x_coarse) > 0)
+
+
+def test_pyramid_view_picks_level_from_zoom():
+    """
+    testing that zooming in reads a finer level than the full range
+    """
+    x = np.linspace(0, 1, 100000)
+    levels = build_pyramid(x, np.cos(x * 30), factor=4, min_points=1000)
+    _, _, level_full = pyramid_view(levels, 0, 1, 500)
+    x_zoom, _, level_zoom = pyramid_view(levels, 0.5, 0.501, 500)
+    assert level_zoom < level_full
+    assert x_zoom[0] <= 0.5 and x_zoom[-1] >= 0.501
+
+
+def test_expired_pyramid_is_rebuilt(tmp_path):
+    """
+    testing that an expired pyramid file is deleted and built again
+    """
+    store = PyramidStore(str(tmp_path), ttl=60, max_memory_entries=4)
+    x = np.linspace(0, 1, 10000)
+    assert store.begin("view")
+    store.build("view", x, np.cos(x), "cm-1")
+    assert not store.begin("view")
+    assert store.load("view")[1] == "cm-1"
+
+    path = tmp_path / "view.pyramid.npz"
+    expired = time.time() - 120
+    os.utime(path, (expired, expired))
+    assert store.begin("view")
+    assert not path.exists()
+    store.build("view", x, np.sin(x), "nm")
+    assert store.load("view")[1] == "nm"
+
+    os.utime(path, (expired, expired))
+    assert store.load("view") is None
+    assert not path.exists()
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum")
+def test_calculate_then_view(mock_calc):
+    """
+    testing /spectra/{id}/view with the id returned by /calculate-spectrum
+    """
+    mock_calc.return_value = mock_wide_spectrum()
+    payload = {
+        **payload_data,
+        "mode": "absorbance",
+        "wavelength_units": "1/u.cm",
+        "min_wavenumber_range": 1000,
+        "max_wavenumber_range": 3000,
+    }
+    response = client.post("/calculate-spectrum", json=payload)
+    assert response.status_code == 200
+    spectrum_id = response.json()["data"]["id"]
+
+    view = client.get(
+        f"/spectra/{spectrum_id}/view", params={"wmin": 1000, "wmax": 3000, "pixels": 800}
+    )
+    assert view.status_code == 200
+    result = view.json()["data"]
+    assert len(result["x"]) <= 1600
+    assert max(result["y"]) == 2.0
+    assert result["units"] == "default"
+
+    zoom = client.get(
+        f"/spectra/{spectrum_id}/view", params={"wmin": 1617, "wmax": 1618, "pixels": 800}
+    ).json()["data"]
+    assert zoom["level"] == 0
+    assert max(zoom["y"]) == 2.0
+    assert zoom["x"][0] <= 1617 and zoom["x"][-1] >= 1618
+
+
+def test_view_unknown_spectrum():
+    """
+    testing /spectra/{id}/view with an unknown id
+    """
+    response = client.get("/spectra/does-not-exist/view", params={"wmin": 0, "wmax": 1})
+    assert response.status_code == 404
+    assert response.json() == {"error": "Spectrum not found"}
+
+
+def test_view_empty_range():
+    """
+    testing /spectra/{id}/view with wmin >= wmax
+    """
+    response = client.get("/spectra/any/view", params={"wmin": 2, "wmax": 1})
+    assert response.status_code == 400
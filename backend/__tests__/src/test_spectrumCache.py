@@ -0,0 +1,102 @@
+""" testing spectrumCache.py """
+import numpy as np
+from src.models.payload import calcPayload
+from src.helpers.spectrumCache import SpectrumCache, payload_cache_key
+from __tests__.helpers.payload_data import payload_data
+
+
+class FakeSpectrum:
+    """Minimal stand-in for a radis Spectrum holding one array"""
+
+    def __init__(self, size):
+        self._q = {"abscoeff": np.zeros(size)}
+
+    def copy(self):
+        copied = FakeSpectrum(0)
+        copied._q = {k: v.copy() for k, v in self._q.items()}
+        return copied
+
+
+def memory_cache(max_memory_bytes=1000, ttl=60):
+    return SpectrumCache(directory="unused", max_memory_bytes=max_memory_bytes, max_disk_bytes=0, ttl=ttl)
+
+
+def test_payload_cache_key_ignores_presentation_fields():
+    """
+    testing that mode and slit do not change the cache key
+    """
+    payload = calcPayload(**payload_data)
+    other = calcPayload(**{**payload_data, "mode": "transmittance_noslit", "use_simulate_slit": False})
+    assert payload_cache_key(payload) == payload_cache_key(other)
+
+
+def test_payload_cache_key_depends_on_physics():
+    """
+    testing that a change of temperature changes the cache key
+    """
+    payload = calcPayload(**payload_data)
+    other = calcPayload(**{**payload_data, "tgas": 1000})
+    assert payload_cache_key(payload) != payload_cache_key(other)
+
+
+def test_memory_tier_hit_and_miss_counters():
+    """
+    testing hit/miss counters of the memory tier
+    """
+    cache = memory_cache()
+    assert cache.get("a") is None
+    cache.put("a", FakeSpectrum(10))
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["hits_memory"] == 1
+    assert stats["misses"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """
+    testing that the memory tier stays within its byte budget
+    """
+    cache = memory_cache(max_memory_bytes=200)
+    cache.put("a", FakeSpectrum(10))  # 80 bytes
+    cache.put("b", FakeSpectrum(10))
+    cache.get("a")
+    cache.put("c", FakeSpectrum(10))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["memory_bytes"] <= 200
+
+
+def test_memory_tier_ttl():
+    """
+    testing that expired entries are not served
+    """
+    cache = memory_cache(ttl=-1)
+    cache.put("a", FakeSpectrum(10))
+    assert cache.get("a") is None
+
+
+class StoringSpectrum(FakeSpectrum):
+    """FakeSpectrum written to disk as its content, failing halfway if `fail`"""
+
+    def __init__(self, content, fail=False):
+        super().__init__(10)
+        self.content = content
+        self.fail = fail
+
+    def store(self, path, compress, if_exists_then):
+        with open(path, "wb") as f:
+            f.write(self.content[: len(self.content) // 2 if self.fail else None])
+        if self.fail:
+            raise OSError("disk full")
+
+
+def test_disk_tier_replaces_files_atomically(tmp_path):
+    """
+    testing that a cached file is only replaced by a complete one, and no temporary file is left
+    """
+    cache = SpectrumCache(directory=str(tmp_path), max_memory_bytes=0, max_disk_bytes=10**6, ttl=60)
+    cache.put("a", StoringSpectrum(b"first spectrum"))
+    cache.put("a", StoringSpectrum(b"second spectrum", fail=True))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["a.spec"]
+    assert (tmp_path / "a.spec").read_bytes() == b"first spectrum"
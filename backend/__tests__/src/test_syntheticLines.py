@@ -0,0 +1,66 @@
+""" testing syntheticLines.py """
+from unittest.mock import patch
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from src.models.payload import calcPayload
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.lineStore import LineStore, LineStoreRegistry
+from src.helpers.syntheticLines import build_synthetic_line_store, synthetic_line_chunks
+from __tests__.helpers.payload_data import payload_data
+
+
+def synthetic_payload():
+    return calcPayload(**{
+        **payload_data,
+        "database": "synthetic",
+        "use_simulate_slit": False,
+        "min_wavenumber_range": 2000,
+        "max_wavenumber_range": 2010,
+        "path_length_units": "u.cm",
+    })
+
+
+def test_synthetic_lines_are_reproducible(tmp_path):
+    """
+    testing that the same arguments give the same sorted lines, in the HITRAN columns
+    """
+    store = LineStore(build_synthetic_line_store("CO", 2500, 2000, 2100, seed=3, directory=str(tmp_path)))
+    chunks = list(synthetic_line_chunks("CO", 2000, 2100, 2500, seed=3, chunk_lines=1000))
+
+    assert store.count == 2500 and len(chunks) == 3
+    lines = store.lines(2000, 2100)
+    assert np.all(np.diff(lines.wav) >= 0)
+    assert {"wav", "int", "A", "airbrd", "selbrd", "El", "Tdpair", "Pshft", "gp"} <= set(lines.columns)
+    assert (lines.id == 5).all() and (lines.iso == 1).all()
+    rebuilt = LineStore(build_synthetic_line_store("CO", 2500, 2000, 2100, seed=3, directory=str(tmp_path)))
+    np.testing.assert_array_equal(rebuilt.lines(2000, 2100).int, lines.int)
+
+
+def test_calculate_spectrum_synthetic(tmp_path):
+    """
+    testing a calculation on the synthetic database, and the error when its lines are not built
+    """
+    build_synthetic_line_store("CO", 5000, 1950, 2050, directory=str(tmp_path))
+    with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", True):
+        payload = synthetic_payload()
+        with patch("src.helpers.calculateSpectrum.line_stores", LineStoreRegistry(str(tmp_path))), \
+                patch("src.helpers.calculateSpectrum.spectrum_cache.get", return_value=None), \
+                patch("src.helpers.calculateSpectrum.spectrum_cache.put"):
+            spectrum = calculate_spectrum(payload)
+            w, absorbance = spectrum.get("absorbance", wunit="cm-1")
+            assert w[0] == pytest.approx(2000) and absorbance.max() > 0
+            assert spectrum.conditions["lines_calculated"] == pytest.approx(500, rel=0.2)
+
+            payload.species[0].molecule = "CO2"
+            with pytest.raises(ValueError, match="build_synthetic_lines"):
+                calculate_spectrum(payload)
+
+
+def test_synthetic_database_disabled():
+    """
+    testing that the synthetic database is refused unless enabled
+    """
+    with patch("src.models.payload.SYNTHETIC_DATABASE_ENABLED", False):
+        with pytest.raises(ValidationError):
+            synthetic_payload()
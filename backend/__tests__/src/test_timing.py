@@ -0,0 +1,55 @@
+""" testing timing.py """
+from unittest.mock import MagicMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from src.main import app
+from src.helpers.timing import span, start_request, server_timing
+from __tests__.helpers.payload_data import payload_data
+
+client = TestClient(app)
+
+
+def fake_calculate_spectrum(payload, slit_unit=None):
+    """A 5-point spectrum, with a timed phase like the calculation ones"""
+    with span("eq_spectrum", molecule="CO") as timing:
+        timing["lines"] = 12
+    mock_spectrum = MagicMock()
+    mock_spectrum.__len__.return_value = 5
+    mock_spectrum.get_waveunit.return_value = "cm-1"
+    mock_spectrum.units = {"absorbance": "default"}
+    mock_spectrum.get.return_value = (np.linspace(2000, 2000.4, 5), np.ones(5))
+    return mock_spectrum
+
+
+def test_span_and_server_timing():
+    """
+    testing that spans record their attributes and format as Server-Timing
+    """
+    spans = start_request()
+    with span("fetch_databank", molecule="CO") as timing:
+        timing["lines"] = 1234
+    assert spans[0]["name"] == "fetch_databank" and spans[0]["lines"] == 1234
+    spans[0]["dur"] = 12.345
+    assert server_timing(spans) == 'fetch_databank;dur=12.3;desc="molecule=CO, lines=1234"'
+
+
+@patch("src.routes.calculateSpectrum.calculate_spectrum", fake_calculate_spectrum)
+def test_calc_spectrum_server_timing():
+    """
+    testing that /calculate-spectrum returns the phases of the worker and of the route
+    """
+    response = client.post("/calculate-spectrum", json={**payload_data, "use_simulate_slit": False})
+
+    assert response.status_code == 200
+    phases = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert phases[:2] == ["queue", "eq_spectrum"]
+    assert {"arrays", "downsample", "encode"} <= set(phases)
+    assert phases[-1] == "total"
+    assert 'desc="molecule=CO, lines=12"' in response.headers["Server-Timing"]
+
+
+def test_no_server_timing_without_phases():
+    """
+    testing that requests without timed phases get no Server-Timing header
+    """
+    assert "Server-Timing" not in client.get("/").headers
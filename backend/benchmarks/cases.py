@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark cases: each one has an untimed `setup` (clearing the caches, so that
+every repetition does the whole work) whose result is passed to the timed `run`.
+`run` returns the sizes of what it did, recorded with the timings.
+"""
+
+import os
+import copy
+import tempfile
+from typing import Callable, NamedTuple
+from src.models.payload import calcPayload, fitPayload
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.fitSpectrum import fit_spectrum
+from src.helpers.spectrumCache import spectrum_cache
+from src.helpers.factoryPool import factory_pool
+from src.helpers.spectrumData import get_spectrum_arrays, arrays_to_spectrum_data
+from src.helpers.wireFormat import encode_response
+
+
+class Case(NamedTuple):
+    name: str
+    description: str
+    setup: Callable
+    run: Callable
+
+
+def calc_payload(wmin, wmax, species=(("CO", 0.1),), database="hitran", **conditions):
+    """A /calculate-spectrum payload in cm-1 on the local line lists."""
+    return calcPayload(**{
+        "species": [{"molecule": molecule, "mole_fraction": mole_fraction} for molecule, mole_fraction in species],
+        "mode": "absorbance",
+        "database": database,
+        "tgas": 1000,
+        "min_wavenumber_range": wmin,
+        "max_wavenumber_range": wmax,
+        "pressure": 1,
+        "path_length": 1,
+        "use_simulate_slit": False,
+        "simulate_slit": 5,
+        "wavelength_units": "1/u.cm",
+        "path_length_units": "u.cm",
+        "pressure_units": "u.bar",
+        **conditions,
+    })
+
+
+def clear_caches():
+    spectrum_cache.clear()
+    factory_pool.clear()
+
+
+def spectrum_sizes(spectrum):
+    return {"points": len(spectrum), "lines": spectrum.conditions.get("lines_calculated")}
+
+
+def calculation_case(name, description, payload, slit_unit=None):
+    def setup():
+        clear_caches()
+        return payload
+
+    def run(payload):
+        return spectrum_sizes(calculate_spectrum(payload, slit_unit))
+
+    return Case(name, description, setup, run)
+
+
+_spectra = {}
+
+
+def computed_spectrum(payload):
+    """Spectrum of a payload, calculated once for the cases that start from it."""
+    key = payload.model_dump_json()
+    if key not in _spectra:
+        clear_caches()
+        _spectra[key] = calculate_spectrum(payload)
+    return _spectra[key]
+
+
+def slit_case():
+    payload = calc_payload(2050, 2150)
+
+    def setup():
+        return copy.deepcopy(computed_spectrum(payload))
+
+    def run(spectrum):
+        spectrum.apply_slit(1, "cm-1")
+        return {"points": len(spectrum)}
+
+    return Case("apply_slit", "1 cm-1 slit on a CO spectrum of 2050-2150 cm-1", setup, run)
+
+
+def serialization_case(name, accept):
+    payload = calc_payload(2000, 2300)
+
+    def setup():
+        return computed_spectrum(payload)
+
+    def run(spectrum):
+        x, y = get_spectrum_arrays(spectrum, payload.mode, payload.wavelength_units)
+        data = arrays_to_spectrum_data(x, y, spectrum.units[payload.mode], len(spectrum))
+        response = encode_response(data, accept)
+        return {"points": len(x), "bytes": len(response.body)}
+
+    return Case(name, f"Response of a CO spectrum of 2000-2300 cm-1 as {accept}", setup, run)
+
+
+def fit_case():
+    true_payload = calc_payload(2100, 2150, tgas=1100)
+    payload = fitPayload(**{
+        "fit_properties": {"method": "least_squares", "fit_var": "absorbance", "normalize": False,
+                           "max_loops": 100, "tol": 1e-15},
+        "bounding_ranges": {"tgas": {"min": 300, "max": 2000}},
+        "fit_parameters": {"tgas": 700.0},
+        "experimental_conditions": {
+            "min_wavenumber_range": 2100,
+            "max_wavenumber_range": 2150,
+            "specie": {"molecule": "CO", "mole_fraction": 0.1, "is_all_isotopes": False},
+            "pressure": 1.0,
+            "path_length": 1.0,
+            "use_simulate_slit": False,
+            "mode": "absorbance",
+            "database": "hitran",
+            "wavelength_units": "1/u.cm",
+            "pressure_units": "u.bar",
+            "path_length_units": "u.cm",
+        },
+    })
+    content = []
+
+    def setup():
+        if not content:
+            # the "experimental" spectrum: a calculated one, as a .spec file
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "experimental.spec")
+                computed_spectrum(true_payload).store(path, compress=False)
+                with open(path, "rb") as f:
+                    content.append(f.read())
+        clear_caches()
+        return payload.model_copy(deep=True)
+
+    def run(payload):
+        _, s_best, log = fit_spectrum(payload, content[0], "experimental.spec")
+        return {"points": len(s_best), "fit_vals": log["fit_vals"][-1], "loops": len(log["residual"])}
+
+    return Case("fit_spectrum", "Tgas fit of a CO absorbance spectrum of 2100-2150 cm-1", setup, run)
+
+
+CASES = [
+    calculation_case("calc_small", "CO, 2100-2110 cm-1", calc_payload(2100, 2110)),
+    calculation_case("calc_medium", "CO, 2050-2150 cm-1", calc_payload(2050, 2150)),
+    calculation_case("calc_large", "CO, 2000-2300 cm-1", calc_payload(2000, 2300)),
+    calculation_case(
+        "calc_multi_species", "CO and H2O merged, 2000-2100 cm-1",
+        calc_payload(2000, 2100, species=(("CO", 0.1), ("H2O", 0.1))),
+    ),
+    calculation_case(
+        "calc_noneq", "CO out of equilibrium (Tvib 2000 K, Trot 300 K), 2050-2150 cm-1",
+        calc_payload(2050, 2150, tvib=2000, trot=300),
+    ),
+    calculation_case(
+        "calc_synthetic", "Synthetic CO lines (a fifth of --synthetic-lines), 2000-2100 cm-1",
+        calc_payload(2000, 2100, database="synthetic"),
+    ),
+    slit_case(),
+    serialization_case("serialize_json", "application/json"),
+    serialization_case("serialize_binary", "application/octet-stream"),
+    fit_case(),
+]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Local line lists of the benchmarks: the HITRAN fragments shipped with radis
+and synthetic CO lines, written as line stores (see src/helpers/lineStore.py)
+so that calculations and fits read them instead of downloading the databases.
+"""
+
+import os
+from contextlib import contextmanager
+from unittest.mock import patch
+import radis
+from radis import SpectrumFactory
+from src.helpers.lineStore import line_store_name, line_stores, load_lines, write_line_store
+from src.helpers.syntheticLines import build_synthetic_line_store
+
+RADIS_TEST_FILES = os.path.join(os.path.dirname(radis.__file__), "test", "files")
+
+# molecule -> HITRAN file of the radis tests, its range (cm-1) and whether its
+# lines are stored for non-equilibrium calculations too
+LOCAL_LINE_LISTS = {
+    "CO": ("hitran_co_3iso_2000_2300cm.par", 2000, 2300, True),
+    "H2O": ("hitran_2016_H2O_2iso_2000_2100cm.par", 2000, 2100, False),
+}
+# range (cm-1) of the synthetic CO lines
+SYNTHETIC_RANGE = (1900, 2400)
+
+
+def build_local_line_stores(directory, synthetic_lines=10**6):
+    """Write the local line lists as isotope 1 line stores in `directory`."""
+    for molecule, (file_name, wmin, wmax, noneq) in LOCAL_LINE_LISTS.items():
+        for load_columns in ("equilibrium", "noneq") if noneq else ("equilibrium",):
+            sf = SpectrumFactory(wmin=wmin, wmax=wmax, wunit="cm-1", molecule=molecule, isotope="1", verbose=0)
+            sf.load_databank(
+                path=os.path.join(RADIS_TEST_FILES, file_name),
+                format="hitran",
+                parfuncfmt="hapi",
+                load_columns=load_columns,
+            )
+            name = line_store_name("hitran", molecule, "1", load_columns)
+            write_line_store([(sf.df0, (wmin, wmax))], os.path.join(directory, name))
+    if synthetic_lines:
+        build_synthetic_line_store("CO", synthetic_lines, *SYNTHETIC_RANGE, seed=0, directory=directory)
+
+
+def fetch_local_databank(sf, source="hitran", database="default", load_columns="equilibrium", **kwargs):
+    """`SpectrumFactory.fetch_databank` reading the line stores only: never downloads."""
+    store = line_stores.get(source, sf.input.species, str(sf.input.isotope), load_columns)
+    wmin, wmax = sf.params.wavenum_min_calc, sf.params.wavenum_max_calc
+    if store is None or not store.covers(wmin, wmax):
+        raise ValueError(f"No local {source} lines of {sf.input.species} on {wmin:.2f}-{wmax:.2f} cm-1")
+    load_lines(sf, store.lines(wmin, wmax), source)
+
+
+@contextmanager
+def offline_databanks():
+    """
+    Make every SpectrumFactory of this process (e.g. the ones of radis' fitting)
+    load its lines from the line stores instead of fetching them.
+    """
+    with patch.object(SpectrumFactory, "fetch_databank", fetch_local_databank):
+        yield
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Replay a mix of calculation and fitting requests against the FastAPI app at a
+set concurrency, and report throughput, latency percentiles, errors and the
+peak memory of the server and its calculation workers.
+
+Run from the backend directory, against a server started for the test (synthetic
+lines, fresh cache, settings given with --env) or an already running one:
+    python -m benchmarks.loadtest --start-server --concurrency 8 --duration 60 --env EXECUTOR_MAX_WORKERS=4
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --mix recorded.jsonl --requests 500 --output load.json
+
+The mix is a JSON list (or JSON lines, e.g. recorded requests) of entries:
+    {"name": "calc", "weight": 2, "path": "/calculate-spectrum", "payload": {...},
+     "vary": {"tgas": [300, 3000]}, "params": {"points": 1000}, "headers": {"Accept": "..."}}
+`vary` draws each request's value of these (dotted) payload fields uniformly in
+the range, so that requests do not all hit the spectrum cache. Fitting entries
+give the experimental spectrum in `file` (relative to the mix file), sent with
+the payload as the /fit-spectrum form.
+The default mix (benchmarks/loadtest_mix.json) calculates on the synthetic
+database only, so that the test needs no download.
+
+Memory and queue depth are read from the server's /metrics once per second;
+with several uvicorn workers, each scrape reports the process that answers it.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import httpx
+import numpy as np
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = os.path.join(BACKEND_DIRECTORY, "benchmarks", "loadtest_mix.json")
+
+
+def load_mix(path):
+    """Entries of a mix file (JSON list or JSON lines), with their defaults and files read."""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for entry in entries:
+        if "path" not in entry or "payload" not in entry:
+            raise ValueError(f"Mix entries need a path and a payload: {entry}")
+        entry.setdefault("name", entry["path"])
+        entry.setdefault("weight", 1)
+        if entry.get("file"):
+            file_path = os.path.join(os.path.dirname(os.path.abspath(path)), entry["file"])
+            with open(file_path, "rb") as f:
+                entry["file_content"] = f.read()
+    return entries
+
+
+def render_payload(entry, rng):
+    """The entry's payload with its `vary` fields drawn by `rng`."""
+    payload = json.loads(json.dumps(entry["payload"]))
+    for field, (low, high) in entry.get("vary", {}).items():
+        *parents, key = field.split(".")
+        target = payload
+        for parent in parents:
+            target = target[int(parent)] if isinstance(target, list) else target[parent]
+        target[key] = round(rng.uniform(low, high), 3)
+    return payload
+
+
+def request_arguments(entry, payload):
+    """httpx.request keyword arguments of one request of the entry."""
+    arguments = {"params": entry.get("params"), "headers": entry.get("headers")}
+    if "file_content" in entry:
+        arguments["data"] = {"data": json.dumps(payload)}
+        arguments["files"] = {"file": (os.path.basename(entry["file"]), entry["file_content"])}
+    else:
+        arguments["json"] = payload
+    return arguments
+
+
+def response_error(response):
+    """Kind of error of a response, or None: the routes answer some errors with 200 and {"error": ...}."""
+    if response.status_code >= 400:
+        return f"http {response.status_code}"
+    if response.content[:9] == b'{"error":':
+        try:
+            return "error: " + str(response.json()["error"])[:80]
+        except ValueError:
+            return "error"
+    return None
+
+
+async def replay(client, entries, rng, stop_at, budget, records):
+    """One client: send requests of the mix one after the other until the duration or budget is spent."""
+    weights = [entry["weight"] for entry in entries]
+    while time.perf_counter() < stop_at and budget():
+        entry = rng.choices(entries, weights)[0]
+        arguments = request_arguments(entry, render_payload(entry, rng))
+        start = time.perf_counter()
+        try:
+            response = await client.post(entry["path"], **arguments)
+            error = response_error(response)
+            size = len(response.content)
+        except httpx.HTTPError as exc:
+            error = f"exception: {type(exc).__name__}"
+            size = 0
+        records.append({
+            "name": entry["name"],
+            "latency": time.perf_counter() - start,
+            "error": error,
+            "bytes": size,
+        })
+
+
+def parse_metrics(text):
+    """Resident memory and queue depth samples of a /metrics answer."""
+    sample = {"server": 0, "workers": [], "queue_depth": 0}
+    for line in text.splitlines():
+        if line.startswith("process_resident_memory_bytes "):
+            sample["server"] = float(line.split()[-1])
+        elif line.startswith("radis_worker_resident_memory_bytes{"):
+            sample["workers"].append(float(line.split()[-1]))
+        elif line.startswith("radis_executor_queue_depth "):
+            sample["queue_depth"] = float(line.split()[-1])
+    return sample
+
+
+async def watch_metrics(client, stop, peaks, interval=1.0):
+    """Keep the peak memory and queue depth reported by /metrics until `stop` is set."""
+    while not stop.is_set():
+        try:
+            sample = parse_metrics((await client.get("/metrics")).text)
+        except httpx.HTTPError:
+            sample = None
+        if sample is not None:
+            peaks["server"] = max(peaks["server"], sample["server"])
+            peaks["worker_max"] = max([peaks["worker_max"], *sample["workers"]])
+            peaks["total"] = max(peaks["total"], sample["server"] + sum(sample["workers"]))
+            peaks["queue_depth"] = max(peaks["queue_depth"], sample["queue_depth"])
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def latency_stats(latencies):
+    if not latencies:
+        return None
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "mean": float(np.mean(latencies)), "max": max(latencies)}
+
+
+def summarize(records, elapsed):
+    """Throughput, latency percentiles (s) and errors of the requests, overall and per mix entry."""
+    errors = [record["error"] for record in records if record["error"]]
+    by_kind = {}
+    for error in errors:
+        by_kind[error] = by_kind.get(error, 0) + 1
+    by_name = {}
+    for name in sorted({record["name"] for record in records}):
+        own = [record for record in records if record["name"] == name]
+        by_name[name] = {
+            "requests": len(own),
+            "errors": sum(1 for record in own if record["error"]),
+            "latency": latency_stats([record["latency"] for record in own]),
+        }
+    return {
+        "requests": len(records),
+        "elapsed": elapsed,
+        "throughput": len(records) / elapsed if elapsed else 0.0,
+        "errors": len(errors),
+        "error_rate": len(errors) / len(records) if records else 0.0,
+        "errors_by_kind": by_kind,
+        "latency": latency_stats([record["latency"] for record in records]),
+        # only successful responses: errors are often fast
+        "latency_ok": latency_stats([record["latency"] for record in records if not record["error"]]),
+        "bytes": sum(record["bytes"] for record in records),
+        "by_name": by_name,
+    }
+
+
+async def run_load(url, entries, concurrency, duration=None, max_requests=None, seed=0, timeout=600,
+                   transport=None):
+    """Replay `entries` with `concurrency` clients for `duration` seconds or `max_requests` requests."""
+    records = []
+    sent = [0]
+
+    def budget():
+        if max_requests is None:
+            return True
+        sent[0] += 1
+        return sent[0] <= max_requests
+
+    peaks = {"server": 0, "worker_max": 0, "total": 0, "queue_depth": 0}
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits, transport=transport) as client:
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(watch_metrics(client, stop, peaks))
+        start = time.perf_counter()
+        stop_at = start + duration if duration else float("inf")
+        await asyncio.gather(*(
+            replay(client, entries, random.Random(seed + index), stop_at, budget, records)
+            for index in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await watcher
+    summary = summarize(records, elapsed)
+    summary["peak_memory_bytes"] = {key: peaks[key] for key in ("server", "worker_max", "total")}
+    summary["peak_queue_depth"] = peaks["queue_depth"]
+    return summary
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(workers=1, env=None, synthetic_lines=10**6, ready_timeout=300):
+    """
+    Start uvicorn on the app with a fresh spectrum cache and, if `synthetic_lines`,
+    a synthetic CO line store; yields its URL and stops it on exit.
+    """
+    with tempfile.TemporaryDirectory(prefix="radis-loadtest-") as directory:
+        server_env = {
+            **os.environ,
+            "LINE_STORE_DIRECTORY": os.path.join(directory, "LINE_STORE"),
+            "SPECTRUM_CACHE_DIRECTORY": os.path.join(directory, "SPECTRUM_CACHE"),
+            "JOB_RESULTS_DIRECTORY": os.path.join(directory, "JOB_RESULTS"),
+            "SYNTHETIC_DATABASE": "true",
+            **(env or {}),
+        }
+        if synthetic_lines:
+            from src.helpers.syntheticLines import build_synthetic_line_store
+            print(f" >> Generating {synthetic_lines} synthetic CO lines")
+            build_synthetic_line_store("CO", synthetic_lines, 1900, 2400, directory=server_env["LINE_STORE_DIRECTORY"])
+
+        port = free_port()
+        log_path = os.path.join(directory, "server.log")
+        with open(log_path, "wb") as log:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", str(workers)],
+                cwd=BACKEND_DIRECTORY, env=server_env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.time() + ready_timeout
+            while True:
+                if server.poll() is not None:
+                    with open(log_path, errors="replace") as log:
+                        raise RuntimeError(f"The server exited:\n{log.read()[-2000:]}")
+                try:
+                    if httpx.get(f"{url}/ready").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.time() > deadline:
+                    raise RuntimeError("The server did not get ready in time")
+                time.sleep(0.5)
+            yield url
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+def print_summary(summary):
+    latency = summary["latency"] or {}
+    print(f" >> {summary['requests']} requests in {summary['elapsed']:.1f} s: {summary['throughput']:.2f} req/s")
+    if latency:
+        print("    latency p50 {p50:.3f} s, p95 {p95:.3f} s, p99 {p99:.3f} s, max {max:.3f} s".format(**latency))
+    print(f"    errors {summary['errors']} ({summary['error_rate']:.1%}) {summary['errors_by_kind']}")
+    for name, item in summary["by_name"].items():
+        p95 = item["latency"]["p95"] if item["latency"] else float("nan")
+        print(f"    {name}: {item['requests']} requests, {item['errors']} errors, p95 {p95:.3f} s")
+    memory = summary["peak_memory_bytes"]
+    print(f"    peak memory: server {memory['server'] / 1e6:.0f} MB, largest worker {memory['worker_max'] / 1e6:.0f} MB, "
+          f"total {memory['total'] / 1e6:.0f} MB; peak queue depth {summary['peak_queue_depth']:.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="requests to replay (JSON list or JSON lines)")
+    parser.add_argument("--url", help="server to load (default: start one, see --start-server)")
+    parser.add_argument("--start-server", action="store_true", help="start a local uvicorn for the test")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="setting of the started server, e.g. EXECUTOR_MAX_WORKERS=4 (repeatable)")
+    parser.add_argument("--synthetic-lines", type=float, default=1e6,
+                        help="synthetic CO lines (1900-2400 cm-1) of the started server, 0 for none")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, help="seconds of load (default 60 unless --requests)")
+    parser.add_argument("--requests", type=int, help="number of requests to send")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request choice and variations")
+    parser.add_argument("--timeout", type=float, default=600, help="request timeout (s)")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+    if args.url and args.start_server:
+        parser.error("--url and --start-server are exclusive")
+    duration = args.duration if args.duration or args.requests else 60
+
+    entries = load_mix(args.mix)
+    settings = dict(item.split("=", 1) for item in args.env)
+
+    def load(url):
+        print(f" >> {len(entries)} request kinds, {args.concurrency} concurrent clients, against {url}")
+        return asyncio.run(run_load(url, entries, args.concurrency, duration, args.requests, args.seed, args.timeout))
+
+    if args.url:
+        summary = load(args.url)
+    else:
+        with local_server(args.workers, settings, int(args.synthetic_lines)) as url:
+            summary = load(url)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "mix": args.mix,
+        "url": args.url,
+        "server": None if args.url else {"workers": args.workers, "env": settings},
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        **summary,
+    }
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f" >> Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the calculation, slit, serialization and fitting code on local line
+lists (radis' HITRAN fragments and synthetic lines, no download), and compare
+the results with a stored baseline.
+
+Run from the backend directory:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline baseline.json --threshold 0.2
+    python -m benchmarks.run --save-baseline baseline.json
+
+Results are JSON: per benchmark the time of each repetition (s), their
+statistics, the median time of each Server-Timing phase and the sizes involved.
+With --baseline, benchmarks whose median is more than `threshold` slower than
+the baseline one are reported as regressions, and the exit code is 1.
+Baselines are only comparable on the same machine.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timezone
+
+
+def configure_environment(directory):
+    """Point the caches and line stores of the server code to `directory`; before importing it."""
+    os.environ["LINE_STORE_DIRECTORY"] = os.path.join(directory, "LINE_STORE")
+    os.environ["SPECTRUM_CACHE_DIRECTORY"] = os.path.join(directory, "SPECTRUM_CACHE")
+    os.environ["LOOKUP_TABLE_DIRECTORY"] = os.path.join(directory, "LOOKUP_TABLES")
+    os.environ["SYNTHETIC_DATABASE"] = "true"
+    # species worker processes would keep their own factory pools between repetitions
+    os.environ.setdefault("SPECIES_MAX_PARALLELISM", "1")
+
+
+def run_case(case, repeat, warmup):
+    from src.helpers.timing import start_request
+
+    times, phases, sizes = [], {}, {}
+    for index in range(warmup + repeat):
+        state = case.setup()
+        spans = start_request()
+        start = time.perf_counter()
+        sizes = case.run(state)
+        elapsed = time.perf_counter() - start
+        if index < warmup:
+            continue
+        times.append(elapsed)
+        for item in spans:
+            phases.setdefault(item["name"], []).append(item["dur"] / 1000)
+    return {
+        "description": case.description,
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        # per repetition: the sum of the phase spans, which may repeat (one per species)
+        "phases": {name: statistics.median(values) * len(values) / repeat for name, values in phases.items()},
+        "sizes": sizes,
+    }
+
+
+def environment():
+    import numpy
+    import radis
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "radis": radis.__version__,
+        "numpy": numpy.__version__,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Median time ratio to the baseline of each benchmark run in both, and the regressions."""
+    comparison = {}
+    for name, result in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            continue
+        ratio = result["median"] / reference["median"]
+        comparison[name] = {
+            "baseline_median": reference["median"],
+            "median": result["median"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        }
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions of each benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed repetitions first (imports, numba...)")
+    parser.add_argument("--synthetic-lines", type=float, default=1e6, help="synthetic CO lines on 1900-2400 cm-1")
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="radis-benchmarks-") as directory:
+        configure_environment(directory)
+        from benchmarks.linelists import build_local_line_stores, offline_databanks
+        from benchmarks.cases import CASES
+
+        build_local_line_stores(os.environ["LINE_STORE_DIRECTORY"], int(args.synthetic_lines))
+        cases = [case for case in CASES if not args.only or case.name in args.only]
+        results = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "environment": environment(),
+            "repeat": args.repeat,
+            "synthetic_lines": int(args.synthetic_lines),
+            "benchmarks": {},
+        }
+        with offline_databanks():
+            for case in cases:
+                print(f" >> {case.name}: {case.description}")
+                result = results["benchmarks"][case.name] = run_case(case, args.repeat, args.warmup)
+                print(f"    median {result['median']:.4f} s, min {result['min']:.4f} s, {result['sizes']}")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results["baseline"] = {
+            "path": args.baseline,
+            "environment": baseline.get("environment"),
+            "threshold": args.threshold,
+            "comparison": compare(results, baseline, args.threshold),
+        }
+        for name, item in results["baseline"]["comparison"].items():
+            flag = "REGRESSION" if item["regression"] else "ok"
+            print(f" >> {name}: {item['ratio']:.2f}x baseline ({item['median']:.4f} s) {flag}")
+        if any(item["regression"] for item in results["baseline"]["comparison"].values()):
+            exit_code = 1
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=1)
+            print(f" >> Results written to {path}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
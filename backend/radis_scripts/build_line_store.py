@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Store the HITEMP CO2 and H2O lines as sorted, memory-mapped columns, so that
+calculations read their window by binary search instead of the HDF5 files.
+
+Run from the backend directory: python -m radis_scripts.build_line_store
+Stores are written to LINE_STORE_DIRECTORY (see src/constants/constants.py).
+"""
+
+from src.helpers.lineStore import build_line_store
+
+# fetched range by range to keep memory usage low
+RANGES = [(k, k + 1000) for k in range(0, 12000, 1000)]
+
+for molecule in ["CO2", "H2O"]:
+    for load_columns in ["equilibrium", "noneq"]:
+        print("Building line store of ", molecule, load_columns)
+        build_line_store("hitemp", molecule, RANGES, isotope="1", load_columns=load_columns)
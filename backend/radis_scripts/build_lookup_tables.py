@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Precompute absorption coefficient lookup tables of the standard species, used by
+`fast` calculations to answer common requests without a line-by-line calculation.
+
+Run from the backend directory: python -m radis_scripts.build_lookup_tables
+Tables are written to LOOKUP_TABLE_DIRECTORY (see src/constants/constants.py).
+"""
+
+import numpy as np
+from src.helpers.lookupTables import build_lookup_table
+
+TGAS = np.arange(300, 3001, 100)  # K
+PRESSURE = [0.01, 0.03, 0.1, 0.3, 1, 3, 10]  # bar
+WSTEP = 0.01  # cm-1
+
+# molecule -> HITRAN ranges (cm-1) of its strongest bands
+STANDARD_TABLES = {
+    "CO": [(1900, 2300), (4150, 4350)],
+    "CO2": [(2200, 2400), (3500, 3800)],
+    "H2O": [(1300, 1900), (3500, 4000)],
+    "CH4": [(1200, 1400), (2850, 3150)],
+}
+
+for molecule, ranges in STANDARD_TABLES.items():
+    for (wmin, wmax) in ranges:
+        print("Building lookup table of ", molecule, wmin, wmax)
+        build_lookup_table(molecule, "hitran", wmin, wmax, TGAS, PRESSURE, WSTEP)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Generate a synthetic line list, served as the `synthetic` database when
+SYNTHETIC_DATABASE is enabled, to stress-test calculations offline.
+
+Run from the backend directory:
+    python -m radis_scripts.build_synthetic_lines CO --lines 1e6 [--wmin 500 --wmax 10000] [--seed 0]
+Lines are random but reproducible (same arguments, same lines), isotope 1, with
+the HITRAN columns. They are written in chunks as a line store in
+LINE_STORE_DIRECTORY (see src/constants/constants.py): 10^8 lines take about 7 GB.
+"""
+
+import argparse
+from src.helpers.syntheticLines import build_synthetic_line_store
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("molecules", nargs="+", help="molecules (HITRAN names, for their partition functions)")
+parser.add_argument("--lines", type=float, default=1e6, help="number of lines of each molecule, 1e3 to 1e8")
+parser.add_argument("--wmin", type=float, default=500, help="minimum wavenumber (cm-1)")
+parser.add_argument("--wmax", type=float, default=10000, help="maximum wavenumber (cm-1)")
+parser.add_argument("--seed", type=int, default=0, help="random seed")
+args = parser.parse_args()
+
+if not 1e3 <= args.lines <= 1e8:
+    parser.error("--lines must be between 1e3 and 1e8")
+for molecule in args.molecules:
+    print("Generating synthetic lines of ", molecule)
+    path = build_synthetic_line_store(molecule, int(args.lines), args.wmin, args.wmax, args.seed)
+    print(" >> Written to", path)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Download, parse & cache the line databases listed in the prefetch manifest, so
+that the first calculation of a molecule does not pay for it.
+
+Run from the backend directory: python -m radis_scripts.prefetch [--force] [--workers N]
+Interrupted runs resume: entries whose cached files are intact are skipped.
+The server runs the same prefetch at startup when PREFETCH_ON_STARTUP is set.
+"""
+
+import argparse
+from src.helpers.prefetch import load_manifest, prefetch
+from src.constants.constants import PREFETCH_MANIFEST, PREFETCH_STATE_PATH, PREFETCH_WORKERS
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--manifest", default=PREFETCH_MANIFEST, help="prefetch manifest (JSON)")
+parser.add_argument("--state", default=PREFETCH_STATE_PATH, help="progress file used to resume")
+parser.add_argument("--workers", type=int, default=PREFETCH_WORKERS, help="databanks fetched in parallel")
+parser.add_argument("--force", action="store_true", help="fetch again entries already cached")
+args = parser.parse_args()
+
+summary = prefetch(load_manifest(args.manifest), workers=args.workers, state_path=args.state, force=args.force)
+print(f"Fetched {len(summary['fetched'])}, skipped {len(summary['skipped'])}, failed {len(summary['failed'])}")
+for key in summary["failed"]:
+    print("  failed:", key)
+raise SystemExit(1 if summary["failed"] else 0)
@@ -1,3 +1,84 @@
-# create the folder in server for better organization
-DOWNLOADED_SPECFILES_DIRECTORY = "DOWNLOADED_SPECFILES"
-DOWNLOADED_TXT_DIRECTORY = "DOWNLOADED_TXT"
+import os
+
+# spectrum result cache (memory LRU tier + on-disk tier of .spec files)
+# a size of 0 disables the corresponding tier
+SPECTRUM_CACHE_DIRECTORY = os.environ.get("SPECTRUM_CACHE_DIRECTORY", "SPECTRUM_CACHE")
+SPECTRUM_CACHE_MAX_MEMORY_BYTES = int(os.environ.get("SPECTRUM_CACHE_MAX_MEMORY_BYTES", 512 * 1024**2))
+SPECTRUM_CACHE_MAX_DISK_BYTES = int(os.environ.get("SPECTRUM_CACHE_MAX_DISK_BYTES", 5 * 1024**3))
+# seconds before a cached spectrum is considered stale
+SPECTRUM_CACHE_TTL = float(os.environ.get("SPECTRUM_CACHE_TTL", 24 * 3600))
+# zoom pyramids stored next to the cached spectra: each level is this many times smaller
+SPECTRUM_PYRAMID_FACTOR = int(os.environ.get("SPECTRUM_PYRAMID_FACTOR", 4))
+# pyramids kept loaded in memory for pan/zoom requests
+SPECTRUM_PYRAMID_MEMORY_ENTRIES = int(os.environ.get("SPECTRUM_PYRAMID_MEMORY_ENTRIES", 8))
+
+# downloadable files (compressed .spec) cached under the payload hash
+ARTIFACT_CACHE_DIRECTORY = os.environ.get(
+    "ARTIFACT_CACHE_DIRECTORY", os.path.join(SPECTRUM_CACHE_DIRECTORY, "artifacts")
+)
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 1024**3))
+
+# precomputed absorption coefficient tables used by `fast` calculations
+# (built by radis_scripts/build_lookup_tables.py)
+LOOKUP_TABLE_DIRECTORY = os.environ.get("LOOKUP_TABLE_DIRECTORY", "LOOKUP_TABLES")
+
+# local line databases (sorted, memory-mapped columns) read instead of the radis loaders
+# (built by radis_scripts/build_line_store.py)
+LINE_STORE_DIRECTORY = os.environ.get("LINE_STORE_DIRECTORY", "LINE_STORE")
+# "synthetic" database of generated lines, for offline load and performance tests
+# (line stores built by radis_scripts/build_synthetic_lines.py)
+SYNTHETIC_DATABASE_ENABLED = os.environ.get("SYNTHETIC_DATABASE", "false").lower() in ("1", "true", "yes")
+
+# pool of SpectrumFactory objects with their databank loaded: budget (bytes of loaded lines)
+# of each calculation process, executor workers and species workers alike
+FACTORY_POOL_MAX_BYTES = int(os.environ.get("FACTORY_POOL_MAX_BYTES", 256 * 1024**2))
+
+# databank prefetch (radis_scripts/prefetch.py, and at startup if PREFETCH_ON_STARTUP is set)
+PREFETCH_MANIFEST = os.environ.get("PREFETCH_MANIFEST", os.path.join("radis_scripts", "prefetch_manifest.json"))
+# progress of the prefetch, so that an interrupted one resumes
+PREFETCH_STATE_PATH = os.environ.get("PREFETCH_STATE_PATH", "prefetch_state.json")
+# databanks fetched in parallel
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 4))
+PREFETCH_ON_STARTUP = os.environ.get("PREFETCH_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# executor running the CPU-bound radis work off the event loop
+# "process" (default) or "thread"
+EXECUTOR_KIND = os.environ.get("EXECUTOR_KIND", "process")
+EXECUTOR_MAX_WORKERS = int(os.environ.get("EXECUTOR_MAX_WORKERS", os.cpu_count() or 1))
+# calculations allowed to wait for a free worker before answering 503
+EXECUTOR_MAX_QUEUE = int(os.environ.get("EXECUTOR_MAX_QUEUE", 16))
+
+# species of a mixture (and range shards) computed concurrently in a process pool
+# of this many workers (1 computes them one by one). Every process of the executor
+# starts its own pool on its first mixture or sharded calculation, so with
+# EXECUTOR_KIND=process the server runs up to EXECUTOR_MAX_WORKERS * (1 + SPECIES_MAX_PARALLELISM)
+# calculation processes, each with its own factory pool (FACTORY_POOL_MAX_BYTES)
+SPECIES_MAX_PARALLELISM = int(os.environ.get("SPECIES_MAX_PARALLELISM", min(os.cpu_count() or 1, 4)))
+# split windows wider than this (cm-1) into shards (0 disables), computed in parallel by the
+# species workers if SPECIES_MAX_PARALLELISM > 1, one after the other otherwise
+SPECTRUM_SHARD_WIDTH = float(os.environ.get("SPECTRUM_SHARD_WIDTH", 0))
+# shards share this fixed grid step (cm-1) instead of radis' "auto" step, so they can be stitched
+SPECTRUM_SHARD_WSTEP = float(os.environ.get("SPECTRUM_SHARD_WSTEP", 0.01))
+# lineshape truncation (cm-1) of sharded calculations, also the overlap between shards
+SPECTRUM_SHARD_TRUNCATION = float(os.environ.get("SPECTRUM_SHARD_TRUNCATION", 50))
+
+# /calculate-spectrum/batch: maximum number of payloads, and payloads computed per worker call
+BATCH_MAX_PAYLOADS = int(os.environ.get("BATCH_MAX_PAYLOADS", 1000))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 16))
+
+# /calculate-spectrum/sweep: maximum number of conditions (product of the axes)
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 2000))
+
+# asynchronous jobs: "memory" or "sqlite" store, results kept as files
+JOB_STORE = os.environ.get("JOB_STORE", "memory")
+JOB_SQLITE_PATH = os.environ.get("JOB_SQLITE_PATH", "jobs.sqlite3")
+JOB_RESULTS_DIRECTORY = os.environ.get("JOB_RESULTS_DIRECTORY", "JOB_RESULTS")
+# seconds a finished job and its result are kept
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 24 * 3600))
+
+# per-request profiling of the worker calls, opted in with the X-Profile header;
+# disabled unless an admin token is set
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN") or None
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", "PROFILES")
+# seconds between two stacks of the sampling profiler
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
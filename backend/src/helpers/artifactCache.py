@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import NamedTuple
+from src.helpers.spectrumCache import payload_cache_key
+from src.constants.constants import (
+    ARTIFACT_CACHE_DIRECTORY,
+    ARTIFACT_CACHE_MAX_BYTES,
+    SPECTRUM_CACHE_TTL,
+)
+
+
+def artifact_key(payload, extension, slit_unit) -> str:
+    """
+    Hash of everything a downloaded file depends on: the cached spectrum (see
+    `payload_cache_key`), the slit applied before the download, the format,
+    and the mode and x units for the formats that depend on them.
+    """
+    key = {
+        "spectrum": payload_cache_key(payload),
+        "slit": [float(payload.simulate_slit), slit_unit] if payload.use_simulate_slit is True else None,
+        "extension": extension,
+        # .spec holds every quantity in its own units; JSON and CSV hold only `mode`
+        "mode": payload.mode if extension in (".json", ".csv") else None,
+        "wavelength_units": payload.wavelength_units if extension != ".spec" else None,
+    }
+    blob = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class Artifact(NamedTuple):
+    path: str
+    size: int
+    etag: str
+    filename: str
+
+
+class ArtifactCache:
+    """
+    Download files (e.g. compressed .spec) kept on disk under their artifact key.
+
+    Files are written under a unique temporary name and renamed into place, so
+    concurrent downloads never see a partial file. The least recently served
+    files are removed once they exceed `max_bytes`, and all after `ttl` seconds.
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, f"{key}{extension}")
+
+    def get(self, key, extension):
+        """Return the cached Artifact for `key`, or None."""
+        path = self._path(key, extension)
+        try:
+            stat = os.stat(path)
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if time.time() - stat.st_mtime > self.ttl:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        # refresh the access time used for LRU eviction
+        os.utime(path, (time.time(), stat.st_mtime))
+        with self._lock:
+            self.hits += 1
+        return Artifact(path, stat.st_size, f'"{key}"', meta["filename"])
+
+    def put(self, key, extension, filename, write):
+        """
+        Create the artifact with `write(tmp_path)` and return it.
+
+        `tmp_path` ends with `extension`, as radis appends it otherwise.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key, extension)
+        tmp_path = os.path.join(self.directory, f"tmp-{uuid.uuid4().hex}{extension}")
+        try:
+            write(tmp_path)
+            with open(f"{tmp_path}.json", "w") as f:
+                json.dump({"filename": filename}, f)
+            os.replace(f"{tmp_path}.json", f"{path}.json")
+            os.replace(tmp_path, path)
+        finally:
+            for leftover in (tmp_path, f"{tmp_path}.json"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        size = os.path.getsize(path)
+        self._evict(keep=path)
+        return Artifact(path, size, f'"{key}"', filename)
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                os.remove(entry.path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self, keep):
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("tmp-") or entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > self.ttl:
+                self._remove(entry.path)
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+        # least recently served first
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        for file_path in (path, f"{path}.json"):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+artifact_cache = ArtifactCache(
+    directory=ARTIFACT_CACHE_DIRECTORY,
+    max_bytes=ARTIFACT_CACHE_MAX_BYTES,
+    ttl=SPECTRUM_CACHE_TTL,
+)
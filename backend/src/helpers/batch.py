@@ -0,0 +1,129 @@
+import json
+import math
+import uuid
+import asyncio
+import radis
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.spectrumData import get_spectrum_data, get_modes_data
+from src.helpers.wireFormat import split_arrays, to_jsonable, encode_raw, DTYPES, META_HEADER
+from src.constants.constants import BATCH_CHUNK_SIZE
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MULTIPART_MEDIA_TYPE = "multipart/mixed"
+
+
+def batch_group_key(payload):
+    """Payloads with the same key need the same lines: same databank, species and range."""
+    return (
+        payload.database,
+        tuple(sorted((species.molecule, bool(species.is_all_isotopes)) for species in payload.species)),
+        payload.tvib is not None and payload.trot is not None,
+        payload.wavelength_units,
+        float(payload.min_wavenumber_range),
+        float(payload.max_wavenumber_range),
+    )
+
+
+def batch_chunks(payloads, max_workers, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Group the payloads by `batch_group_key` and split each group into chunks of
+    (index, payload) run by one worker call each.
+
+    A group is spread over at most `max_workers` chunks unless that exceeds
+    `chunk_size` payloads per chunk, so lines are loaded once per worker while
+    results still come back regularly.
+    """
+    groups = {}
+    for index, payload in enumerate(payloads):
+        groups.setdefault(batch_group_key(payload), []).append((index, payload))
+    chunks = []
+    for items in groups.values():
+        size = min(math.ceil(len(items) / max_workers), chunk_size)
+        chunks.extend(items[start:start + size] for start in range(0, len(items), size))
+    return chunks
+
+
+def run_batch_chunk(items, options=None):
+    """
+    Calculate a chunk of (index, payload) one after the other in one worker, so
+    they share the loaded databank. Returns one result dict per payload.
+    """
+    results = []
+    for index, payload in items:
+        if(payload.wavelength_units=="1/u.cm"):
+            slit_unit="cm-1"
+        else:
+            slit_unit="nm"
+        try:
+            spectrum = calculate_spectrum(payload, slit_unit)
+            if payload.modes:
+                data = get_modes_data(spectrum, payload.modes, payload.wavelength_units, options)
+            else:
+                data = get_spectrum_data(spectrum, payload.mode, payload.wavelength_units, options)
+            results.append({"index": index, "data": data})
+        except radis.misc.warning.EmptyDatabaseError:
+            results.append({"index": index, "error": "No line in the specified wavenumber range"})
+        except Exception as exc:
+            print("Error", exc)
+            results.append({"index": index, "error": str(exc)})
+    return results
+
+
+async def run_batch(executor, chunks, options=None, retry_delay=1.0):
+    """
+    Run the chunks on the executor, at most `max_workers` at a time, and yield
+    each result as soon as its chunk has finished: exactly one per payload.
+    """
+    semaphore = asyncio.Semaphore(executor.max_workers)
+
+    async def run_chunk(items):
+        async with semaphore:
+            try:
+                # the executor is shared with other requests: wait for a free slot
+                return await executor.run_retrying(run_batch_chunk, items, options, retry_delay=retry_delay)
+            except Exception as exc:
+                # the worker call itself failed (broken pool, pickling...): the response has
+                # started, so every payload of the chunk still gets its result, as an error
+                print("Error", exc)
+                return [{"index": index, "error": str(exc) or type(exc).__name__} for index, _ in items]
+
+    tasks = [asyncio.ensure_future(run_chunk(items)) for items in chunks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for result in await next_done:
+                yield result
+    finally:
+        # the client went away: do not start the remaining chunks
+        for task in tasks:
+            task.cancel()
+
+
+def encode_ndjson(result):
+    """One NDJSON line of a batch result."""
+    return (json.dumps(to_jsonable(result)) + "\n").encode()
+
+
+def multipart_boundary():
+    return uuid.uuid4().hex
+
+
+def encode_multipart(result, boundary, dtype=DTYPES["float64"]):
+    """
+    One part of a multipart/mixed batch response: the raw binary format of
+    src/helpers/wireFormat.py, or a JSON part for errors.
+    """
+    headers = [f"--{boundary}", f"X-Batch-Index: {result['index']}"]
+    if "error" in result:
+        headers.append("Content-Type: application/json")
+        body = json.dumps(result).encode()
+    else:
+        meta, arrays = split_arrays(result["data"])
+        headers.append("Content-Type: application/octet-stream")
+        headers.append(f"{META_HEADER}: {json.dumps({**meta, 'arrays': list(arrays)})}")
+        body = encode_raw(meta, arrays, dtype)
+    headers.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + body + b"\r\n"
+
+
+def multipart_end(boundary):
+    return f"--{boundary}--\r\n".encode()
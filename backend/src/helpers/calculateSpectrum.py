@@ -1,9 +1,28 @@
+import math
+import threading
+import multiprocessing
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import astropy.units as u 
 from  astropy.units import cds 
 from src.models.payload import calcPayload as Payload
 from radis import SpectrumFactory
 from radis.los.slabs import MergeSlabs
 from src.helpers.login_to_hitemp import setup_hitemp_credentials
+from src.helpers.spectrumCache import spectrum_cache, payload_cache_key
+from src.helpers.factoryPool import factory_pool
+from src.helpers.lineStore import LINE_STORE_DATABASES, line_stores, load_lines
+from src.helpers.lookupTables import lookup_table_store, lookup_spectrum
+from src.helpers.sharedArrays import arrays_to_shared, arrays_from_shared
+from src.helpers.timing import span, run_timed, add_spans
+from src.constants.constants import (
+    SPECIES_MAX_PARALLELISM,
+    SPECTRUM_SHARD_WIDTH,
+    SPECTRUM_SHARD_WSTEP,
+    SPECTRUM_SHARD_TRUNCATION,
+)
 
 # An arbitrary broadening formula as NIST databank requires `lbfunc`
 def broad_arbitrary(**kwargs):
@@ -13,72 +32,205 @@ def broad_arbitrary(**kwargs):
     return hwhm, shift
 
 
-def calculate_spectrum(payload: Payload):
-    """Calculate the spectrum using the RADIS library."""
+def calculate_spectrum(payload: Payload, slit_unit=None):
+    """
+    Calculate the spectrum using the RADIS library.
+
+    If `slit_unit` is given and the payload asks for it, the simulated slit is
+    applied as well, so the whole CPU-bound work can run in one executor call.
+    """
     print(">> Payload : ")
     print(payload)
-    
+
+    cache_key = payload_cache_key(payload)
+    with span("cache_get") as timing:
+        spectrum = spectrum_cache.get(cache_key)
+        timing["hit"] = spectrum is not None
+    if spectrum is not None:
+        print(" >> Spectrum served from cache")
+    elif payload.fast and (spectrum := _lookup_spectrum(payload)) is not None:
+        print(" >> Spectrum interpolated from lookup tables")
+    else:
+        spectrum = compute_spectrum(payload)
+        with span("cache_put"):
+            spectrum_cache.put(cache_key, spectrum)
+
+    if slit_unit is not None and payload.use_simulate_slit is True:
+        print(" >> Applying simulate slit")
+        with span("apply_slit", points=len(spectrum)):
+            spectrum.apply_slit(payload.simulate_slit, slit_unit)
+    return spectrum
+
+
+def _lookup_spectrum(payload: Payload):
+    """Equilibrium spectrum interpolated from the lookup tables, or None if they do not cover it."""
+    if payload.tvib is not None and payload.trot is not None:
+        return None
+    species = [
+        (species.molecule, "all" if species.is_all_isotopes else "1", species.mole_fraction)
+        for species in payload.species
+    ]
+    pressure = (payload.pressure * eval(payload.pressure_units)).to_value(u.bar)
+    path_length = (payload.path_length * eval(payload.path_length_units)).to_value(u.cm)
+    with span("lookup_table") as timing:
+        spectrum = lookup_spectrum(
+            lookup_table_store, species, payload.database, payload.tgas, pressure, path_length, _window_cm1(payload)
+        )
+        timing["hit"] = spectrum is not None
+    return spectrum
+
+
+def compute_spectrum(payload: Payload, wstep="auto"):
+    """
+    Run the line-by-line calculation for every species and merge them.
+
+    Not cached; `wstep` (cm-1) fixes the grid step instead of radis' "auto"
+    step, which depends on the conditions.
+    """
     if payload.database == "hitemp" or payload.database == "nist":
         setup_hitemp_credentials()
 
-
     # List of all species spectra to be merged later
-    s_list =[]
-    for species in payload.species:
-        generated_spectrum = None
-
-        # Conditions
-        load_columns='equilibrium'
-        spectrum_conditions = {}
-        if payload.tvib is not None and payload.trot is not None:
-            spectrum_conditions["Tvib"] = payload.tvib
-            spectrum_conditions["Trot"] = payload.trot
-            load_columns='noneq'
-        else:
-            spectrum_conditions["Tgas"] = payload.tgas
-        spectrum_conditions["mole_fraction"] = species.mole_fraction
-        spectrum_conditions["pressure"] = payload.pressure * eval(payload.pressure_units)
-        spectrum_conditions["path_length"] = payload.path_length * eval(payload.path_length_units)
-
-        # Options
-        spectrum_options={}
-        spectrum_options["wavenum_min"] = payload.min_wavenumber_range * eval(payload.wavelength_units)
-        spectrum_options["wavenum_max"] = payload.max_wavenumber_range * eval(payload.wavelength_units)
-        if(payload.wavelength_units=="1/u.cm"):
-            spectrum_options["waveunit"]="cm-1"
-        else:
-            spectrum_options["waveunit"]="nm"
-            
-        if payload.database == "nist":
-            spectrum_options["isotope"] = 0
-        elif species.is_all_isotopes:
-            spectrum_options["isotope"] = 'all'
-        else:
-            spectrum_options["isotope"] = '1'
-
-        spectrum_options["molecule"] = species.molecule
-        spectrum_options["dbformat"] = payload.database
-        spectrum_options["load_columns"] = load_columns
-
-        # 1. spectrum factory
-        sf = SpectrumFactory(
-        wmin=spectrum_options["wavenum_min"] ,
-        wmax=spectrum_options["wavenum_max"] ,
-        wunit=spectrum_options["waveunit"],
-        isotope=spectrum_options["isotope"],
-        molecule=spectrum_options["molecule"],
-        lbfunc=broad_arbitrary if payload.database == "nist" else None,
-        wstep="auto",
-        )
+    shards = _shard_windows(payload)
+    if SPECIES_MAX_PARALLELISM > 1 and (shards or len(payload.species) > 1):
+        s_list = _compute_species_parallel(payload, shards, wstep)
+    elif shards:
+        # without species workers, shards only bound the memory of one calculation
+        s_list = [_compute_species_sharded(payload, species, shards) for species in payload.species]
+    else:
+        s_list = [_compute_species(payload, species, wstep=wstep) for species in payload.species]
 
-        # 2. fetch databank
-        sf.fetch_databank(
-            source=spectrum_options["dbformat"],
-            load_columns=spectrum_options["load_columns"],
-            broadf_download=False,
-            ) 
+    with span("merge_slabs", slabs=len(s_list)) as timing:
+        spec = MergeSlabs(*s_list,resample="intersect")
+        timing["points"] = len(spec)
+    return spec
+
+
+class Shard(NamedTuple):
+    """Sub-window (cm-1) of a sharded calculation: computed on calc, kept on core."""
+    core_min: float
+    core_max: float
+    calc_min: float
+    calc_max: float
+
+
+def _shard_windows(payload: Payload):
+    """
+    Split a window wider than SPECTRUM_SHARD_WIDTH into shards, or return [].
+
+    Each shard is computed on its core extended by the line truncation on both
+    sides (lines further away do not reach the core), then cropped back to its
+    core. Bounds are multiples of the fixed shard wstep, so every shard lies on
+    the same grid and the cores are simply concatenated.
+    """
+    if SPECTRUM_SHARD_WIDTH <= 0:
+        return []
+    wmin, wmax = _window_cm1(payload)
+    n_shards = math.ceil((wmax - wmin) / SPECTRUM_SHARD_WIDTH)
+    if n_shards < 2:
+        return []
+    step = SPECTRUM_SHARD_WSTEP
+    first = math.floor(wmin / step)
+    last = math.ceil(wmax / step)
+    overlap = math.ceil(SPECTRUM_SHARD_TRUNCATION / step)
+    # edges in number of steps; only the lines inside the requested window are loaded,
+    # as in the unsharded calculation
+    edges = [first + round(i * (last - first) / n_shards) for i in range(n_shards + 1)]
+    shards = []
+    for lo, hi in zip(edges, edges[1:]):
+        shards.append(Shard(
+            core_min=lo * step,
+            core_max=hi * step,
+            calc_min=max(lo - overlap, first) * step,
+            calc_max=min(hi + overlap, last) * step,
+        ))
+    shards[0] = shards[0]._replace(core_min=wmin)
+    shards[-1] = shards[-1]._replace(core_max=wmax)
+    return shards
+
+
+def _crop_shard(spectrum, shard: Shard, is_last):
+    """Keep the core of a shard; internal edges belong to the next shard."""
+    w = spectrum._q["wavespace"]
+    tol = SPECTRUM_SHARD_WSTEP / 2
+    keep = w >= shard.core_min - tol
+    if is_last:
+        keep &= w <= shard.core_max + tol
+    else:
+        keep &= w < shard.core_max - tol
+    for name, array in spectrum._q.items():
+        spectrum._q[name] = array[keep]
+    return spectrum
+
+
+def _stitch_shards(parts):
+    """Concatenate the cropped shards of one species, in increasing wavenumber."""
+    spectrum = parts[0]
+    for name in list(spectrum._q):
+        spectrum._q[name] = np.concatenate([part._q[name] for part in parts])
+    w = spectrum._q["wavespace"]
+    spectrum.conditions["wavenum_min"] = float(w[0])
+    spectrum.conditions["wavenum_max"] = float(w[-1])
+    return spectrum
+
+
+def _compute_species(payload: Payload, species, shard: Shard = None, wstep="auto"):
+    """Spectrum of one species of the mixture, or of one shard of its window."""
+    generated_spectrum = None
+
+    # Conditions
+    load_columns='equilibrium'
+    spectrum_conditions = {}
+    if payload.tvib is not None and payload.trot is not None:
+        spectrum_conditions["Tvib"] = payload.tvib
+        spectrum_conditions["Trot"] = payload.trot
+        load_columns='noneq'
+    else:
+        spectrum_conditions["Tgas"] = payload.tgas
+    spectrum_conditions["mole_fraction"] = species.mole_fraction
+    spectrum_conditions["pressure"] = payload.pressure * eval(payload.pressure_units)
+    spectrum_conditions["path_length"] = payload.path_length * eval(payload.path_length_units)
+
+    # Options
+    spectrum_options={}
+    spectrum_options["wavenum_min"] = payload.min_wavenumber_range * eval(payload.wavelength_units)
+    spectrum_options["wavenum_max"] = payload.max_wavenumber_range * eval(payload.wavelength_units)
+    if(payload.wavelength_units=="1/u.cm"):
+        spectrum_options["waveunit"]="cm-1"
+    else:
+        spectrum_options["waveunit"]="nm"
+        
+    if payload.database == "nist":
+        spectrum_options["isotope"] = 0
+    elif species.is_all_isotopes:
+        spectrum_options["isotope"] = 'all'
+    else:
+        spectrum_options["isotope"] = '1'
+
+    spectrum_options["molecule"] = species.molecule
+    spectrum_options["dbformat"] = payload.database
+    spectrum_options["load_columns"] = load_columns
+    spectrum_options["wstep"] = wstep
+    spectrum_options["truncation"] = None
+
+    window = _window_cm1(payload)
+    if shard is not None:
+        # all shards on the same grid and with the truncation their overlap is sized from;
+        # shard bounds are in cm-1 whatever the payload units
+        window = shard.calc_min, shard.calc_max
+        spectrum_options["wavenum_min"] = shard.calc_min / u.cm
+        spectrum_options["wavenum_max"] = shard.calc_max / u.cm
+        spectrum_options["waveunit"] = "cm-1"
+        spectrum_options["wstep"] = SPECTRUM_SHARD_WSTEP
+        spectrum_options["truncation"] = SPECTRUM_SHARD_TRUNCATION
 
-        # 3. generate spectrum
+    # 1. spectrum factory with its databank loaded (reused across requests)
+    pooled = _get_pooled_factory(spectrum_options, window)
+
+    # 2. generate spectrum
+    phase = "non_eq_spectrum" if spectrum_options["load_columns"] == 'noneq' else "eq_spectrum"
+    with pooled.lock, span(phase, molecule=species.molecule) as timing:
+        sf = pooled.factory
         if spectrum_options["load_columns"] == 'noneq':
             generated_spectrum = sf.non_eq_spectrum(**spectrum_conditions)
         else:
@@ -88,8 +240,205 @@ def calculate_spectrum(payload: Payload):
                 generated_spectrum = sf.eq_spectrum_gpu(**spectrum_conditions)
             else:
                 generated_spectrum = sf.eq_spectrum(**spectrum_conditions)
+        timing["lines"] = generated_spectrum.conditions.get("lines_calculated")
+        timing["points"] = len(generated_spectrum)
 
-        s_list.append(generated_spectrum)
+    return generated_spectrum
 
-    spec = MergeSlabs(*s_list,resample="intersect")
-    return spec
+
+def _compute_species_sharded(payload: Payload, species, shards):
+    """`_compute_species` over the shards of the window, one after the other."""
+    parts = [
+        _crop_shard(_compute_species(payload, species, shard), shard, index == len(shards) - 1)
+        for index, shard in enumerate(shards)
+    ]
+    return _stitch_shards(parts)
+
+
+def _compute_species_shared(payload: Payload, species, shard: Shard = None, is_last=True, wstep="auto"):
+    """
+    `_compute_species` in a slab worker: the spectral arrays are returned in
+    shared memory, only the rest of the Spectrum object is pickled.
+    """
+    spectrum = _compute_species(payload, species, shard, wstep)
+    if shard is not None:
+        _crop_shard(spectrum, shard, is_last)
+    arrays, spectrum._q = spectrum._q, {}
+    block_name, layout = arrays_to_shared(arrays)
+    return spectrum, block_name, layout
+
+
+def _compute_species_parallel(payload: Payload, shards=(), wstep="auto"):
+    """
+    Compute the species slabs (and the shards of each, if any) concurrently.
+
+    Results are collected in the order of `payload.species` so that merging
+    them gives the same spectrum as the serial path.
+    """
+    executor = _get_species_executor()
+    futures = []
+    for species in payload.species:
+        if shards:
+            futures.append([
+                executor.submit(run_timed, _compute_species_shared, payload, species, shard, index == len(shards) - 1)
+                for index, shard in enumerate(shards)
+            ])
+        else:
+            futures.append([executor.submit(run_timed, _compute_species_shared, payload, species, wstep=wstep)])
+    s_list = []
+    error = None
+    for species_futures in futures:
+        parts = []
+        for future in species_futures:
+            try:
+                (spectrum, block_name, layout), spans = future.result()
+            except BrokenProcessPool as exc:
+                _shutdown_species_executor()
+                error = error or exc
+                continue
+            except Exception as exc:
+                error = error or exc
+                continue
+            add_spans(spans)
+            # always read (and free) the shared block, even if another slab failed
+            spectrum._q = arrays_from_shared(block_name, layout)
+            parts.append(spectrum)
+        if error is None:
+            s_list.append(_stitch_shards(parts) if len(parts) > 1 else parts[0])
+    if error is not None:
+        raise error
+    return s_list
+
+
+_species_executor = None
+_species_executor_lock = threading.Lock()
+
+
+def _get_species_executor():
+    """Process pool computing species slabs and range shards, created on first use."""
+    global _species_executor
+    with _species_executor_lock:
+        if _species_executor is None:
+            _species_executor = ProcessPoolExecutor(
+                max_workers=SPECIES_MAX_PARALLELISM,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _species_executor
+
+
+def _shutdown_species_executor():
+    global _species_executor
+    with _species_executor_lock:
+        executor, _species_executor = _species_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _window_cm1(payload: Payload):
+    """Requested spectral window converted to wavenumbers (cm-1)."""
+    if payload.wavelength_units == "1/u.cm":
+        return payload.min_wavenumber_range, payload.max_wavenumber_range
+    return 1e7 / payload.max_wavenumber_range, 1e7 / payload.min_wavenumber_range
+
+
+def warm_factory(database, molecule, isotope, wmin, wmax, load_columns="equilibrium"):
+    """
+    Load the databank of a window (cm-1) into the factory pool, as a calculation in cm-1 would
+    (calculations in nm inside the window get its lines as well).
+    """
+    if database == "hitemp":
+        setup_hitemp_credentials()
+    spectrum_options = {
+        "wavenum_min": wmin / u.cm,
+        "wavenum_max": wmax / u.cm,
+        "waveunit": "cm-1",
+        "isotope": isotope,
+        "molecule": molecule,
+        "dbformat": database,
+        "load_columns": load_columns,
+        "wstep": "auto",
+        "truncation": None,
+    }
+    return _get_pooled_factory(spectrum_options, (wmin, wmax))
+
+
+def _get_pooled_factory(spectrum_options, window):
+    """
+    Reuse the pooled SpectrumFactory on `window` (cm-1), or load a new one.
+
+    A factory on a wider window, or on the same window in the other range unit,
+    is not used as is, its spectrum would be on another grid: the new factory
+    gets the lines of its own window from it.
+    """
+    # lines can only be handed over as the line stores do (see `load_lines`)
+    derivable = spectrum_options["dbformat"] in LINE_STORE_DATABASES and spectrum_options["load_columns"] != "noneq"
+    key = (
+        spectrum_options["molecule"],
+        spectrum_options["isotope"],
+        spectrum_options["dbformat"],
+        spectrum_options["load_columns"],
+        spectrum_options["wstep"],
+        spectrum_options["truncation"],
+    )
+    if not derivable:
+        key += (spectrum_options["waveunit"],)
+    wmin, wmax = window
+    with span("factory_pool") as timing:
+        pooled = factory_pool.acquire(key, wmin, wmax, exact=not derivable)
+        timing["hit"] = pooled is not None
+    if pooled is not None and pooled.is_exact(wmin, wmax) and pooled.factory.input_wunit == spectrum_options["waveunit"]:
+        print(" >> Reusing loaded databank")
+        return pooled
+
+    sf = _new_factory(spectrum_options)
+    load_min, load_max = sf.params.wavenum_min_calc, sf.params.wavenum_max_calc
+    if pooled is not None and pooled.has_lines(load_min, load_max):
+        print(" >> Reusing lines of a loaded databank")
+        with span("derive_factory", molecule=spectrum_options["molecule"]) as timing:
+            load_lines(sf, pooled.lines(load_min, load_max), spectrum_options["dbformat"])
+            timing["lines"] = len(sf.df0)
+    else:
+        with span("fetch_databank", molecule=spectrum_options["molecule"]) as timing:
+            _load_factory(sf, spectrum_options)
+            timing["source"] = sf.params.dbformat
+            timing["lines"] = len(sf.df0)
+    return factory_pool.add(key, wmin, wmax, sf)
+
+
+def _new_factory(spectrum_options):
+    """New SpectrumFactory on the window of `spectrum_options`, without lines."""
+    return SpectrumFactory(
+    wmin=spectrum_options["wavenum_min"] ,
+    wmax=spectrum_options["wavenum_max"] ,
+    wunit=spectrum_options["waveunit"],
+    isotope=spectrum_options["isotope"],
+    molecule=spectrum_options["molecule"],
+    lbfunc=broad_arbitrary if spectrum_options["dbformat"] == "nist" else None,
+    wstep=spectrum_options["wstep"],
+    **({} if spectrum_options["truncation"] is None else {"truncation": spectrum_options["truncation"]}),
+    )
+
+
+def _load_factory(sf, spectrum_options):
+    """Load the lines of the window of `sf`, from the line store or the databank."""
+    store = line_stores.get(
+        spectrum_options["dbformat"],
+        spectrum_options["molecule"],
+        spectrum_options["isotope"],
+        spectrum_options["load_columns"],
+    )
+    load_min, load_max = sf.params.wavenum_min_calc, sf.params.wavenum_max_calc
+    if store is not None and store.covers(load_min, load_max):
+        print(" >> Loading lines from the local line store")
+        load_lines(sf, store.lines(load_min, load_max), spectrum_options["dbformat"])
+    elif spectrum_options["dbformat"] == "synthetic":
+        raise ValueError(
+            f"No synthetic {spectrum_options['molecule']} lines on {load_min:.2f}-{load_max:.2f} cm-1 "
+            + "(isotope 1, equilibrium only): build them with radis_scripts/build_synthetic_lines.py"
+        )
+    else:
+        sf.fetch_databank(
+            source=spectrum_options["dbformat"],
+            load_columns=spectrum_options["load_columns"],
+            broadf_download=False,
+            )
@@ -0,0 +1,52 @@
+import zlib
+import numpy as np
+
+# rows formatted per chunk: large enough to amortize the formatting call,
+# small enough to keep the memory of a download constant
+CSV_CHUNK_ROWS = 65536
+
+WAVE_LABELS = {
+    "cm-1": "Wavenumber (cm-1)",
+    "nm": "Wavelength [air] (nm)",
+    "nm_vac": "Wavelength [vacuum] (nm)",
+}
+
+
+def iter_csv(x, y, header, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Yield the bytes of two columns in the layout of `np.savetxt` (and so of
+    `Spectrum.savetxt`, which `Spectrum.from_txt` reads back), `chunk_rows` rows at a time.
+
+    Each chunk is formatted by a single %-formatting call over the flattened
+    rows, with the `%.18e` format and space delimiter of `np.savetxt`.
+    """
+    yield f"# {header}\n".encode()
+    for start in range(0, len(x), chunk_rows):
+        rows = np.column_stack((x[start:start + chunk_rows], y[start:start + chunk_rows]))
+        values = rows.ravel().tolist()
+        yield (("%.18e %.18e\n" * len(rows)) % tuple(values)).encode()
+
+
+def spectrum_csv(spectrum, mode, wunit, chunk_rows=CSV_CHUNK_ROWS):
+    """CSV chunks of `mode` of a spectrum, as written by `Spectrum.savetxt`."""
+    x, y = spectrum.get(mode, wunit=wunit, Iunit="default")
+    yunit = spectrum.units.get(mode, "a.u")
+    header = f"{WAVE_LABELS.get(wunit, wunit)}\t{mode} ({yunit})"
+    return iter_csv(x, y, header, chunk_rows)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream, on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_csv(path, chunks):
+    """Write CSV chunks to a file."""
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of `y` in each of about n_out / 2 buckets.
+
+    Every local extremum wider than a bucket survives, so narrow absorption
+    lines are kept whatever the reduction factor. Fully vectorized.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = max(n_out // 2, 1)
+    size = -(-n // n_buckets)  # ceil
+    full = n // size
+    body = y[:full * size].reshape(full, size)
+    offsets = np.arange(full) * size
+    parts = [[0, n - 1], body.argmin(axis=1) + offsets, body.argmax(axis=1) + offsets]
+    if full * size < n:
+        tail = y[full * size:]
+        parts.append([full * size + tail.argmin(), full * size + tail.argmax()])
+    # np.unique sorts and removes buckets whose min and max are the same point
+    return np.unique(np.concatenate(parts))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices selected by Largest-Triangle-Three-Buckets.
+
+    Large inputs are first reduced with `minmax_indices` to 4 * n_out points
+    (MinMaxLTTB), which keeps the sequential LTTB pass to n_out cheap steps.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    if n > 4 * n_out:
+        pre = minmax_indices(y, 4 * n_out)
+    else:
+        pre = np.arange(n)
+    xs, ys = x[pre], y[pre]
+    m = len(pre)
+    if m <= n_out:
+        return pre
+
+    # n_out - 2 buckets between the first and the last point, which are always kept
+    edges = np.linspace(1, m - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    x_mean = np.add.reduceat(xs[:-1], edges[:-1]) / counts
+    y_mean = np.add.reduceat(ys[:-1], edges[:-1]) / counts
+    # the third vertex of the last bucket is the last point
+    x_mean = np.append(x_mean, xs[-1])
+    y_mean = np.append(y_mean, ys[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = m - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        cx, cy = x_mean[bucket + 1], y_mean[bucket + 1]
+        area = np.abs(
+            (xs[a] - cx) * (ys[start:stop] - ys[a])
+            - (xs[a] - xs[start:stop]) * (cy - ys[a])
+        )
+        a = start + int(area.argmax())
+        selected[bucket + 1] = a
+    return pre[selected]
+
+
+def downsample(x, y, n_out, method="minmax"):
+    """Reduce (x, y) to about `n_out` points while keeping the peaks."""
+    if n_out >= len(x):
+        return x, y
+    if method == "lttb":
+        indices = lttb_indices(x, y, n_out)
+    else:
+        indices = minmax_indices(y, n_out)
+    return x[indices], y[indices]
+
+
+def downsample_columns(x, ys, n_out, method="minmax"):
+    """
+    Reduce x and several y columns (dict) sharing it to about `n_out` points.
+
+    Each column selects its own peaks within an equal share of `n_out`, and
+    all columns keep the union of the selected points, so x stays shared.
+    """
+    if n_out >= len(x) or not ys:
+        return x, ys
+    share = max(n_out // len(ys), 3)
+    if method == "lttb":
+        selected = [lttb_indices(x, y, share) for y in ys.values()]
+    else:
+        selected = [minmax_indices(y, share) for y in ys.values()]
+    indices = np.unique(np.concatenate(selected))
+    return x[indices], {name: y[indices] for name, y in ys.items()}
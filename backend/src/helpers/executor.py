@@ -0,0 +1,156 @@
+import time
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi.responses import JSONResponse
+from src.helpers.timing import run_timed, add_spans
+from src.helpers.profiling import current_profile, artifact_path, profile_call
+from src.constants.constants import EXECUTOR_KIND, EXECUTOR_MAX_WORKERS, EXECUTOR_MAX_QUEUE
+
+
+class ExecutorBusyError(Exception):
+    """Raised when too many calculations are already waiting for a worker."""
+
+
+class SpectrumExecutor:
+    """
+    Runs blocking radis work (spectrum calculation, fitting) outside the event loop.
+
+    At most `max_workers` calls run at once, and at most `max_queue` more may
+    wait for a free worker; beyond that `run` raises ExecutorBusyError instead
+    of letting requests pile up.
+    """
+
+    def __init__(self, kind, max_workers, max_queue):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._initializer = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self):
+        """Number of submitted calls still waiting for a worker."""
+        return max(self.in_flight - self.max_workers, 0)
+
+    def set_initializer(self, fn, *args):
+        """
+        Run `fn(*args)` in every worker when it starts. A running pool is
+        replaced by a new one on the next call; its calls still complete.
+        """
+        with self._lock:
+            self._initializer = (fn, args)
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                initializer, initargs = self._initializer or (None, ())
+                if self.kind == "process":
+                    # spawn: forking the multi-threaded server process is not safe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=initializer,
+                        initargs=initargs,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="radis-worker",
+                        initializer=initializer,
+                        initargs=initargs,
+                    )
+            return self._executor
+
+    def worker_pids(self):
+        """Process ids of the running worker processes (none for the thread pool)."""
+        with self._lock:
+            executor = self._executor
+        if self.kind != "process" or executor is None:
+            return []
+        return list(executor._processes or {})
+
+    def _reserve(self):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusyError("Server is busy, please retry in a moment")
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` in a worker and await its result.
+
+        The timing spans recorded in the worker are added to the current request,
+        and the call is profiled if the request is (see `profiling.start_profile`).
+        """
+        self._reserve()
+        try:
+            try:
+                profile = current_profile()
+                if profile is not None:
+                    profile_id, profiler = profile
+                    args = (profiler, artifact_path(profile_id, profiler), fn) + args
+                    fn = profile_call
+                call = functools.partial(run_timed, fn, *args, submitted_at=time.time(), **kwargs)
+                future = self._get_executor().submit(call)
+            except BaseException:
+                self._release()
+                raise
+            # the slot is held until the worker is done, even if the request is cancelled meanwhile
+            future.add_done_callback(lambda _: self._release())
+            result, spans = await asyncio.wrap_future(future)
+            add_spans(spans)
+            return result
+        except BrokenProcessPool:
+            # a worker died (e.g. out of memory): start a fresh pool for the next calls
+            self.shutdown(wait=False)
+            raise
+
+    async def run_retrying(self, fn, *args, retry_delay=1.0, **kwargs):
+        """
+        `run`, waiting for a free slot instead of raising ExecutorBusyError, for
+        work that belongs to an already accepted request (batches, sweeps).
+        """
+        while True:
+            try:
+                return await self.run(fn, *args, **kwargs)
+            except ExecutorBusyError:
+                await asyncio.sleep(retry_delay)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def busy_response(exc: ExecutorBusyError):
+    """503 answer returned by the routes when the executor queue is full."""
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc)},
+        headers={"Retry-After": "5"},
+    )
+
+
+spectrum_executor = SpectrumExecutor(
+    kind=EXECUTOR_KIND,
+    max_workers=EXECUTOR_MAX_WORKERS,
+    max_queue=EXECUTOR_MAX_QUEUE,
+)
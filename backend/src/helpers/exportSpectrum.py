@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import h5py
+from src.helpers.csvExport import spectrum_csv, write_csv, WAVE_LABELS
+from src.helpers.spectrumData import get_spectrum_arrays, build_spectrum_data
+from src.helpers.wireFormat import to_jsonable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, Parquet export is only offered when installed
+    pa = pq = None
+
+# format -> (file extension, media type)
+EXPORT_FORMATS = {
+    "json": (".json", "application/json"),
+    "csv": (".csv", "text/csv"),
+    "spec": (".spec", "application/octet-stream"),
+    "hdf5": (".h5", "application/x-hdf5"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+class ExportFormatError(Exception):
+    """Raised for an export format that is not available on this server."""
+
+
+def check_export_format(export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unknown export format: {export_format}")
+    if export_format == "parquet" and pq is None:
+        raise ExportFormatError("Parquet export needs pyarrow, which is not installed on this server")
+
+
+def export_wunit(payload):
+    return "cm-1" if payload.wavelength_units == "1/u.cm" else "nm"
+
+
+def spectrum_columns(spectrum, wunit):
+    """
+    The x axis and every quantity of a spectrum that lies on it, as columns.
+
+    Returns (columns, units): column name -> array, and column name -> unit.
+    """
+    columns = {}
+    units = {}
+    x_label = WAVE_LABELS.get(wunit, wunit)
+    for var in spectrum.get_vars():
+        x, y = spectrum.get(var, wunit=wunit, Iunit="default")
+        if not columns:
+            columns[x_label] = x
+            units[x_label] = wunit
+        elif len(x) != len(columns[x_label]):
+            print(f" >> Not exporting {var}: it is not on the spectrum grid")
+            continue
+        columns[var] = y
+        units[var] = spectrum.units.get(var, "a.u")
+    return columns, units
+
+
+def spectrum_metadata(spectrum):
+    """Calculation conditions of a spectrum, as a JSON string."""
+    return json.dumps(to_jsonable(spectrum.conditions), default=str)
+
+
+def write_export(spectrum, payload, export_format, path):
+    """Write `spectrum` to `path` in `export_format`."""
+    wunit = export_wunit(payload)
+    if export_format == "spec":
+        spectrum.store(path, compress=True, if_exists_then="replace")
+    elif export_format == "csv":
+        write_csv(path, spectrum_csv(spectrum, payload.mode, wunit))
+    elif export_format == "json":
+        x, y = get_spectrum_arrays(spectrum, payload.mode, payload.wavelength_units)
+        data = build_spectrum_data(x, y, spectrum.units[payload.mode])
+        with open(path, "w") as f:
+            json.dump({"data": to_jsonable(data)}, f)
+    elif export_format == "hdf5":
+        columns, units = spectrum_columns(spectrum, wunit)
+        with h5py.File(path, "w") as f:
+            f.attrs["conditions"] = spectrum_metadata(spectrum)
+            for name, array in columns.items():
+                dataset = f.create_dataset(name, data=np.asarray(array), compression="gzip")
+                dataset.attrs["unit"] = str(units[name])
+    elif export_format == "parquet":
+        columns, units = spectrum_columns(spectrum, wunit)
+        table = pa.table({name: np.asarray(array) for name, array in columns.items()})
+        table = table.replace_schema_metadata({
+            "conditions": spectrum_metadata(spectrum),
+            "units": json.dumps({name: str(unit) for name, unit in units.items()}),
+        })
+        pq.write_table(table, path)
+    else:
+        raise ExportFormatError(f"Unknown export format: {export_format}")
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from src.constants.constants import FACTORY_POOL_MAX_BYTES
+
+
+def factory_nbytes(sf) -> int:
+    """Approximate memory footprint of the line database loaded in a factory."""
+    df = getattr(sf, "df0", None)
+    if df is None:
+        return 0
+    return int(df.memory_usage(deep=False).sum())
+
+
+class PooledFactory:
+    """A SpectrumFactory with its databank loaded for the window [wmin, wmax] (cm-1)."""
+
+    def __init__(self, factory, wmin, wmax):
+        self.factory = factory
+        self.wmin = wmin
+        self.wmax = wmax
+        self.nbytes = factory_nbytes(factory)
+        # a SpectrumFactory keeps per-calculation state, one calculation at a time
+        self.lock = threading.Lock()
+
+    def covers(self, wmin, wmax):
+        return self.wmin <= wmin and wmax <= self.wmax
+
+    def is_exact(self, wmin, wmax):
+        return self.wmin == wmin and self.wmax == wmax
+
+    def has_lines(self, wmin, wmax):
+        """Whether the loaded lines cover [wmin, wmax] (cm-1), with the margins of the factory window."""
+        params = self.factory.params
+        return params.wavenum_min_calc <= wmin and wmax <= params.wavenum_max_calc
+
+    def lines(self, wmin, wmax):
+        """Copy of the loaded lines with wmin <= wav <= wmax (cm-1)."""
+        with self.lock:
+            df = self.factory.df0
+            lines = df[(df["wav"] >= wmin) & (df["wav"] <= wmax)].reset_index(drop=True)
+        lines.attrs.update(df.attrs)
+        return lines
+
+
+class FactoryPool:
+    """
+    Process-wide pool of SpectrumFactory objects with their databank loaded.
+
+    Factories are keyed by (molecule, isotope, database, load_columns, wunit).
+    A request on the window of a loaded factory reuses it; one inside a wider
+    loaded window is given its lines instead of fetching the databank again
+    (see `_get_pooled_factory`). The least recently used factories are dropped
+    once the loaded lines exceed `max_bytes`.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (key, wmin, wmax) -> PooledFactory
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key, wmin, wmax, exact=False):
+        """Return the narrowest pooled factory covering [wmin, wmax] (or only on it, if `exact`), or None."""
+        with self._lock:
+            best = None
+            for (entry_key, _, _), entry in self._entries.items():
+                if entry_key != key or not entry.covers(wmin, wmax):
+                    continue
+                if exact and not entry.is_exact(wmin, wmax):
+                    continue
+                if best is None or entry.wmax - entry.wmin < best.wmax - best.wmin:
+                    best = entry
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((key, best.wmin, best.wmax))
+            self.hits += 1
+            return best
+
+    def add(self, key, wmin, wmax, factory):
+        """Pool a factory whose databank was loaded for [wmin, wmax]."""
+        entry = PooledFactory(factory, wmin, wmax)
+        if entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop((key, wmin, wmax), None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            self._entries[(key, wmin, wmax)] = entry
+            self._nbytes += entry.nbytes
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "factories": len(self._entries),
+                "bytes": self._nbytes,
+            }
+
+
+factory_pool = FactoryPool(max_bytes=FACTORY_POOL_MAX_BYTES)
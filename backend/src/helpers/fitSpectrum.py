@@ -2,11 +2,11 @@ import astropy.units as u
 from  astropy.units import cds 
 from src.models.payload import fitPayload as Payload
 from radis.tools.new_fitting import fit_spectrum as radis_fit_spectrum
-from fastapi import UploadFile
 from radis import load_spec
 from radis import Spectrum
 import os
 import tempfile
+from src.helpers.spectrumData import get_spectrum_data
 
 # An arbitrary broadening formula as NIST databank requires `lbfunc`
 def broad_arbitrary(**kwargs):
@@ -15,8 +15,37 @@ def broad_arbitrary(**kwargs):
     shift = None
     return hwhm, shift
 
-async def fit_spectrum(payload: Payload, file: UploadFile):
-    """Fit the spectrum using the RADIS library."""
+def normalize_fit_var(payload: Payload):
+    """Map the *_noslit fit variables to the ones supported by radis fit_spectrum."""
+    # cause radiance_noslit and transmittance_noslit are not supported by fit_spectrum function
+    if payload.fit_properties.fit_var == 'radiance_noslit':
+        payload.fit_properties.fit_var = 'radiance'
+    elif payload.fit_properties.fit_var == 'transmittance_noslit':
+        payload.fit_properties.fit_var = 'transmittance'
+    return payload
+
+
+def get_fit_data(payload: Payload, s_experimental, s_best, log, options=None):
+    """Build the response data of a fit from its experimental and best spectra."""
+    fit_var = payload.fit_properties.fit_var
+    wavelength_units = payload.experimental_conditions.wavelength_units
+    return {
+        "experimental_spectrum": get_spectrum_data(s_experimental, fit_var, wavelength_units, options),
+        "best_spectrum": get_spectrum_data(s_best, fit_var, wavelength_units, options),
+        "units": s_experimental.units[fit_var],
+        "fit_vals": log["fit_vals"],
+        "residual": log["residual"],
+        "time_fitting": log["time_fitting"],
+    }
+
+
+def fit_spectrum(payload: Payload, content: bytes, filename: str):
+    """
+    Fit the spectrum using the RADIS library.
+
+    Takes the raw bytes of the uploaded file rather than the UploadFile so the
+    fit can run in a worker process.
+    """
     # Extract parameters from the payload
     ExperimentalConditions = payload.experimental_conditions
     FitParameters = payload.fit_parameters
@@ -30,8 +59,7 @@ async def fit_spectrum(payload: Payload, file: UploadFile):
         Wunit="nm"
     
     # Load the experimental spectrum from the uploaded file
-    content = await file.read() 
-    suffix = os.path.splitext(file.filename)[-1]
+    suffix = os.path.splitext(filename)[-1]
     with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
         tmp.write(content)
         tmp_path = tmp.name
@@ -125,4 +153,5 @@ async def fit_spectrum(payload: Payload, file: UploadFile):
 
     os.remove(tmp_path)  # Clean up the temp file
 
-    return s_experimental, s_best, result, log
+    # the lmfit result is not returned: it is unused and may not pickle across processes
+    return s_experimental, s_best, log
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from contextlib import contextmanager
+import radis
+from radis import load_spec
+from src.constants.constants import JOB_STORE, JOB_SQLITE_PATH, JOB_RESULTS_DIRECTORY, JOB_RESULT_TTL
+from src.helpers.executor import spectrum_executor, ExecutorBusyError
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.fitSpectrum import fit_spectrum, get_fit_data
+from src.helpers.spectrumData import get_spectrum_data, get_modes_data
+from src.helpers.wireFormat import to_jsonable
+from src.helpers.csvExport import spectrum_csv, write_csv
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_FIELDS = ("id", "kind", "status", "progress", "error", "meta", "created_at", "updated_at")
+
+
+class InMemoryJobStore:
+    """Job records kept in a dict; they are lost when the worker restarts."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def expired(self, before):
+        with self._lock:
+            return [job_id for job_id, job in self._jobs.items() if job["updated_at"] < before]
+
+
+class SqliteJobStore:
+    """Job records kept in a local SQLite file, shared by all workers of the host."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, progress REAL, error TEXT, "
+                "meta TEXT, created_at REAL, updated_at REAL)"
+            )
+            # jobs left unfinished by a worker that is gone will never complete
+            unfinished = db.execute(
+                "SELECT id, meta FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            for job_id, meta in unfinished:
+                if not _process_alive(json.loads(meta).get("pid")):
+                    db.execute(
+                        "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                        (FAILED, "Interrupted by a server restart", time.time(), job_id),
+                    )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def create(self, job):
+        row = dict(job, meta=json.dumps(job["meta"]))
+        with self._connect() as db:
+            db.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                [row[field] for field in JOB_FIELDS],
+            )
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        if "meta" in fields:
+            fields["meta"] = json.dumps(fields["meta"])
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        job["meta"] = json.loads(job["meta"])
+        return job
+
+    def delete(self, job_id):
+        with self._connect() as db:
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def expired(self, before):
+        with self._connect() as db:
+            rows = db.execute("SELECT id FROM jobs WHERE updated_at < ?", (before,)).fetchall()
+        return [row[0] for row in rows]
+
+
+def _process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_job_store(kind):
+    if kind == "memory":
+        return InMemoryJobStore()
+    if kind == "sqlite":
+        return SqliteJobStore(JOB_SQLITE_PATH)
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+# Functions below run in the executor workers: results are written to files so
+# only small dicts travel back to the server process.
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(to_jsonable(data), f, default=float)
+
+
+def run_calculation_job(payload, slit_unit, spec_path, json_path):
+    """Calculate a spectrum and store it as .spec and as JSON response data."""
+    spectrum = calculate_spectrum(payload, slit_unit)
+    spectrum.store(spec_path, compress=False, if_exists_then="replace")
+    if payload.modes:
+        data = get_modes_data(spectrum, payload.modes, payload.wavelength_units)
+    else:
+        data = get_spectrum_data(spectrum, payload.mode, payload.wavelength_units)
+    _write_json(json_path, data)
+    return {"name": spectrum.get_name()}
+
+
+def run_fit_job(payload, content, filename, spec_path, json_path):
+    """Fit a spectrum and store the best spectrum as .spec and the fit as JSON response data."""
+    s_experimental, s_best, log = fit_spectrum(payload, content, filename)
+    s_best.store(spec_path, compress=False, if_exists_then="replace")
+    _write_json(json_path, get_fit_data(payload, s_experimental, s_best, log))
+    return {"name": s_best.get_name()}
+
+
+def export_csv(spec_path, csv_path, mode, wunit):
+    """Write the CSV export of a stored job result."""
+    spectrum = load_spec(spec_path)
+    write_csv(csv_path, spectrum_csv(spectrum, mode, wunit))
+
+
+class JobManager:
+    """
+    Tracks asynchronous calculations and fits.
+
+    Jobs run on the shared spectrum executor; when it is full they stay queued
+    and retry instead of failing. Finished results are kept under `directory`
+    for `ttl` seconds.
+    """
+
+    def __init__(self, store, directory, ttl, retry_delay=1.0):
+        self.store = store
+        self.directory = directory
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+
+    def result_path(self, job_id, extension):
+        return os.path.join(self.directory, f"{job_id}{extension}")
+
+    def create(self, kind, meta):
+        self.prune()
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "progress": 0.0,
+            "error": None,
+            # the server process running the job, see SqliteJobStore
+            "meta": {**meta, "pid": os.getpid()},
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.store.create(job)
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    async def run(self, job_id, fn, *args):
+        """Run `fn(*args)` for a job and record its outcome."""
+        while True:
+            self.store.update(job_id, status=RUNNING, progress=0.1)
+            try:
+                result = await spectrum_executor.run(fn, *args)
+            except ExecutorBusyError:
+                self.store.update(job_id, status=QUEUED, progress=0.0)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            except radis.misc.warning.EmptyDatabaseError:
+                self.store.update(job_id, status=FAILED, error="No line in the specified wavenumber range")
+                return
+            except Exception as exc:
+                print("Error", exc)
+                self.store.update(job_id, status=FAILED, error=str(exc))
+                return
+            break
+        meta = self.store.get(job_id)["meta"]
+        self.store.update(job_id, status=DONE, progress=1.0, meta={**meta, **result})
+
+    def prune(self):
+        """Forget jobs (and their result files) older than the TTL."""
+        for job_id in self.store.expired(time.time() - self.ttl):
+            for extension in (".spec", ".json", ".csv"):
+                path = self.result_path(job_id, extension)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.store.delete(job_id)
+
+
+def public_job(job):
+    """Job status as returned by the API."""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+job_manager = JobManager(
+    store=create_job_store(JOB_STORE),
+    directory=JOB_RESULTS_DIRECTORY,
+    ttl=JOB_RESULT_TTL,
+)
@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from radis import SpectrumFactory
+from radis.misc.warning import EmptyDatabaseError
+from src.constants.constants import LINE_STORE_DIRECTORY
+
+# databases whose lines are served from the store: they share the HAPI partition functions
+LINE_STORE_DATABASES = ("hitran", "hitemp", "geisa", "synthetic")
+# databases stored in the layout of another one, which radis treats them as
+LINE_FORMATS = {"synthetic": "hitran"}
+
+
+def line_store_name(database, molecule, isotope, load_columns):
+    return f"{database}_{molecule}_{isotope}_{load_columns}".replace(",", "-")
+
+
+class LineStore:
+    """
+    Line database of one (database, molecule, isotope, load_columns), sorted by
+    wavenumber: one memory-mapped .npy file per column and a meta.json.
+
+    `wav` is the index: a window is found by binary search and only its pages
+    are read, through the OS page cache shared by all workers.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.columns = meta["columns"]
+        self.attrs = meta["attrs"]
+        self.count = meta["count"]
+        self.wmin = meta["wmin"]
+        self.wmax = meta["wmax"]
+        self._arrays = {}
+
+    def column(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+        return array
+
+    def covers(self, wmin, wmax):
+        return self.wmin <= wmin and wmax <= self.wmax
+
+    def lines(self, wmin, wmax):
+        """DataFrame of the lines with wmin <= wav <= wmax (cm-1)."""
+        wav = self.column("wav")
+        start = np.searchsorted(wav, wmin, side="left")
+        stop = np.searchsorted(wav, wmax, side="right")
+        # copied: radis adds and edits columns of the lines it is given
+        df = pd.DataFrame({name: np.array(self.column(name)[start:stop]) for name in self.columns})
+        df.attrs.update(self.attrs)
+        return df
+
+
+class LineStoreRegistry:
+    """Line stores found under `directory`, opened on first use."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def get(self, database, molecule, isotope, load_columns):
+        """The store of these lines, or None if it was not built."""
+        if database not in LINE_STORE_DATABASES:
+            return None
+        path = os.path.join(self.directory, line_store_name(database, molecule, isotope, load_columns))
+        if not os.path.isfile(os.path.join(path, "meta.json")):
+            return None
+        with self._lock:
+            store = self._stores.get(path)
+            if store is None:
+                store = self._stores[path] = LineStore(path)
+            return store
+
+
+def load_lines(sf, df, source):
+    """
+    Give the lines `df` to a SpectrumFactory, as `fetch_databank(source=...)`
+    does once it has read them from the database files.
+
+    This sets radis internals: test_lineStore.py checks the factory against
+    one set up by `load_databank`, to catch changes in a radis upgrade.
+    """
+    if len(df) == 0:
+        raise EmptyDatabaseError(
+            f"{sf.input.species} has no lines on range "
+            + f"{sf.params.wavenum_min_calc:.2f}-{sf.params.wavenum_max_calc:.2f} cm-1"
+        )
+    sf.params.dbformat = LINE_FORMATS.get(source, source)
+    sf.misc.load_energies = False
+    sf.levels = None
+    sf.levelspath = None
+    sf.params.levelsfmt = "radis"
+    sf.params.parfuncpath = None
+    sf.params.parfuncfmt = "hapi"
+    sf.params.db_use_cached = True
+    sf.params.lvl_use_cached = True
+    sf.dataframe_type = "pandas"
+    sf._reset_references()
+    if sf.input.isotope == "all":
+        sf.input.isotope = ",".join(str(k) for k in sf._get_isotope_list(df=df))
+
+    sf.df0 = df
+    sf.misc.total_lines = len(df)
+    sf._remove_unecessary_columns(df, "pandas")
+    sf._init_equilibrium_partition_functions(None, "hapi")
+
+
+def write_line_store(chunks, directory):
+    """
+    Write line DataFrames, given in increasing and non-overlapping wavenumber
+    ranges, as a line store in `directory`.
+
+    Columns are appended chunk by chunk to raw files, which get their .npy
+    header once the line count is known, so the whole database is never in memory.
+    """
+    tmp_directory = f"{directory}.tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    columns = None
+    attrs = {}
+    count = 0
+    wmin = wmax = None
+    for df, (chunk_min, chunk_max) in chunks:
+        # the molecule and isotope columns are moved to attrs when unique in a chunk
+        for name in ("id", "iso"):
+            if name not in df.columns and name in df.attrs:
+                df[name] = df.attrs[name]
+        if columns is None:
+            columns = {name: df[name].dtype.str for name in df.columns}
+            attrs = {
+                key: value.item() if isinstance(value, np.generic) else value
+                for key, value in df.attrs.items()
+                if key not in ("id", "iso")
+            }
+            wmin = chunk_min
+        df = df.sort_values("wav", kind="mergesort")
+        for name, dtype in columns.items():
+            with open(os.path.join(tmp_directory, f"{name}.raw"), "ab") as f:
+                np.ascontiguousarray(df[name].to_numpy(), dtype=dtype).tofile(f)
+        count += len(df)
+        wmax = chunk_max
+    if columns is None:
+        raise EmptyDatabaseError(f"No lines to store in {directory}")
+
+    for name, dtype in columns.items():
+        raw_path = os.path.join(tmp_directory, f"{name}.raw")
+        with open(os.path.join(tmp_directory, f"{name}.npy"), "wb") as f:
+            np.lib.format.write_array_header_1_0(
+                f, {"descr": dtype, "fortran_order": False, "shape": (count,)}
+            )
+            with open(raw_path, "rb") as raw:
+                shutil.copyfileobj(raw, f)
+        os.remove(raw_path)
+    with open(os.path.join(tmp_directory, "meta.json"), "w") as f:
+        json.dump({
+            "columns": list(columns),
+            "attrs": attrs,
+            "count": count,
+            "wmin": wmin,
+            "wmax": wmax,
+        }, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+    return directory
+
+
+def fetch_line_chunks(database, molecule, ranges, isotope, load_columns):
+    """Lines of each (wmin, wmax) range, fetched from the database by radis."""
+    for index, (wmin, wmax) in enumerate(ranges):
+        print(f" >> Fetching {molecule} lines {wmin}-{wmax} cm-1")
+        sf = SpectrumFactory(wmin=wmin, wmax=wmax, wunit="cm-1", molecule=molecule, isotope=isotope, verbose=0)
+        sf.fetch_databank(
+            source=database,
+            load_columns=load_columns,
+            include_neighbouring_lines=False,
+            broadf_download=False,
+        )
+        df = sf.df0
+        # ranges share their bounds: keep each line once
+        last = index == len(ranges) - 1
+        keep = (df["wav"] >= wmin) & ((df["wav"] <= wmax) if last else (df["wav"] < wmax))
+        lines = df[keep].reset_index(drop=True)
+        lines.attrs.update(df.attrs)
+        yield lines, (wmin, wmax)
+
+
+def build_line_store(database, molecule, ranges, isotope="1", load_columns="equilibrium",
+                     directory=LINE_STORE_DIRECTORY):
+    """Fetch the lines of `ranges` (cm-1, increasing) and store them for `line_stores`."""
+    path = os.path.join(directory, line_store_name(database, molecule, isotope, load_columns))
+    return write_line_store(fetch_line_chunks(database, molecule, ranges, isotope, load_columns), path)
+
+
+line_stores = LineStoreRegistry(LINE_STORE_DIRECTORY)
@@ -0,0 +1,237 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+from radis import Spectrum, SpectrumFactory
+from radis.lbl.base import BaseFactory
+from radis.phys.units import convert_universal
+from src.constants.constants import LOOKUP_TABLE_DIRECTORY
+
+# tables hold the absorption coefficient at this mole fraction, scaled linearly to the requested one
+REFERENCE_MOLE_FRACTION = 0.1
+# spectral densities: converting them between per-nm and per-cm-1 units depends on the wavenumber
+PER_WAVE_UNITS = {
+    "radiance_noslit": {"per_nm_is_like": "mW/cm2/sr/nm", "per_cm_is_like": "mW/cm2/sr/cm-1"},
+    "emisscoeff": {"per_nm_is_like": "mW/cm3/sr/nm", "per_cm_is_like": "mW/cm3/sr/cm-1"},
+}
+
+
+def _bracket(grid, value):
+    """[(index, weight)] of the grid points around `value`, for linear interpolation."""
+    if len(grid) == 1:
+        return [(0, 1.0)]
+    i = int(np.clip(np.searchsorted(grid, value, side="right") - 1, 0, len(grid) - 2))
+    t = (value - grid[i]) / (grid[i + 1] - grid[i])
+    return [(i, 1 - t), (i + 1, t)]
+
+
+class LookupTable:
+    """
+    Absorption coefficient (cm-1) of one species on a (Tgas, pressure, wavenumber)
+    grid, memory-mapped from `<name>.npy` and described by `<name>.json`.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.molecule = meta["molecule"]
+        self.database = meta["database"]
+        self.isotope = meta["isotope"]
+        self.mole_fraction = meta["mole_fraction"]
+        self.tgas = np.asarray(meta["tgas"], dtype=float)
+        self.pressure = np.asarray(meta["pressure"], dtype=float)
+        self.wavenumber = np.linspace(meta["wmin"], meta["wmax"], meta["points"])
+        self._abscoeff = None
+
+    @property
+    def abscoeff(self):
+        if self._abscoeff is None:
+            self._abscoeff = np.load(self.path, mmap_mode="r")
+        return self._abscoeff
+
+    def covers(self, wmin, wmax, tgas, pressure):
+        """Whether the window (cm-1) and the conditions lie inside the table."""
+        return (
+            self.wavenumber[0] <= wmin and wmax <= self.wavenumber[-1]
+            and self.tgas[0] <= tgas <= self.tgas[-1]
+            and self.pressure[0] <= pressure <= self.pressure[-1]
+        )
+
+    def interpolate(self, tgas, pressure, mole_fraction, wmin, wmax):
+        """
+        Absorption coefficient on the table grid inside [wmin, wmax] (cm-1).
+
+        Linear in Tgas and in log(pressure), scaled linearly with the mole
+        fraction. Only the needed slices of the memory-mapped table are read.
+        """
+        start = np.searchsorted(self.wavenumber, wmin, side="left")
+        stop = np.searchsorted(self.wavenumber, wmax, side="right")
+        k = np.zeros(stop - start)
+        for i, wt in _bracket(self.tgas, tgas):
+            for j, wp in _bracket(np.log(self.pressure), np.log(pressure)):
+                if wt * wp:
+                    k += wt * wp * self.abscoeff[i, j, start:stop]
+        return self.wavenumber[start:stop], k * (mole_fraction / self.mole_fraction)
+
+
+class LookupTableStore:
+    """
+    Lookup tables found in `directory`, rescanned when files are added to it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._tables = []
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def tables(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime
+        except OSError:
+            return []
+        with self._lock:
+            if mtime != self._mtime:
+                self._tables = self._scan()
+                self._mtime = mtime
+            return self._tables
+
+    def _scan(self):
+        tables = []
+        for entry in sorted(os.scandir(self.directory), key=lambda entry: entry.name):
+            if not entry.name.endswith(".json"):
+                continue
+            path = f"{entry.path[:-len('.json')]}.npy"
+            try:
+                with open(entry.path) as f:
+                    tables.append(LookupTable(path, json.load(f)))
+            except (OSError, ValueError, KeyError) as exc:
+                print(" >> Skipping unreadable lookup table", entry.name, exc)
+        return tables
+
+    def find(self, molecule, database, isotope, wmin, wmax, tgas, pressure):
+        """The table of `molecule` covering the window and conditions, or None."""
+        for table in self.tables():
+            if (
+                table.molecule == molecule
+                and table.database == database
+                and table.isotope == isotope
+                and table.covers(wmin, wmax, tgas, pressure)
+            ):
+                return table
+        return None
+
+
+def lookup_spectrum(store, species, database, tgas, pressure, path_length, window):
+    """
+    Equilibrium spectrum interpolated from lookup tables, or None if one of the
+    species has no table covering the window (cm-1) and conditions.
+
+    `species` are (molecule, isotope, mole_fraction); `pressure` is in bar and
+    `path_length` in cm. The absorption coefficients of the species are summed
+    and radis derives the other quantities (absorbance, radiance...) from it.
+    """
+    wmin, wmax = window
+    w = None
+    k = None
+    for molecule, isotope, mole_fraction in species:
+        table = store.find(molecule, database, isotope, wmin, wmax, tgas, pressure)
+        if table is None:
+            return None
+        w_species, k_species = table.interpolate(tgas, pressure, mole_fraction, wmin, wmax)
+        if w is None:
+            w, k = w_species, k_species
+        else:
+            k = k + np.interp(w, w_species, k_species)
+
+    spectrum = Spectrum(
+        {"wavenumber": w, "abscoeff": k},
+        units={"abscoeff": "cm-1"},
+        conditions={
+            "Tgas": tgas,
+            "pressure": pressure,
+            "path_length": path_length,
+            "thermal_equilibrium": True,
+            "molecule": "+".join(molecule for molecule, _, _ in species),
+            "dbformat": database,
+            "lookup_table": True,
+        },
+        cond_units={"Tgas": "K", "pressure": "bar", "path_length": "cm"},
+        wunit="cm-1",
+        name="lookup table",
+    )
+    spectrum.update()
+    # return the units of the line-by-line calculation, which radis may not derive
+    # from the absorption coefficient (e.g. radiance per nm instead of per cm-1)
+    for name in spectrum.get_vars():
+        unit = BaseFactory.units0.get(name)
+        if unit is not None and spectrum.units[name] != unit:
+            spectrum._q[name] = convert_universal(
+                spectrum._q[name], spectrum.units[name], unit, w, **PER_WAVE_UNITS.get(name, {})
+            )
+            spectrum.units[name] = unit
+    return spectrum
+
+
+def build_lookup_table(molecule, database, wmin, wmax, tgas, pressure, wstep,
+                       isotope="1", directory=LOOKUP_TABLE_DIRECTORY):
+    """
+    Calculate the absorption coefficient of `molecule` on the (tgas, pressure)
+    grid with one SpectrumFactory, and store it as a memory-mappable table.
+
+    `pressure` is in bar and the window in cm-1; `wstep` fixes the grid step.
+    Returns the path of the table.
+    """
+    tgas = sorted(float(value) for value in tgas)
+    pressure = sorted(float(value) for value in pressure)
+    sf = SpectrumFactory(
+        wmin=wmin,
+        wmax=wmax,
+        wunit="cm-1",
+        molecule=molecule,
+        isotope=isotope,
+        wstep=wstep,
+    )
+    sf.fetch_databank(source=database, load_columns="equilibrium", broadf_download=False)
+
+    os.makedirs(directory, exist_ok=True)
+    name = f"{molecule}_{database}_{isotope}_{wmin:g}_{wmax:g}"
+    path = os.path.join(directory, f"{name}.npy")
+    tmp_path = os.path.join(directory, f"tmp-{uuid.uuid4().hex}.npy")
+    table = None
+    try:
+        for i, t in enumerate(tgas):
+            for j, p in enumerate(pressure):
+                print(f" >> {molecule}: Tgas={t} K, pressure={p} bar")
+                spectrum = sf.eq_spectrum(Tgas=t, pressure=p, mole_fraction=REFERENCE_MOLE_FRACTION, path_length=1)
+                w, k = spectrum.get("abscoeff", wunit="cm-1")
+                if table is None:
+                    table = np.lib.format.open_memmap(
+                        tmp_path, mode="w+", dtype=np.float32, shape=(len(tgas), len(pressure), len(w))
+                    )
+                table[i, j] = k
+        table.flush()
+        del table
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    meta = {
+        "molecule": molecule,
+        "database": database,
+        "isotope": isotope,
+        "mole_fraction": REFERENCE_MOLE_FRACTION,
+        "tgas": tgas,
+        "pressure": pressure,
+        "wmin": float(w[0]),
+        "wmax": float(w[-1]),
+        "points": len(w),
+    }
+    # written last: the store only picks up tables with their description
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump(meta, f)
+    return path
+
+
+lookup_table_store = LookupTableStore(LOOKUP_TABLE_DIRECTORY)
@@ -0,0 +1,323 @@
+import os
+import math
+import threading
+from starlette.routing import Match
+from src.helpers.executor import spectrum_executor
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # s
+COUNT_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)  # lines, grid points
+
+# spans with a `hit` attribute are cache lookups: span name -> cache
+CACHE_SPANS = {
+    "cache_get": "spectrum",
+    "lookup_table": "lookup_table",
+    "factory_pool": "factory_pool",
+    "artifact_cache": "artifact",
+}
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric:
+    """A metric family: one value per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def values(self):
+        """{label values: value} snapshot."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        """(suffix, label names, label values, value) of each exposed sample."""
+        return [("", self.labelnames, key, value) for key, value in self.values().items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Cumulative histogram over fixed `buckets` (upper bounds), with sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return counts[-1]
+
+    def samples(self):
+        samples = []
+        for key, (counts, total) in sorted(self.values().items()):
+            for bound, count in zip(self.buckets, counts):
+                samples.append(("_bucket", self.labelnames + ("le",), key + (_format_value(float(bound)),), count))
+            samples.append(("_sum", self.labelnames, key, total))
+            samples.append(("_count", self.labelnames, key, counts[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Metrics of this process, rendered for Prometheus by `render`.
+
+    Collectors are called at scrape time and return metrics read from the
+    current state (executor, memory...) rather than updated as it changes.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def collect(self):
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            try:
+                metrics.extend(collector())
+            except Exception as exc:
+                print(" >> Metrics collector failed", exc)
+        return metrics
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.collect()) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to answer a request, by route.", ("method", "route", "status")
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests being answered, by route.", ("method", "route")
+)
+calculation_requests = registry.counter(
+    "radis_calculation_requests_total", "Spectrum calculations requested, by database and molecule.",
+    ("database", "molecule"),
+)
+phase_duration = registry.histogram(
+    "radis_phase_duration_seconds", "Time spent in each phase of the requests (Server-Timing spans).", ("phase",)
+)
+lines_loaded = registry.histogram(
+    "radis_lines_loaded", "Lines loaded from a databank into a new SpectrumFactory.", ("molecule",), COUNT_BUCKETS
+)
+lines_calculated = registry.histogram(
+    "radis_lines_calculated", "Lines used in a line-by-line calculation.", ("molecule",), COUNT_BUCKETS
+)
+grid_points = registry.histogram(
+    "radis_grid_points", "Spectral grid points of a line-by-line calculation.", ("molecule",), COUNT_BUCKETS
+)
+cache_lookups = registry.counter(
+    "radis_cache_lookups_total", "Lookups in each cache, by result.", ("cache", "result")
+)
+
+
+class MeasuredResponse:
+    """
+    ASGI response calling `on_sent()` once `response` is sent, its streamed body
+    included, or abandoned by the client.
+    """
+
+    def __init__(self, response, on_sent):
+        self.response = response
+        self.on_sent = on_sent
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.on_sent()
+
+
+def route_template(request):
+    """Path template of the route answering `request` (bounded label values), or "unmatched"."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+def count_calculation(payload):
+    """Count a requested calculation once per species of its payload."""
+    for species in payload.species:
+        calculation_requests.inc(database=payload.database, molecule=species.molecule)
+
+
+def observe_spans(spans):
+    """Record the phase durations, sizes and cache lookups carried by a request's spans."""
+    for item in spans:
+        name = item["name"]
+        phase_duration.observe(item["dur"] / 1000, phase=name)
+        if name in CACHE_SPANS and "hit" in item:
+            cache_lookups.inc(cache=CACHE_SPANS[name], result="hit" if item["hit"] else "miss")
+        if item.get("lines") is None:
+            continue
+        molecule = item.get("molecule", "")
+        if name == "fetch_databank":
+            lines_loaded.observe(item["lines"], molecule=molecule)
+        elif name in ("eq_spectrum", "non_eq_spectrum"):
+            lines_calculated.observe(item["lines"], molecule=molecule)
+            if item.get("points") is not None:
+                grid_points.observe(item["points"], molecule=molecule)
+
+
+def rss_bytes(pid="self"):
+    """Resident memory of a process (Linux /proc), or None if it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def descendant_pids(pid):
+    """Process ids of the children of a process, and of theirs (Linux /proc)."""
+    pids = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return pids
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children = [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            continue
+        for child in children:
+            pids += [child, *descendant_pids(child)]
+    return pids
+
+
+def collect_memory():
+    rss = Gauge("process_resident_memory_bytes", "Resident memory of the server process.")
+    workers = Gauge(
+        "radis_worker_resident_memory_bytes",
+        "Resident memory of each calculation worker process, species pool workers included.",
+        ("pid",),
+    )
+    value = rss_bytes()
+    if value is not None:
+        rss.set(value)
+    # the executor workers start their own species pools
+    pids = [pid for worker in spectrum_executor.worker_pids() for pid in (worker, *descendant_pids(worker))]
+    for pid in pids:
+        value = rss_bytes(pid)
+        if value is not None:
+            workers.set(value, pid=pid)
+    return [rss, workers]
+
+
+def collect_executor():
+    in_flight = Gauge("radis_executor_in_flight", "Calls running or waiting in the calculation executor.")
+    queue_depth = Gauge("radis_executor_queue_depth", "Calls waiting for a free calculation worker.")
+    capacity = Gauge("radis_executor_capacity", "Workers and queue slots of the calculation executor.", ("slots",))
+    rejected = Counter("radis_executor_rejected_total", "Calls rejected because the executor queue was full.")
+    in_flight.set(spectrum_executor.in_flight)
+    queue_depth.set(spectrum_executor.queue_depth)
+    capacity.set(spectrum_executor.max_workers, slots="workers")
+    capacity.set(spectrum_executor.max_queue, slots="queue")
+    rejected.inc(spectrum_executor.rejected)
+    return [in_flight, queue_depth, capacity, rejected]
+
+
+def collect_cache_ratios():
+    ratios = Gauge("radis_cache_hit_ratio", "Share of the lookups in each cache that were hits.", ("cache",))
+    lookups = cache_lookups.values()
+    for cache in sorted({cache for cache, _ in lookups}):
+        hits = lookups.get((cache, "hit"), 0)
+        total = hits + lookups.get((cache, "miss"), 0)
+        ratios.set(hits / total if total else 0.0, cache=cache)
+    return [ratios]
+
+
+registry.add_collector(collect_memory)
+registry.add_collector(collect_executor)
+registry.add_collector(collect_cache_ratios)
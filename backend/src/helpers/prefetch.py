@@ -0,0 +1,214 @@
+import os
+import json
+import asyncio
+import threading
+import multiprocessing
+from typing import NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from starlette.concurrency import run_in_threadpool
+from radis.io.hitran import fetch_hitran
+from radis.io.hitemp import fetch_hitemp
+from radis.io.geisa import fetch_geisa
+from radis.io.exomol import fetch_exomol
+from src.helpers.login_to_hitemp import setup_hitemp_credentials
+from src.helpers.calculateSpectrum import warm_factory
+from src.constants.constants import PREFETCH_MANIFEST, PREFETCH_STATE_PATH, PREFETCH_WORKERS
+
+FETCHERS = {
+    "hitran": fetch_hitran,
+    "hitemp": fetch_hitemp,
+    "geisa": fetch_geisa,
+    "exomol": fetch_exomol,
+}
+
+
+class PrefetchEntry(NamedTuple):
+    """One range of one molecule to download and parse; `warm` loads it into the factory pool."""
+    database: str
+    molecule: str
+    isotope: str
+    wmin: Optional[float]
+    wmax: Optional[float]
+    warm: bool
+
+    @property
+    def key(self):
+        window = "full" if self.wmin is None else f"{self.wmin:g}-{self.wmax:g}"
+        return f"{self.database}/{self.molecule}/{self.isotope}/{window}"
+
+
+def load_manifest(path=PREFETCH_MANIFEST):
+    """
+    Read the prefetch manifest: a list of databanks, each with its `database`,
+    `molecules`, `isotope` ("1" or "all"), `ranges` (cm-1, null for the whole
+    database) and whether to `warm` them.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = []
+    for databank in manifest["databanks"]:
+        database = databank["database"]
+        if database not in FETCHERS:
+            raise ValueError(f"Unknown database in prefetch manifest: {database}")
+        ranges = databank.get("ranges") or [(None, None)]
+        for molecule in databank["molecules"]:
+            for wmin, wmax in ranges:
+                if databank.get("warm", False) and wmin is None:
+                    raise ValueError(f"{database}/{molecule}: warming needs a wavenumber range")
+                entries.append(PrefetchEntry(
+                    database, molecule, str(databank.get("isotope", "all")), wmin, wmax, databank.get("warm", False)
+                ))
+    return entries
+
+
+def fetch_entry(entry, regen=False):
+    """Download (if needed) and parse one entry; returns its record for the prefetch state."""
+    df, local_paths = FETCHERS[entry.database](
+        entry.molecule,
+        isotope=None if entry.isotope == "all" else entry.isotope,
+        load_wavenum_min=entry.wmin,
+        load_wavenum_max=entry.wmax,
+        cache="regen" if regen else True,
+        verbose=False,
+        return_local_path=True,
+    )
+    if isinstance(local_paths, str):
+        local_paths = [local_paths]
+    return {
+        "lines": len(df),
+        "files": {path: os.path.getsize(path) for path in local_paths if os.path.isfile(path)},
+    }
+
+
+def fetch_group(entries):
+    """
+    Fetch entries of the same databank one after the other (radis registers a
+    databank in its config file, which concurrent fetches would race on).
+
+    A cached file that cannot be read is parsed again from the downloaded data.
+    """
+    results = []
+    for entry in entries:
+        try:
+            record = fetch_entry(entry)
+        except Exception as exc:
+            print(f" >> {entry.key}: {exc}, parsing again")
+            try:
+                record = fetch_entry(entry, regen=True)
+            except Exception as exc:
+                record = {"error": str(exc)}
+        results.append((entry.key, record))
+    return results
+
+
+def is_intact(record):
+    """Whether a previous fetch succeeded and its cached files are unchanged."""
+    if not record or "error" in record:
+        return False
+    for path, size in record["files"].items():
+        try:
+            if os.path.getsize(path) != size:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def prefetch(entries, workers=PREFETCH_WORKERS, state_path=PREFETCH_STATE_PATH, force=False):
+    """
+    Fetch the entries, databanks in parallel over `workers` processes.
+
+    Progress is saved in `state_path` after each databank, and entries whose
+    cached files are intact are skipped, so an interrupted prefetch resumes.
+    Returns the keys fetched, skipped and failed.
+    """
+    state = load_state(state_path)
+    todo = [entry for entry in entries if force or not is_intact(state.get(entry.key))]
+    summary = {"fetched": [], "skipped": [entry.key for entry in entries if entry not in todo], "failed": []}
+    groups = {}
+    for entry in todo:
+        groups.setdefault((entry.database, entry.molecule), []).append(entry)
+    print(f" >> Prefetching {len(todo)} entries ({len(summary['skipped'])} already cached)")
+    if any(entry.database == "hitemp" for entry in todo):
+        # once, before the workers: it writes the radis config file
+        setup_hitemp_credentials()
+
+    def record(results):
+        for key, entry_record in results:
+            state[key] = entry_record
+            summary["failed" if "error" in entry_record else "fetched"].append(key)
+            print(f" >> {key}: {entry_record.get('error') or str(entry_record['lines']) + ' lines'}")
+        save_state(state_path, state)
+
+    if workers <= 1:
+        for group in groups.values():
+            record(fetch_group(group))
+    elif groups:
+        # spawn: forking the multi-threaded server process is not safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for future in as_completed([pool.submit(fetch_group, group) for group in groups.values()]):
+                record(future.result())
+    return summary
+
+
+_warm_lock = threading.Lock()
+
+
+def warm_factory_pool(entries):
+    """Load the databank of the `warm` entries into the factory pool of this process."""
+    with _warm_lock:
+        for entry in entries:
+            if not entry.warm:
+                continue
+            try:
+                warm_factory(entry.database, entry.molecule, entry.isotope, entry.wmin, entry.wmax)
+            except Exception as exc:
+                print(f" >> Could not warm {entry.key}: {exc}")
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+# readiness reported by /ready: false while the startup warm-up runs
+warm_up_state = {"ready": True, "phase": "idle", "error": None}
+
+
+async def warm_up(executor, manifest_path=PREFETCH_MANIFEST):
+    """
+    Startup hook: prefetch the manifest, then start every calculation worker
+    with the `warm` databanks loaded in its factory pool.
+    """
+    warm_up_state.update(ready=False, phase="prefetch", error=None)
+    try:
+        entries = load_manifest(manifest_path)
+        await run_in_threadpool(prefetch, entries)
+        warm_up_state["phase"] = "warm"
+        warm = [entry for entry in entries if entry.warm]
+        if executor.kind == "thread":
+            # the worker threads share the factory pool of this process
+            await executor.run(warm_factory_pool, warm)
+        else:
+            executor.set_initializer(warm_factory_pool, warm)
+            # concurrent calls start every worker process, each running the initializer first
+            await asyncio.gather(*(executor.run(_worker_ready) for _ in range(executor.max_workers)))
+    except Exception as exc:
+        print(" >> Warm-up failed", exc)
+        warm_up_state["error"] = str(exc)
+    finally:
+        warm_up_state.update(ready=True, phase="done")
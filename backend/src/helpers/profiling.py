@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import contextvars
+from io import StringIO
+from src.constants.constants import PROFILE_ADMIN_TOKEN, PROFILE_DIRECTORY, PROFILE_SAMPLE_INTERVAL
+
+# profiler -> extension of its artifacts
+PROFILERS = {
+    "cprofile": ".prof",
+    "sampling": ".speedscope.json",
+}
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_ARTIFACT = re.compile(r"^[0-9a-f]{8}(\.prof|\.speedscope\.json)$")
+
+# (profile id, profiler) of the request being handled; None when it is not profiled
+_profile = contextvars.ContextVar("profile", default=None)
+
+
+class ProfileAccessError(Exception):
+    """Raised when profiling is requested without the admin token."""
+
+
+class UnknownProfilerError(Exception):
+    """Raised when an admin requests a profiler that does not exist."""
+
+
+def is_admin(token):
+    return PROFILE_ADMIN_TOKEN is not None and token == PROFILE_ADMIN_TOKEN
+
+
+def requested_profiler(request):
+    """
+    Profiler asked for by the `X-Profile` header or `profile` query parameter,
+    or None. Raises ProfileAccessError unless `X-Admin-Token` is the admin token,
+    and UnknownProfilerError for a profiler not in PROFILERS.
+    """
+    profiler = request.headers.get("X-Profile") or request.query_params.get("profile")
+    if profiler is None:
+        return None
+    if not is_admin(request.headers.get("X-Admin-Token")):
+        raise ProfileAccessError("Profiling needs a valid X-Admin-Token")
+    if profiler not in PROFILERS:
+        raise UnknownProfilerError(f"Unknown profiler {profiler}, use one of {', '.join(PROFILERS)}")
+    return profiler
+
+
+def start_profile(profiler):
+    """Profile the worker calls of the current request; returns the profile id."""
+    profile_id = uuid.uuid4().hex
+    _profile.set((profile_id, profiler))
+    return profile_id
+
+
+def current_profile():
+    return _profile.get()
+
+
+def artifact_path(profile_id, profiler):
+    """New artifact file of a profile: one per worker call of the request."""
+    directory = os.path.join(PROFILE_DIRECTORY, profile_id)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, uuid.uuid4().hex[:8] + PROFILERS[profiler])
+
+
+def profile_call(profiler, path, fn, /, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` under `profiler`, saving the report to `path` even if it raises."""
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
+
+    sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+    sampler.start()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sampler.stop()
+        with open(path, "w") as f:
+            json.dump(sampler.speedscope(getattr(fn, "__name__", "call")), f)
+
+
+class StackSampler(threading.Thread):
+    """
+    Sampling profiler: records the stack of thread `thread_id` every `interval`
+    seconds, as py-spy does from outside the process. Much cheaper than cProfile
+    on the many small radis calls, at the price of statistical timings.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = {}  # (name, file, line) -> index
+        self.samples = []
+        self.weights = []
+        self._done = threading.Event()
+
+    def _frame_index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        return self.frames.setdefault(key, len(self.frames))
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                frame = frame.f_back
+            self.samples.append(stack[::-1])
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def speedscope(self, name):
+        """The samples in the speedscope file format (https://www.speedscope.app)."""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {
+                "frames": [
+                    {"name": function, "file": file, "line": line}
+                    for (function, file, line) in self.frames
+                ],
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "name": name,
+            "exporter": "radis-app",
+        }
+
+
+def list_profiles():
+    """Ids of the stored profiles with their artifacts, most recent first."""
+    if not os.path.isdir(PROFILE_DIRECTORY):
+        return []
+    entries = [entry for entry in os.scandir(PROFILE_DIRECTORY) if _PROFILE_ID.match(entry.name)]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [
+        {"id": entry.name, "created": entry.stat().st_mtime, "artifacts": profile_artifacts(entry.name)}
+        for entry in entries
+    ]
+
+
+def profile_artifacts(profile_id):
+    """Artifact file names of a profile, or None if there is no such profile."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    directory = os.path.join(PROFILE_DIRECTORY, profile_id)
+    if not os.path.isdir(directory):
+        return None
+    return sorted(name for name in os.listdir(directory) if _ARTIFACT.match(name))
+
+
+def get_artifact_path(profile_id, name):
+    """Path of an artifact of a profile, or None if it does not exist."""
+    artifacts = profile_artifacts(profile_id)
+    if artifacts is None or name not in artifacts:
+        return None
+    return os.path.join(PROFILE_DIRECTORY, profile_id, name)
+
+
+def pstats_text(path, sort="cumulative", limit=50):
+    """Text report of a cProfile artifact, as printed by pstats."""
+    output = StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,47 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def arrays_to_shared(arrays):
+    """
+    Copy a dict of NumPy arrays into one shared memory block.
+
+    Returns (block name, layout) to send to the parent process instead of the
+    pickled arrays; the parent reads them with `arrays_from_shared`, which also
+    frees the block.
+    """
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        # keep every array 8-byte aligned in the block
+        offset += -offset % 8
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for (name, dtype, shape, start), array in zip(layout, arrays.values()):
+            view = np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=start)
+            view[...] = array
+            del view
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return block.name, layout
+
+
+def arrays_from_shared(block_name, layout):
+    """Copy the arrays out of a block written by `arrays_to_shared` and free it."""
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        arrays = {}
+        for name, dtype, shape, start in layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=start)
+            arrays[name] = view.copy()
+            del view
+        return arrays
+    finally:
+        block.close()
+        block.unlink()
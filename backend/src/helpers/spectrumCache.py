@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from radis import load_spec
+from src.constants.constants import (
+    SPECTRUM_CACHE_DIRECTORY,
+    SPECTRUM_CACHE_MAX_MEMORY_BYTES,
+    SPECTRUM_CACHE_MAX_DISK_BYTES,
+    SPECTRUM_CACHE_TTL,
+)
+
+# files of the disk tier: cached spectra and the zoom pyramids built from them
+CACHE_FILE_SUFFIXES = (".spec", ".pyramid.npz")
+
+
+def payload_cache_key(payload) -> str:
+    """
+    Canonical hash of the physics-relevant fields of a calcPayload.
+
+    Fields that only change how the result is presented (mode, slit) are left
+    out, so switching between them hits the same cached spectrum.
+    """
+    noneq = payload.tvib is not None and payload.trot is not None
+    key = {
+        "species": sorted(
+            [species.molecule, float(species.mole_fraction), bool(species.is_all_isotopes)]
+            for species in payload.species
+        ),
+        "tgas": None if noneq else float(payload.tgas),
+        "tvib": float(payload.tvib) if noneq else None,
+        "trot": float(payload.trot) if noneq else None,
+        "pressure": [float(payload.pressure), payload.pressure_units],
+        "path_length": [float(payload.path_length), payload.path_length_units],
+        "wavenumber_range": [
+            float(payload.min_wavenumber_range),
+            float(payload.max_wavenumber_range),
+            payload.wavelength_units,
+        ],
+        "database": payload.database,
+    }
+    if payload.fast:
+        # possibly interpolated from lookup tables: never served for exact requests
+        key["fast"] = True
+    blob = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def spectrum_nbytes(spectrum) -> int:
+    """Approximate memory footprint of the arrays held by a Spectrum."""
+    quantities = getattr(spectrum, "_q", {})
+    return sum(getattr(value, "nbytes", 0) for value in quantities.values())
+
+
+class SpectrumCache:
+    """
+    Two-tier cache of calculated spectra.
+
+    The memory tier is an LRU bounded by the total size of the cached arrays,
+    the disk tier keeps `<key>.spec` files bounded by their total file size
+    (zoom pyramids stored alongside count towards the same budget).
+    Both tiers drop entries older than `ttl` seconds.
+    """
+
+    def __init__(self, directory, max_memory_bytes, max_disk_bytes, ttl):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (spectrum, nbytes, stored_at)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.spec")
+
+    def _expired(self, stored_at):
+        return time.time() - stored_at > self.ttl
+
+    def get(self, key):
+        """Return a copy of the cached spectrum for `key`, or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                spectrum, nbytes, stored_at = entry
+                if self._expired(stored_at):
+                    self._drop_memory(key)
+                else:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return spectrum.copy()
+
+        spectrum = self._get_disk(key)
+        with self._lock:
+            if spectrum is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+        # promote to the memory tier
+        self._put_memory(key, spectrum)
+        return spectrum.copy()
+
+    def put(self, key, spectrum):
+        """Store `spectrum` in both tiers."""
+        self._put_memory(key, spectrum)
+        self._put_disk(key, spectrum)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(CACHE_FILE_SUFFIXES):
+                    os.remove(entry.path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    # memory tier
+
+    def _drop_memory(self, key):
+        _, nbytes, _ = self._memory.pop(key)
+        self._memory_bytes -= nbytes
+
+    def _put_memory(self, key, spectrum):
+        nbytes = spectrum_nbytes(spectrum)
+        if nbytes > self.max_memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._drop_memory(key)
+            self._memory[key] = (spectrum.copy(), nbytes, time.time())
+            self._memory_bytes += nbytes
+            while self._memory_bytes > self.max_memory_bytes:
+                oldest = next(iter(self._memory))
+                self._drop_memory(oldest)
+                self.evictions += 1
+
+    # disk tier
+
+    def _get_disk(self, key):
+        if self.max_disk_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+        except OSError:
+            return None
+        if self._expired(stored_at):
+            self._remove_file(path)
+            return None
+        try:
+            spectrum = load_spec(path)
+        except Exception as exc:
+            print(" >> Discarding unreadable cached spectrum", exc)
+            self._remove_file(path)
+            return None
+        # refresh the access time used for LRU eviction on disk
+        os.utime(path, (time.time(), stored_at))
+        return spectrum
+
+    def _put_disk(self, key, spectrum):
+        if self.max_disk_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # written aside then renamed, so readers never load a partly written file;
+        # it ends with .spec, as radis appends it otherwise
+        tmp_path = os.path.join(self.directory, f"tmp-{uuid.uuid4().hex}.spec")
+        try:
+            spectrum.store(tmp_path, compress=False, if_exists_then="replace")
+            os.replace(tmp_path, path)
+        except Exception as exc:
+            print(" >> Could not write spectrum to the cache", exc)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("tmp-") or not entry.name.endswith(CACHE_FILE_SUFFIXES):
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > self.ttl:
+                self._remove_file(entry.path)
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+        # least recently used first
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+
+
+spectrum_cache = SpectrumCache(
+    directory=SPECTRUM_CACHE_DIRECTORY,
+    max_memory_bytes=SPECTRUM_CACHE_MAX_MEMORY_BYTES,
+    max_disk_bytes=SPECTRUM_CACHE_MAX_DISK_BYTES,
+    ttl=SPECTRUM_CACHE_TTL,
+)
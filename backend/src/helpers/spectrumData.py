@@ -0,0 +1,149 @@
+import numpy as np
+from src.helpers.downsample import downsample, downsample_columns
+
+# Setting return payload size limit of 50 MB
+PAYLOAD_THRESHOLD = 5e7
+
+
+def get_spectrum_arrays(spectrum, mode, wavelength_units):
+    """
+    Extract the (x, y) arrays of `mode` from a spectrum, in the requested units.
+
+    NaN points are removed from both arrays together so x and y stay aligned.
+    """
+    wunit = spectrum.get_waveunit()
+    iunit = "default"
+    x, y = spectrum.get(mode, wunit=wunit, Iunit=iunit)
+    # if the specified units were nm, convert the spectrum range (cm-1 by default) to nm
+    if (wavelength_units == 'u.nm'):
+        x = 1e7 / x
+        order = np.argsort(x)
+        x, y = x[order], y[order]
+    # to remove the nan values from x and y
+    keep = ~(np.isnan(x) | np.isnan(y))
+    return x[keep], y[keep]
+
+
+def get_modes_arrays(spectrum, modes, wavelength_units):
+    """
+    Extract x and the y arrays of several modes on that shared x axis.
+
+    Points where any mode is NaN (e.g. the edges of a slit convolution) are
+    removed from all of them.
+    """
+    x = None
+    ys = {}
+    for mode in modes:
+        x_mode, ys[mode] = spectrum.get(mode, wunit=spectrum.get_waveunit(), Iunit="default")
+        if x is None:
+            x = x_mode
+        elif len(x_mode) != len(x):
+            raise ValueError(f"{mode} is not on the same wavenumber grid as {modes[0]}")
+    if (wavelength_units == 'u.nm'):
+        x = 1e7 / x
+        order = np.argsort(x)
+        x = x[order]
+        ys = {mode: y[order] for mode, y in ys.items()}
+    keep = ~np.isnan(x)
+    for y in ys.values():
+        keep &= ~np.isnan(y)
+    return x[keep], {mode: y[keep] for mode, y in ys.items()}
+
+
+def uniform_grid(x, rtol=1e-6):
+    """
+    Return (x0, dx) if `x` is rebuilt by x0 + i*dx within `rtol` of the step, else None.
+
+    RADIS calculates on a uniform wavenumber grid; the conversion to nm or the
+    removal of NaN points inside the range break that.
+    """
+    n = len(x)
+    if n < 2:
+        return None
+    x0 = float(x[0])
+    dx = (float(x[-1]) - x0) / (n - 1)
+    if dx == 0:
+        return None
+    error = np.abs(x - (x0 + dx * np.arange(n))).max()
+    if error > rtol * abs(dx):
+        return None
+    return x0, dx
+
+
+def target_points(n_spectrum, n_points, options=None):
+    """
+    Number of points to send back, or None to send everything.
+
+    Spectra above the payload threshold are always reduced; the client may ask
+    for fewer points, e.g. the pixel width of its plot.
+    """
+    target = None
+    if n_spectrum * 8 * 2 > PAYLOAD_THRESHOLD:
+        print("Reducing the payload size")
+        # one float is about 8 bytes
+        # we return 2 arrays (w, I)
+        resample = int(n_spectrum * 8 * 2 // PAYLOAD_THRESHOLD)
+        target = n_points // resample
+    if options is not None and options.points is not None:
+        target = options.points if target is None else min(target, options.points)
+    return target
+
+
+def build_spectrum_data(x, y, units, implicit_x=False):
+    """
+    {x, y, units} response data; with `implicit_x`, a uniform x axis is sent
+    as {x0, dx, n} instead of an array.
+    """
+    grid = uniform_grid(x) if implicit_x else None
+    if grid is not None:
+        x0, dx = grid
+        return {
+            "x0": x0,
+            "dx": dx,
+            "n": len(x),
+            "y": y,
+            "units": units,
+        }
+    return {
+        "x": x,
+        "y": y,
+        "units": units,
+    }
+
+
+def get_spectrum_data(spectrum, mode, wavelength_units, options=None):
+    """
+    Build the {x, y, units} response data of a spectrum.
+
+    x and y stay NumPy arrays; see src/helpers/wireFormat.py for their encoding.
+    `options` (ResponseOptions) controls downsampling and the implicit x axis.
+    """
+    x, y = get_spectrum_arrays(spectrum, mode, wavelength_units)
+    return arrays_to_spectrum_data(x, y, spectrum.units[mode], len(spectrum), options)
+
+
+def arrays_to_spectrum_data(x, y, units, n_spectrum, options=None):
+    """`get_spectrum_data` for arrays already extracted with `get_spectrum_arrays`."""
+    # Reduce payload size, keeping the peaks (see src/helpers/downsample.py)
+    target = target_points(n_spectrum, len(x), options)
+    if target is not None:
+        method = options.downsample if options is not None else "minmax"
+        x, y = downsample(x, y, target, method)
+    implicit_x = options is not None and options.implicit_x
+    return build_spectrum_data(x, y, units, implicit_x)
+
+
+def get_modes_data(spectrum, modes, wavelength_units, options=None):
+    """
+    Build the {x, y: {mode: y}, units: {mode: units}} response data of several
+    modes of one spectrum, sharing one x axis.
+    """
+    x, ys = get_modes_arrays(spectrum, modes, wavelength_units)
+    # the payload threshold applies to the x array plus all y arrays
+    target = target_points(len(spectrum) * (len(ys) + 1) // 2, len(x), options)
+    if target is not None:
+        method = options.downsample if options is not None else "minmax"
+        x, ys = downsample_columns(x, ys, target, method)
+    implicit_x = options is not None and options.implicit_x
+    units = {mode: spectrum.units[mode] for mode in ys}
+    return build_spectrum_data(x, ys, units, implicit_x)
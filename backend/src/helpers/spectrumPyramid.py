@@ -0,0 +1,202 @@
+import os
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.helpers.downsample import minmax_indices
+from src.helpers.spectrumCache import payload_cache_key
+from src.constants.constants import (
+    SPECTRUM_CACHE_DIRECTORY,
+    SPECTRUM_CACHE_TTL,
+    SPECTRUM_PYRAMID_FACTOR,
+    SPECTRUM_PYRAMID_MEMORY_ENTRIES,
+)
+
+PYRAMID_SUFFIX = ".pyramid.npz"
+# levels stop once they are this small, a viewport never needs fewer points
+PYRAMID_MIN_POINTS = 4096
+# seconds a view request waits for a pyramid still being built
+PYRAMID_BUILD_WAIT = 30
+
+
+def spectrum_view_id(payload) -> str:
+    """
+    Id of the plotted curve of a calcPayload: the cached spectrum (see
+    `payload_cache_key`) plus the mode, units and slit it is shown with.
+    """
+    key = {
+        "spectrum": payload_cache_key(payload),
+        "mode": payload.mode,
+        "wavelength_units": payload.wavelength_units,
+        "slit": float(payload.simulate_slit) if payload.use_simulate_slit else None,
+    }
+    blob = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def build_pyramid(x, y, factor=SPECTRUM_PYRAMID_FACTOR, min_points=PYRAMID_MIN_POINTS):
+    """
+    Multi-resolution min/max pyramid of a spectrum.
+
+    Level 0 is the full-resolution curve; each next level keeps the min and max
+    of buckets of the previous one, so it is about `factor` times smaller and
+    still holds every peak.
+    """
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x)
+        x, y = x[order], y[order]
+    levels = [(x, y)]
+    while len(levels[-1][0]) > min_points:
+        x_prev, y_prev = levels[-1]
+        indices = minmax_indices(y_prev, len(y_prev) // factor)
+        if len(indices) >= len(y_prev):
+            break
+        levels.append((x_prev[indices], y_prev[indices]))
+    return levels
+
+
+def pyramid_view(levels, wmin, wmax, pixels):
+    """
+    Points of the viewport [wmin, wmax] at about 2 points per pixel.
+
+    Picks the coarsest level that still has enough points in the viewport, and
+    keeps one point beyond each edge so the plotted line reaches the borders.
+    Returns (x, y, level).
+    """
+    target = 2 * pixels
+    level = 0
+    for index, (x, _) in enumerate(levels):
+        count = np.searchsorted(x, wmax, side="right") - np.searchsorted(x, wmin, side="left")
+        if count < target:
+            break
+        level = index
+    x, y = levels[level]
+    start = max(np.searchsorted(x, wmin, side="left") - 1, 0)
+    stop = min(np.searchsorted(x, wmax, side="right") + 1, len(x))
+    x, y = x[start:stop], y[start:stop]
+    if len(x) > target:
+        indices = minmax_indices(y, target)
+        x, y = x[indices], y[indices]
+    return x, y, level
+
+
+class PyramidStore:
+    """
+    Zoom pyramids stored as `<id>.pyramid.npz` next to the cached spectra.
+
+    The files share the disk budget and TTL of the spectrum cache; the last
+    loaded pyramids are also kept in memory so panning does not hit the disk.
+    """
+
+    def __init__(self, directory, ttl, max_memory_entries):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()  # view id -> (levels, units)
+        self._building = {}  # view id -> threading.Event
+        self._lock = threading.Lock()
+
+    def _path(self, view_id):
+        return os.path.join(self.directory, f"{view_id}{PYRAMID_SUFFIX}")
+
+    def begin(self, view_id):
+        """
+        Mark the pyramid of `view_id` as being built; returns False if it
+        already exists (and has not expired) or is being built.
+        """
+        with self._lock:
+            if view_id in self._building:
+                return False
+            if self._stored_at(view_id) is not None:
+                return False
+            # an expired pyramid is built again
+            self._memory.pop(view_id, None)
+            self._building[view_id] = threading.Event()
+            return True
+
+    def _stored_at(self, view_id):
+        """Modification time of the pyramid file of `view_id`, or None if missing or expired (then deleted)."""
+        path = self._path(view_id)
+        try:
+            stored_at = os.path.getmtime(path)
+        except OSError:
+            return None
+        if time.time() - stored_at <= self.ttl:
+            return stored_at
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    def build(self, view_id, x, y, units):
+        """Build and store the pyramid of `view_id`, then wake up waiting views."""
+        try:
+            levels = build_pyramid(np.asarray(x), np.asarray(y))
+            arrays = {"units": np.array(str(units))}
+            for index, (x_level, y_level) in enumerate(levels):
+                arrays[f"x{index}"] = x_level
+                arrays[f"y{index}"] = y_level
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(view_id)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+            self._remember(view_id, levels, str(units))
+        except Exception as exc:
+            print(" >> Could not build the zoom pyramid", exc)
+        finally:
+            with self._lock:
+                event = self._building.pop(view_id, None)
+            if event is not None:
+                event.set()
+
+    def load(self, view_id):
+        """Return (levels, units) of `view_id`, or None if it is unknown or expired."""
+        with self._lock:
+            event = self._building.get(view_id)
+        if event is not None:
+            event.wait(PYRAMID_BUILD_WAIT)
+
+        with self._lock:
+            entry = self._memory.get(view_id)
+            if entry is not None:
+                self._memory.move_to_end(view_id)
+        path = self._path(view_id)
+        with self._lock:
+            stored_at = self._stored_at(view_id)
+        if stored_at is None:
+            self._forget(view_id)
+            return None
+        # refresh the access time used for LRU eviction by the spectrum cache
+        os.utime(path, (time.time(), stored_at))
+        if entry is not None:
+            return entry
+
+        with np.load(path) as data:
+            n_levels = sum(1 for name in data.files if name.startswith("x"))
+            levels = [(data[f"x{index}"], data[f"y{index}"]) for index in range(n_levels)]
+            units = str(data["units"])
+        self._remember(view_id, levels, units)
+        return levels, units
+
+    def _remember(self, view_id, levels, units):
+        with self._lock:
+            self._memory[view_id] = (levels, units)
+            self._memory.move_to_end(view_id)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _forget(self, view_id):
+        with self._lock:
+            self._memory.pop(view_id, None)
+
+
+pyramid_store = PyramidStore(
+    directory=SPECTRUM_CACHE_DIRECTORY,
+    ttl=SPECTRUM_CACHE_TTL,
+    max_memory_entries=SPECTRUM_PYRAMID_MEMORY_ENTRIES,
+)
@@ -0,0 +1,106 @@
+import math
+import asyncio
+import itertools
+import numpy as np
+from src.helpers.calculateSpectrum import compute_spectrum
+
+
+def sweep_conditions(axes):
+    """Every combination of the axis values, as {axis: value} dicts (last axis varies fastest)."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def sweep_payload(base, condition):
+    """The base payload with the swept parameters of `condition` replaced."""
+    update = {name: value for name, value in condition.items() if name != "mole_fraction"}
+    if "mole_fraction" in condition:
+        species = base.species[0].model_copy(update={"mole_fraction": condition["mole_fraction"]})
+        update["species"] = [species]
+    return base.model_copy(update=update)
+
+
+def sweep_chunks(conditions, max_workers):
+    """Split the conditions into at most `max_workers` contiguous chunks, one per worker call."""
+    size = math.ceil(len(conditions) / max_workers)
+    return [conditions[start:start + size] for start in range(0, len(conditions), size)]
+
+
+def run_sweep_chunk(base, conditions, wstep):
+    """
+    Calculate a chunk of sweep conditions one after the other in one worker.
+
+    Only the conditions change between calculations, so the pooled
+    SpectrumFactory of the worker (see factoryPool.py) is loaded once and its
+    eq_spectrum / non_eq_spectrum is called for each condition. The fixed
+    `wstep` puts every spectrum on the same grid.
+
+    Returns (x, rows, units): the wavenumbers, one row of `base.mode` per
+    condition, and the unit of the rows.
+    """
+    if(base.wavelength_units=="1/u.cm"):
+        slit_unit="cm-1"
+    else:
+        slit_unit="nm"
+    x = None
+    for row, condition in enumerate(conditions):
+        payload = sweep_payload(base, condition)
+        spectrum = compute_spectrum(payload, wstep=wstep)
+        if payload.use_simulate_slit is True:
+            spectrum.apply_slit(payload.simulate_slit, slit_unit)
+        x_row, y_row = spectrum.get(base.mode, wunit=spectrum.get_waveunit(), Iunit="default")
+        if x is None:
+            x = x_row
+            rows = np.empty((len(conditions), len(x)))
+            units = spectrum.units[base.mode]
+        rows[row] = align_row(x, x_row, y_row)
+    return x, rows, units
+
+
+def align_row(x, x_row, y_row):
+    """`y_row` on the grid `x`, interpolated only if its own grid differs."""
+    if len(x_row) == len(x) and np.allclose(x_row, x, rtol=0, atol=1e-9):
+        return y_row
+    return np.interp(x, x_row, y_row, left=np.nan, right=np.nan)
+
+
+def sweep_arrays(x, rows, wavelength_units):
+    """
+    Convert the x axis to the requested units and drop the columns where any
+    condition is NaN, so every row stays on the same x.
+    """
+    if (wavelength_units == 'u.nm'):
+        x = 1e7 / x
+        order = np.argsort(x)
+        x, rows = x[order], rows[:, order]
+    keep = ~(np.isnan(x) | np.isnan(rows).any(axis=0))
+    return x[keep], rows[:, keep]
+
+
+async def run_sweep(executor, sweep, retry_delay=1.0):
+    """
+    Run a sweep on the executor, its conditions split over the workers.
+
+    Returns the response data: x, y as a (conditions x points) array, and the
+    value of every axis for each row.
+    """
+    conditions = sweep_conditions(sweep.axes)
+    chunks = sweep_chunks(conditions, executor.max_workers)
+    print(f" >> Sweep of {len(conditions)} conditions in {len(chunks)} chunks")
+    results = await asyncio.gather(*(
+        executor.run_retrying(run_sweep_chunk, sweep.base, chunk, sweep.wstep, retry_delay=retry_delay)
+        for chunk in chunks
+    ))
+    x, _, units = results[0]
+    rows = np.vstack([
+        np.array([align_row(x, x_chunk, y_row) for y_row in chunk_rows])
+        for x_chunk, chunk_rows, _ in results
+    ])
+    x, rows = sweep_arrays(x, rows, sweep.base.wavelength_units)
+    return {
+        "x": x,
+        "y": rows,
+        "conditions": {name: np.array([condition[name] for condition in conditions]) for name in sweep.axes},
+        "mode": sweep.base.mode,
+        "units": units,
+    }
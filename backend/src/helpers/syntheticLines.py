@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pandas as pd
+from radis.db.classes import get_molecule_identifier
+from src.helpers.lineStore import line_store_name, write_line_store
+from src.constants.constants import LINE_STORE_DIRECTORY
+
+SYNTHETIC_DATABASE = "synthetic"
+# lines generated (and held in memory) at once
+SYNTHETIC_CHUNK_LINES = 1_000_000
+HC_K = 1.4387769  # second radiation constant, cm.K
+
+
+def synthetic_lines(molecule, wmin, wmax, count, rng):
+    """
+    `count` random isotope 1 lines of `molecule` on [wmin, wmax] (cm-1), sorted,
+    with the columns and value ranges of HITRAN lines. Strong lines have low
+    lower-state energies, so the spectra change with temperature as real ones do.
+    """
+    lower_energy = rng.exponential(1500, count)
+    air_broadening = rng.normal(0.06, 0.01, count).clip(0.02, 0.12)
+    df = pd.DataFrame({
+        "wav": np.sort(rng.uniform(wmin, wmax, count)),
+        "int": 10 ** rng.normal(-21, 1, count) * np.exp(-HC_K * lower_energy / 296),
+        "A": 10 ** rng.uniform(-2, 2, count),
+        "airbrd": air_broadening,
+        "selbrd": air_broadening * rng.uniform(1, 1.4, count),
+        "El": lower_energy,
+        "Tdpair": rng.normal(0.7, 0.05, count).clip(0.4, 0.9),
+        "Pshft": rng.normal(-0.003, 0.002, count),
+        "gp": 2 * rng.integers(0, 80, count) + 1.0,
+    })
+    df.attrs.update({"id": get_molecule_identifier(molecule), "iso": 1})
+    return df
+
+
+def synthetic_line_chunks(molecule, wmin, wmax, count, seed=0, chunk_lines=SYNTHETIC_CHUNK_LINES):
+    """
+    The lines of `synthetic_lines`, generated in chunks of consecutive ranges
+    for `write_line_store`. The same arguments always give the same lines.
+    """
+    chunks = max(1, -(-count // chunk_lines))
+    edges = np.linspace(wmin, wmax, chunks + 1)
+    counts = np.full(chunks, count // chunks)
+    counts[: count % chunks] += 1
+    for index in range(chunks):
+        rng = np.random.default_rng([seed, index])
+        yield synthetic_lines(molecule, edges[index], edges[index + 1], counts[index], rng), (edges[index], edges[index + 1])
+
+
+def build_synthetic_line_store(molecule, count, wmin=500, wmax=10000, seed=0, directory=LINE_STORE_DIRECTORY):
+    """Write `count` synthetic lines of `molecule` as the line store of the synthetic database."""
+    path = os.path.join(directory, line_store_name(SYNTHETIC_DATABASE, molecule, "1", "equilibrium"))
+    return write_line_store(synthetic_line_chunks(molecule, wmin, wmax, count, seed), path)
@@ -0,0 +1,73 @@
+import time
+import json
+import contextvars
+from contextlib import contextmanager
+
+# spans of the request being handled; None outside requests (e.g. in scripts)
+_spans = contextvars.ContextVar("timing_spans", default=None)
+
+
+def start_request():
+    """Start collecting the spans of a request in the current context."""
+    spans = []
+    _spans.set(spans)
+    return spans
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time the enclosed block as the phase `name` of the current request.
+
+    Yields the span's attribute dict, so that sizes known only at the end
+    (lines loaded, points, bytes...) can be added to it.
+    """
+    spans = _spans.get()
+    attrs = dict(attrs)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        if spans is not None:
+            spans.append({"name": name, "dur": (time.perf_counter() - start) * 1000, **attrs})
+
+
+def add_spans(spans):
+    """Add spans recorded elsewhere (another worker) to the current request."""
+    current = _spans.get()
+    if current is not None and spans:
+        current.extend(spans)
+
+
+def run_timed(fn, *args, submitted_at=None, **kwargs):
+    """
+    Run `fn` in a worker, collecting its spans: returns (result, spans) for
+    `add_spans` in the caller. `submitted_at` (time.time()) adds the time spent
+    waiting for the worker as a `queue` span.
+    """
+    spans = start_request()
+    if submitted_at is not None:
+        spans.append({"name": "queue", "dur": max(time.time() - submitted_at, 0) * 1000})
+    return fn(*args, **kwargs), spans
+
+
+def server_timing(spans):
+    """Server-Timing header value of the spans, their attributes as description."""
+    entries = []
+    for item in spans:
+        attrs = ", ".join(f"{key}={value}" for key, value in item.items() if key not in ("name", "dur"))
+        entry = f"{item['name']};dur={item['dur']:.1f}"
+        if attrs:
+            entry += f';desc="{attrs}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def timing_log(method, path, status_code, spans):
+    """One JSON log line with the spans of a request."""
+    return "timing " + json.dumps({
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "spans": [{**item, "dur": round(item["dur"], 3)} for item in spans],
+    }, default=str)
@@ -0,0 +1,169 @@
+import io
+import json
+import struct
+import numpy as np
+from fastapi.responses import Response, JSONResponse
+from src.helpers.timing import span
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency, Arrow IPC is only offered when installed
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+RAW_MEDIA_TYPE = "application/octet-stream"
+NPY_MEDIA_TYPE = "application/x-npy"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# JSON metadata (units, fit values, array layout) of the binary formats
+META_HEADER = "X-Spectrum-Meta"
+
+DTYPES = {"float64": np.dtype("<f8"), "float32": np.dtype("<f4")}
+
+
+def split_arrays(data, prefix=""):
+    """
+    Separate the NumPy arrays of a (nested) response dict from its metadata.
+
+    Arrays are returned flat, named by their dotted path (e.g. `best_spectrum.x`).
+    """
+    meta = {}
+    arrays = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, dict):
+            meta[key], nested = split_arrays(value, f"{name}.")
+            arrays.update(nested)
+        else:
+            meta[key] = value
+    return meta, arrays
+
+
+def to_jsonable(data):
+    """Replace the NumPy arrays of a (nested) response dict by lists."""
+    if isinstance(data, dict):
+        return {key: to_jsonable(value) for key, value in data.items()}
+    if isinstance(data, np.ndarray):
+        return data.tolist()
+    return data
+
+
+def parse_accept(accept):
+    """Parse an Accept header into (media_type, params) sorted by preference."""
+    choices = []
+    for position, item in enumerate((accept or "").split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        params = {}
+        for part in parts[1:]:
+            if "=" in part:
+                key, value = part.split("=", 1)
+                params[key.strip().lower()] = value.strip()
+        try:
+            q = float(params.pop("q", 1))
+        except ValueError:
+            q = 0
+        if q > 0:
+            choices.append((-q, position, parts[0].lower(), params))
+    return [(media_type, params) for _, _, media_type, params in sorted(choices)]
+
+
+def negotiate(accept, columnar):
+    """
+    Pick the response format from the Accept header.
+
+    `columnar` tells whether all arrays have the same length, which .npy and
+    Arrow need. Falls back to JSON when nothing else matches.
+    """
+    supported = [RAW_MEDIA_TYPE]
+    if columnar:
+        supported.append(NPY_MEDIA_TYPE)
+        if pa is not None:
+            supported.append(ARROW_MEDIA_TYPE)
+    for media_type, params in parse_accept(accept):
+        if media_type in (JSON_MEDIA_TYPE, "*/*", "application/*"):
+            return JSON_MEDIA_TYPE, params
+        if media_type in supported:
+            return media_type, params
+    return JSON_MEDIA_TYPE, {}
+
+
+def encode_raw(meta, arrays, dtype):
+    """
+    Length-prefixed JSON header followed by the raw little-endian array buffers.
+
+    Layout: uint32 header length | JSON header | buffers. The header lists each
+    array's name, dtype, shape and byte offset from the start of the buffers,
+    and is padded so the buffers start 8-byte aligned.
+    """
+    layout = []
+    buffers = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=dtype)
+        layout.append({
+            "name": name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        })
+        buffers.append(array)
+        offset += array.nbytes
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    header += b" " * (-(4 + len(header)) % 8)
+    return b"".join([struct.pack("<I", len(header)), header, *buffers])
+
+
+def encode_npy(arrays, dtype):
+    """Arrays stacked as the rows of one .npy array."""
+    stacked = np.empty((len(arrays), len(next(iter(arrays.values())))), dtype=dtype)
+    for row, array in enumerate(arrays.values()):
+        stacked[row] = array
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, stacked, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def encode_arrow(meta, arrays, dtype):
+    """Arrays as the columns of one Arrow IPC record batch."""
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array(np.asarray(array, dtype=dtype)) for array in arrays.values()],
+        names=list(arrays),
+    )
+    batch = batch.replace_schema_metadata({"meta": json.dumps(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_response(data, accept=None):
+    """
+    Encode response data holding NumPy arrays in the format negotiated from `accept`.
+
+    JSON keeps the usual `{"data": ...}` envelope. Binary formats serialize
+    straight from the array buffers, with the metadata in META_HEADER.
+    """
+    meta, arrays = split_arrays(data)
+    lengths = {array.shape for array in arrays.values()}
+    columnar = len(lengths) == 1 and len(next(iter(lengths))) == 1
+    media_type, params = negotiate(accept, columnar)
+
+    with span("encode", format=media_type) as timing:
+        if media_type == JSON_MEDIA_TYPE:
+            response = JSONResponse(content={"data": to_jsonable(data)})
+        else:
+            dtype = DTYPES.get(params.get("dtype", "float64"), DTYPES["float64"])
+            headers = {META_HEADER: json.dumps({**meta, "arrays": list(arrays)})}
+            if media_type == NPY_MEDIA_TYPE:
+                content = encode_npy(arrays, dtype)
+            elif media_type == ARROW_MEDIA_TYPE:
+                content = encode_arrow(meta, arrays, dtype)
+            else:
+                content = encode_raw(meta, arrays, dtype)
+            response = Response(content=content, media_type=media_type, headers=headers)
+        timing["bytes"] = len(response.body)
+    return response
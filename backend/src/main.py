@@ -1,9 +1,18 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.routes import calculateSpectrum, fitSpectrum, downloadSpectrum, downloadTxt, root
+from src.routes import calculateSpectrum, calculateBatch, calculateSweep, fitSpectrum, downloadSpectrum, downloadTxt, export, jobs, spectra, root, metrics, profiles
 import astropy.units as u
 from astropy.units import cds
 from src.helpers.logger_config import logger
+from src.helpers.executor import spectrum_executor
+from src.helpers.prefetch import warm_up, warm_up_state
+from src.helpers.timing import start_request, server_timing, timing_log
+from src.helpers.profiling import requested_profiler, start_profile, ProfileAccessError, UnknownProfilerError
+from src.helpers.metrics import route_template, request_duration, requests_in_flight, observe_spans, MeasuredResponse
+from src.constants.constants import PREFETCH_ON_STARTUP
+import asyncio
 import os
 
 # for high resolution
@@ -22,7 +31,7 @@ The RADIS Application provides an intuitive interface for spectroscopic calculat
 
 - **Spectrum Calculation**: Compute molecular spectra using various databases (HITRAN, HITEMP, GEISA, ExoMol, NIST)
 - **Spectrum Fitting**: Fit experimental spectra to theoretical models
-- **Data Export**: Download spectra in various formats (.spec, .csv)
+- **Data Export**: Download spectra in various formats (.spec, .csv, JSON, HDF5, Parquet)
 - **Non-equilibrium Calculations**: Support for non-equilibrium molecular states
 
 ## Key Features
@@ -77,6 +86,10 @@ Journal of Quantitative Spectroscopy and Radiative Transfer, 261, 107476.
             "name": "Data Export",
             "description": "Endpoints for downloading calculated spectra in various formats.",
         },
+        {
+            "name": "Jobs",
+            "description": "Asynchronous calculation and fitting jobs with polling and result retrieval.",
+        },
         {
             "name": "System",
             "description": "System information and health check endpoints.",
@@ -94,18 +107,81 @@ Journal of Quantitative Spectroscopy and Radiative Transfer, 261, 107476.
 async def clear_terminal():
     os.system("clear")
 
+@app.on_event("startup")
+async def prefetch_databanks():
+    if PREFETCH_ON_STARTUP:
+        # /ready answers 503 until the databanks are fetched and the workers warm;
+        # set now, the task only starts once the server is already serving
+        warm_up_state.update(ready=False, phase="prefetch")
+        app.state.warm_up = asyncio.create_task(warm_up(spectrum_executor))
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    spectrum_executor.shutdown()
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """
+    Return the phase timings of a request in Server-Timing, log them and record its metrics.
+    Also profiles the worker calls of requests opted in by an admin (see /profiles).
+    """
+    try:
+        profiler = requested_profiler(request)
+    except ProfileAccessError as exc:
+        return JSONResponse(status_code=403, content={"error": str(exc)})
+    except UnknownProfilerError as exc:
+        return JSONResponse(status_code=400, content={"error": str(exc)})
+    profile_id = start_profile(profiler) if profiler is not None else None
+
+    route = route_template(request)
+    spans = start_request()
+    start = time.perf_counter()
+    requests_in_flight.inc(method=request.method, route=route)
+    try:
+        response = await call_next(request)
+    except Exception:
+        requests_in_flight.dec(method=request.method, route=route)
+        raise
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+    if spans:
+        # the spans known when the headers are sent
+        total = {"name": "total", "dur": (time.perf_counter() - start) * 1000}
+        response.headers["Server-Timing"] = server_timing([*spans, total])
+        response.headers["Timing-Allow-Origin"] = "*"
+
+    def on_sent():
+        # after the body: streamed responses are measured whole, with the spans of their streaming
+        requests_in_flight.dec(method=request.method, route=route)
+        duration = time.perf_counter() - start
+        request_duration.observe(duration, method=request.method, route=route, status=response.status_code)
+        observe_spans(spans)
+        if spans:
+            log_spans = [*spans, {"name": "total", "dur": duration * 1000}]
+            logger.info(timing_log(request.method, request.url.path, response.status_code, log_spans))
+
+    return MeasuredResponse(response, on_sent)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Spectrum-Meta", "Content-Disposition", "ETag", "Server-Timing", "X-Profile-Id"],
 )
 
 app.include_router(root.router, tags=["System"])
+app.include_router(metrics.router, tags=["System"])
+app.include_router(profiles.router, tags=["System"])
 app.include_router(calculateSpectrum.router, tags=["Spectrum Calculation"])
+app.include_router(calculateBatch.router, tags=["Spectrum Calculation"])
+app.include_router(calculateSweep.router, tags=["Spectrum Calculation"])
+app.include_router(spectra.router, tags=["Spectrum Calculation"])
 app.include_router(fitSpectrum.router, tags=["Spectrum Fitting"])
 app.include_router(downloadSpectrum.router, tags=["Data Export"])
 app.include_router(downloadTxt.router, tags=["Data Export"])
+app.include_router(export.router, tags=["Data Export"])
+app.include_router(jobs.router, tags=["Jobs"])
 
 logger.info("FastAPI app started with Logtail logging")
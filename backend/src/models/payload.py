@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import math
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List, Optional
 from src.models.species import Species
 from src.models.fitModels import FitProperties, BoundingRanges, FitParameters, ExperimentalConditions
 from typing import Literal
+from src.constants.constants import BATCH_MAX_PAYLOADS, SWEEP_MAX_POINTS, SYNTHETIC_DATABASE_ENABLED
 
 class fitPayload(BaseModel):
     """
@@ -148,9 +150,26 @@ class calcPayload(BaseModel):
         ..., 
         description="Spectral mode for calculation"
     )
-    database: Literal["hitran", "geisa", "hitemp", "exomol", "nist"] = Field(
+    modes: Optional[List[Literal[
+        "absorbance",
+        "transmittance_noslit",
+        "radiance_noslit",
+        "transmittance",
+        "radiance",
+    ]]] = Field(
+        default=None,
+        description="Several spectral modes returned together on one x grid (takes precedence over `mode`)",
+        min_items=1,
+        example=["absorbance", "transmittance_noslit", "radiance_noslit"]
+    )
+    database: Literal["hitran", "geisa", "hitemp", "exomol", "nist", "synthetic"] = Field(
         ..., 
-        description="Spectroscopic database to use for calculation"
+        description="Spectroscopic database to use for calculation (`synthetic`: generated lines "
+        "for load testing, when SYNTHETIC_DATABASE is enabled)"
+    )
+    fast: bool = Field(
+        default=False,
+        description="Allow an approximate spectrum interpolated from precomputed lookup tables, when they cover the request"
     )
     wavelength_units: Literal["1/u.cm", "u.nm"] = Field(
         ..., 
@@ -165,6 +184,12 @@ class calcPayload(BaseModel):
         description="Units for path length"
     )
 
+    @field_validator('database')
+    def validate_database(cls, v):
+        if v == "synthetic" and not SYNTHETIC_DATABASE_ENABLED:
+            raise ValueError('the synthetic database is disabled on this server')
+        return v
+
     class Config:
         schema_extra = {
             "example": {
@@ -187,3 +212,67 @@ class calcPayload(BaseModel):
             }
         }
 
+
+
+class calcBatchPayload(BaseModel):
+    """
+    Payload model for batch spectrum calculation requests.
+
+    A list of calculation payloads, e.g. a temperature and pressure grid.
+    """
+    payloads: List[calcPayload] = Field(
+        ...,
+        description="Calculation payloads, results are returned with their index in this list",
+        min_items=1,
+        max_items=BATCH_MAX_PAYLOADS,
+    )
+
+
+class sweepPayload(BaseModel):
+    """
+    Payload model for parameter sweep requests.
+
+    One base calculation and the values taken by the swept parameters; every
+    combination of the axes is calculated.
+    """
+    base: calcPayload = Field(
+        ...,
+        description="Calculation parameters shared by every condition of the sweep"
+    )
+    axes: Dict[Literal["tgas", "tvib", "trot", "pressure", "path_length", "mole_fraction"], List[float]] = Field(
+        ...,
+        description="Swept parameters and their values, in the units of `base`",
+        min_items=1,
+        example={"tgas": [300, 600, 900, 1200]}
+    )
+    wstep: float = Field(
+        default=0.01,
+        description="Wavenumber step (cm-1) of the grid shared by every spectrum of the sweep",
+        gt=0,
+        example=0.01
+    )
+
+    @field_validator('axes')
+    def validate_axes(cls, v):
+        for name, values in v.items():
+            if not values:
+                raise ValueError(f'axis {name} has no value')
+            if any(value <= 0 for value in values):
+                raise ValueError(f'values of axis {name} must be positive')
+            if name == "mole_fraction" and any(value > 1 for value in values):
+                raise ValueError('mole_fraction values must not exceed 1')
+        points = math.prod(len(values) for values in v.values())
+        if points > SWEEP_MAX_POINTS:
+            raise ValueError(f'the sweep has {points} conditions, at most {SWEEP_MAX_POINTS} are allowed')
+        return v
+
+    @model_validator(mode='after')
+    def validate_base(self):
+        if "mole_fraction" in self.axes and len(self.base.species) != 1:
+            raise ValueError('sweeping mole_fraction needs exactly one species')
+        non_eq = self.base.tvib is not None and self.base.trot is not None
+        if ("tvib" in self.axes or "trot" in self.axes) and not non_eq:
+            raise ValueError('sweeping tvib or trot needs tvib and trot in the base payload')
+        if "tgas" in self.axes and non_eq:
+            raise ValueError('tgas is not used by non-equilibrium calculations, sweep tvib or trot')
+        return self
@@ -0,0 +1,31 @@
+from typing import Literal, Optional
+from fastapi import Query
+
+
+class ResponseOptions:
+    """
+    Query parameters controlling how spectrum arrays are sent back.
+
+    Used as a dependency by the routes returning spectra, e.g.
+    `options: ResponseOptions = Depends()`.
+    """
+
+    def __init__(
+        self,
+        implicit_x: bool = Query(
+            False,
+            description="Send a uniform x axis as {x0, dx, n} instead of an array",
+        ),
+        points: Optional[int] = Query(
+            None,
+            ge=3,
+            description="Target number of points, e.g. the plot width in pixels",
+        ),
+        downsample: Literal["minmax", "lttb"] = Query(
+            "minmax",
+            description="Peak-preserving method used to reduce the spectrum to `points`",
+        ),
+    ):
+        self.implicit_x = implicit_x
+        self.points = points
+        self.downsample = downsample
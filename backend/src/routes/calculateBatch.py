@@ -0,0 +1,99 @@
+from typing import Optional
+from fastapi import APIRouter, Header, Depends
+from fastapi.responses import StreamingResponse
+from src.models.payload import calcBatchPayload
+from src.models.responseOptions import ResponseOptions
+from src.helpers.metrics import count_calculation
+from src.helpers.executor import spectrum_executor
+from src.helpers.wireFormat import parse_accept, DTYPES
+from src.helpers.batch import (
+    batch_chunks,
+    run_batch,
+    encode_ndjson,
+    encode_multipart,
+    multipart_boundary,
+    multipart_end,
+    NDJSON_MEDIA_TYPE,
+    MULTIPART_MEDIA_TYPE,
+)
+
+router = APIRouter()
+
+
+@router.post(
+    "/calculate-spectrum/batch",
+    summary="Calculate Many Spectra",
+    description="""
+Calculate a list of spectra (e.g. a temperature and pressure grid) in one request.
+
+Payloads sharing a databank, species and spectral range are grouped, so their lines are loaded
+once per worker, and the groups run in parallel on the calculation workers. Results are streamed
+back as soon as they are ready, **not in request order**: each one carries the `index` of its
+payload in `payloads`. A failing payload gives an `error` entry and does not stop the others.
+
+## Response Formats (`Accept` header):
+- `application/x-ndjson` (default): one JSON object per line,
+  `{"index": 3, "data": {"x": [...], "y": [...], "units": "..."}}` or `{"index": 4, "error": "..."}`
+- `multipart/mixed`: one part per result, with an `X-Batch-Index` header. Spectra are in the
+  `application/octet-stream` format of `/calculate-spectrum` (metadata in `X-Spectrum-Meta`,
+  append `; dtype=float32` to the Accept header for float32), errors are `application/json` parts.
+
+The `points`, `downsample` and `implicit_x` query parameters apply to every spectrum.
+    """,
+    responses={
+        200: {
+            "description": "Stream of results",
+            "content": {
+                NDJSON_MEDIA_TYPE: {
+                    "example": '{"index": 0, "data": {"x": [2000.0, 2000.1], "y": [0.001, 0.002], "units": "default"}}\n'
+                },
+                MULTIPART_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def calc_spectrum_batch(
+    batch: calcBatchPayload,
+    accept: Optional[str] = Header(default=None, description="Response format, see Response Formats"),
+    options: ResponseOptions = Depends(),
+):
+    """
+    Calculate many spectra and stream the results.
+
+    Args:
+        batch: list of payloads containing calculation parameters
+        accept: Accept header selecting NDJSON or multipart
+        options: Downsampling and x axis encoding of the returned arrays
+
+    Returns:
+        StreamingResponse of the results, each with the index of its payload
+    """
+    for payload in batch.payloads:
+        count_calculation(payload)
+    chunks = batch_chunks(batch.payloads, spectrum_executor.max_workers)
+    print(f" >> Batch of {len(batch.payloads)} payloads in {len(chunks)} chunks")
+
+    multipart = None
+    for media_type, params in parse_accept(accept):
+        if media_type == MULTIPART_MEDIA_TYPE:
+            multipart = params
+            break
+        if media_type in (NDJSON_MEDIA_TYPE, "application/json", "*/*"):
+            break
+
+    if multipart is None:
+        async def ndjson():
+            async for result in run_batch(spectrum_executor, chunks, options):
+                yield encode_ndjson(result)
+
+        return StreamingResponse(ndjson(), media_type=NDJSON_MEDIA_TYPE)
+
+    boundary = multipart_boundary()
+    dtype = DTYPES.get(multipart.get("dtype", "float64"), DTYPES["float64"])
+
+    async def parts():
+        async for result in run_batch(spectrum_executor, chunks, options):
+            yield encode_multipart(result, boundary, dtype)
+        yield multipart_end(boundary)
+
+    return StreamingResponse(parts(), media_type=f"{MULTIPART_MEDIA_TYPE}; boundary={boundary}")
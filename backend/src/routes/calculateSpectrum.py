@@ -1,10 +1,16 @@
 import radis
-import numpy as np
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, Header, Depends
 import astropy.units as u
 from src.models.payload import calcPayload as Payload
 from src.helpers.calculateSpectrum import calculate_spectrum
-from typing import Dict, Any
+from src.helpers.spectrumData import get_spectrum_arrays, arrays_to_spectrum_data, get_modes_data
+from src.helpers.spectrumPyramid import pyramid_store, spectrum_view_id
+from src.helpers.wireFormat import encode_response
+from src.helpers.timing import span
+from src.helpers.metrics import count_calculation
+from src.models.responseOptions import ResponseOptions
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
+from typing import Dict, Any, Optional
 
 router = APIRouter()
 
@@ -32,10 +38,48 @@ The calculation can include multiple molecular species, different spectral modes
 4. Applies slit function if requested
 5. Returns spectrum data with coordinates and units
 
+## Several Modes:
+Set `modes` (e.g. `["absorbance", "transmittance_noslit", "radiance_noslit"]`) to get all of them
+from one calculation, on one shared x axis: `y` and `units` are then objects keyed by mode, e.g.
+`{"x": [...], "y": {"absorbance": [...], "radiance_noslit": [...]}, "units": {...}}`.
+Points where any mode is undefined are left out of all of them. The binary formats name the
+arrays `y.<mode>`.
+
+## Implicit Wavenumber Axis:
+With `?implicit_x=true`, a uniform x axis (RADIS grid in cm-1) is replaced by `x0`, `dx` and `n`,
+so that `x[i] = x0 + i * dx`. Non-uniform axes (nm conversion, NaN gaps) are still sent as arrays.
+
+## Downsampling:
+With `?points=N` (e.g. the plot width in pixels) the spectrum is reduced to about N points with
+a peak-preserving method: `downsample=minmax` (default, min and max of each bucket) or
+`downsample=lttb` (Largest-Triangle-Three-Buckets). Spectra above 50 MB are always reduced this way.
+
+## Pan and Zoom:
+The response has an `id`. A multi-resolution min/max pyramid of the full-resolution curve is built
+after the response is sent, and `GET /spectra/{id}/view?wmin&wmax&pixels` then returns any viewport
+without recomputing the spectrum (single-mode requests only).
+
+## Fast Mode:
+With `"fast": true`, equilibrium requests whose species, range, temperature and pressure are covered
+by the precomputed lookup tables (`radis_scripts/build_lookup_tables.py`) are interpolated from them
+in well under a second instead of being calculated line by line. The result is approximate: linear
+in temperature and log(pressure), and scaled linearly with mole fraction. Other requests are
+calculated as usual.
+
+## Binary Formats:
+Send an `Accept` header to receive the arrays without per-element JSON encoding
+(append `; dtype=float32` to halve the size). The metadata (units, array names) is in the
+`X-Spectrum-Meta` response header.
+- `application/octet-stream`: uint32 header length, JSON header with the array layout, raw little-endian buffers
+- `application/x-npy`: one .npy array whose rows are x and y
+- `application/vnd.apache.arrow.stream`: Arrow IPC stream with x and y columns (if pyarrow is installed)
+
 ## Performance Notes:
 - Large spectra are automatically resampled to reduce payload size
 - Calculation time depends on spectral range and database size
 - Memory usage scales with number of spectral lines
+- The `Server-Timing` response header gives the time of each phase (queue, fetch_databank,
+  eq_spectrum, merge_slabs, apply_slit, arrays, encode...) with its line, point or byte counts
     """,
     responses={
         200: {
@@ -44,6 +88,7 @@ The calculation can include multiple molecular species, different spectral modes
                 "application/json": {
                     "example": {
                         "data": {
+                            "id": "3f1c9a...",
                             "x": [2000.0, 2000.1, 2000.2, 2000.3, 2000.4],
                             "y": [0.001, 0.002, 0.003, 0.002, 0.001],
                             "units": "absorbance"
@@ -54,62 +99,58 @@ The calculation can include multiple molecular species, different spectral modes
         }
     }
 )
-async def calc_spectrum(payload: Payload):
+async def calc_spectrum(
+    payload: Payload,
+    background_tasks: BackgroundTasks,
+    accept: Optional[str] = Header(default=None, description="Response format, see Binary Formats"),
+    options: ResponseOptions = Depends(),
+):
     """
     Calculate molecular spectrum using RADIS library.
     
     Args:
         payload: Payload object containing calculation parameters
+        background_tasks: FastAPI background tasks building the zoom pyramid
+        accept: Accept header selecting JSON or a binary format
+        options: Downsampling and x axis encoding of the returned arrays
         
     Returns:
-        Dictionary containing spectrum data with x, y coordinates and units
+        Dictionary containing spectrum data with x, y coordinates, units and the spectrum id
 
     """
     print(payload)
+    count_calculation(payload)
+
+    if(payload.wavelength_units=="1/u.cm"):
+        slit_unit="cm-1"
+    else:
+        slit_unit="nm"
 
     try:
-        spectrum = calculate_spectrum(payload)
-        if payload.use_simulate_slit is True:
-            if(payload.wavelength_units=="1/u.cm"):
-                slit_unit="cm-1"
-            else:
-                slit_unit="nm"
-            print("Applying simulate slit")
-            spectrum.apply_slit(payload.simulate_slit, slit_unit)
+        spectrum = await spectrum_executor.run(calculate_spectrum, payload, slit_unit)
 
+    except ExecutorBusyError as exc:
+        return busy_response(exc)
     except radis.misc.warning.EmptyDatabaseError:
         return {"error": "No line in the specified wavenumber range"}
     except Exception as exc:
         print("Error", exc)
         return {"error": str(exc)}
     else:
-
-        wunit = spectrum.get_waveunit()
-        iunit = "default"
-        xNan, yNan = spectrum.get(payload.mode, wunit=wunit, Iunit=iunit)
-        # if the specified units were nm, convert the spectrum range (cm-1 by default) to nm
-        if (payload.wavelength_units == 'u.nm'):
-            xNan = 1e7 / xNan
-            xNan = np.sort(xNan)
-        # to remove the nan values from x and y
-        x = xNan[~np.isnan(xNan)]
-        y = yNan[~np.isnan(yNan)]
-        # Reduce payload size
-        threshold = 5e7
-        if len(spectrum) * 8 * 2 > threshold:
-            print("Reducing the payload size")
-            # Setting return payload size limit of 50 MB
-            # one float is about 8 bytes
-            # we return 2 arrays (w, I)
-            #     (note: we could avoid returning the full w-range, and recompute it on the client
-            #     from the x min, max and step --> less data transfer. TODO )
-            resample = int(len(spectrum) * 8 * 2 // threshold)
-            x, y = x[::resample], y[::resample]
-
-        return {
-            "data": {
-                "x": list(x),
-                "y": list(y),
-                "units": spectrum.units[payload.mode],
-            },
-        }
+        if payload.modes:
+            with span("arrays", modes=len(payload.modes)):
+                data = get_modes_data(spectrum, payload.modes, payload.wavelength_units, options)
+            return encode_response(data, accept)
+        with span("arrays", units=payload.wavelength_units) as timing:
+            x, y = get_spectrum_arrays(spectrum, payload.mode, payload.wavelength_units)
+            timing["points"] = len(x)
+        units = spectrum.units[payload.mode]
+        spectrum_id = spectrum_view_id(payload)
+        if pyramid_store.begin(spectrum_id):
+            # built from the full-resolution arrays once the response is sent
+            background_tasks.add_task(pyramid_store.build, spectrum_id, x, y, units)
+        with span("downsample") as timing:
+            data = arrays_to_spectrum_data(x, y, units, len(spectrum), options)
+            timing["points"] = len(data["y"])
+        data["id"] = spectrum_id
+        return encode_response(data, accept)
@@ -0,0 +1,62 @@
+import radis
+from typing import Optional
+from fastapi import APIRouter, Header
+from src.models.payload import sweepPayload
+from src.helpers.metrics import count_calculation
+from src.helpers.executor import spectrum_executor
+from src.helpers.sweep import run_sweep
+from src.helpers.wireFormat import encode_response
+
+router = APIRouter()
+
+
+@router.post(
+    "/calculate-spectrum/sweep",
+    summary="Parameter Sweep",
+    description="""
+Calculate one spectrum per combination of swept parameters, e.g. for calibration curves.
+
+`base` holds the usual `/calculate-spectrum` parameters, and `axes` the values taken by the
+swept ones (`tgas`, `tvib`, `trot`, `pressure`, `path_length`, `mole_fraction`), in the units of
+`base`. Several axes are combined: `{"tgas": [300, 600], "pressure": [0.5, 1]}` gives 4 conditions,
+the last axis varying fastest.
+
+The databank is loaded once per worker and reused for all its conditions, which are spread over
+the calculation workers. Every spectrum is calculated on the grid of step `wstep` (cm-1) so they
+share one x axis.
+
+## Response:
+- `x`: the shared x axis, in the requested wavelength units
+- `y`: one row of `base.mode` per condition (conditions × points)
+- `conditions`: the value of each swept parameter, one per row of `y`
+- `mode`, `units`: the returned quantity and its unit
+
+## Response Formats (`Accept` header):
+- `application/json` (default)
+- `application/octet-stream`: the raw binary format of `/calculate-spectrum`, `y` being one
+  2-D array (its shape is in the header); append `; dtype=float32` for float32
+    """,
+)
+async def calc_spectrum_sweep(
+    sweep: sweepPayload,
+    accept: Optional[str] = Header(default=None, description="Response format, see Response Formats"),
+):
+    """
+    Calculate a parameter sweep.
+
+    Args:
+        sweep: base payload, swept axes and grid step
+        accept: Accept header selecting JSON or the raw binary format
+
+    Returns:
+        x, the 2-D array of spectra and the conditions of its rows
+    """
+    count_calculation(sweep.base)
+    try:
+        data = await run_sweep(spectrum_executor, sweep)
+    except radis.misc.warning.EmptyDatabaseError:
+        return {"error": "No line in the specified wavenumber range"}
+    except Exception as exc:
+        print("Error", exc)
+        return {"error": str(exc)}
+    return encode_response(data, accept)
@@ -1,12 +1,15 @@
 import radis
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header
+from starlette.concurrency import run_in_threadpool
 from src.models.payload import calcPayload as Payload
-from fastapi import BackgroundTasks
-from fastapi.responses import FileResponse
-from src.helpers.deleteDownloadDirectory import delete_spec
+from fastapi.responses import FileResponse, Response
 from src.helpers.calculateSpectrum import calculate_spectrum
-from src.constants.constants import DOWNLOADED_SPECFILES_DIRECTORY
-from src.helpers.createDownloadDirectory import create_download_directory
+from src.helpers.artifactCache import artifact_cache, artifact_key
+from src.helpers.exportSpectrum import write_export
+from src.helpers.timing import span
+from src.helpers.metrics import count_calculation
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
 
 router = APIRouter()
 
@@ -17,14 +20,14 @@ router = APIRouter()
 Download a calculated molecular spectrum as a RADIS .spec file.
 
 This endpoint calculates a molecular spectrum using the specified parameters and returns it as a 
-compressed RADIS .spec file. The file is automatically deleted from the server after download 
-to conserve storage space.
+compressed RADIS .spec file. The compressed file is cached under the hash of the payload, so
+repeated downloads of the same spectrum are served without calculating or compressing it again.
 
 ## Key Features:
 - **RADIS Format**: Downloads spectrum in native RADIS .spec format
 - **Compression**: Files are compressed to reduce download size
-- **Automatic Cleanup**: Files are automatically deleted after download
-- **Background Processing**: File deletion happens in background
+- **Cached Artifacts**: Repeated downloads are a cache read, with `ETag` and `Content-Length` headers
+- **Conditional Requests**: Send the `ETag` back in `If-None-Match` to get `304 Not Modified`
 - **Slit Function**: Optional slit function application before download
 
 ## File Format:
@@ -37,14 +40,13 @@ to conserve storage space.
 1. Validates input parameters
 2. Calculates spectrum using RADIS library
 3. Applies slit function if requested
-4. Saves spectrum to temporary .spec file
-5. Returns file for download
-6. Deletes temporary file in background
+4. Compresses the spectrum to a .spec file under a unique temporary name
+5. Moves it into the artifact cache and returns it for download
 
 ## Performance Notes:
 - Calculation time depends on spectral range and database size
 - File size depends on spectral resolution and compression
-- Temporary files are automatically cleaned up
+- Cached files are removed after the cache TTL, or earlier when the cache is full
     """,
     responses={
         200: {
@@ -60,37 +62,53 @@ to conserve storage space.
         }
     }
 )
-async def download_spec(payload: Payload, background_tasks: BackgroundTasks):
+async def download_spec(
+    payload: Payload,
+    if_none_match: Optional[str] = Header(default=None, description="ETag of a previous download"),
+):
     """
     Download calculated spectrum as a RADIS .spec file.
     
     Args:
         payload: Payload object containing calculation parameters
-        background_tasks: FastAPI background tasks for file cleanup
+        if_none_match: ETag of a previously downloaded file
         
     Returns:
         FileResponse containing the .spec file for download
         
     """
-    try:
-        create_download_directory(DOWNLOADED_SPECFILES_DIRECTORY)
-        spectrum = calculate_spectrum(payload)
-        file_name_spec = spectrum.get_name()
-        file_name = f"{file_name_spec}.spec"
-        file_path = f"{DOWNLOADED_SPECFILES_DIRECTORY}/{file_name}"
-        if payload.use_simulate_slit is True:
-            print(" >> Applying simulate slit")
-            spectrum.apply_slit(payload.simulate_slit, "nm")
-    # returning the error response
-    except radis.misc.warning.EmptyDatabaseError:
-        return {"error": "No line in the specified wavenumber range"}
-    except Exception as exc:
-        print("Error", exc)
-        return {"error": str(exc)}
+    key = artifact_key(payload, ".spec", "nm")
+    count_calculation(payload)
+    with span("artifact_cache") as timing:
+        artifact = artifact_cache.get(key, ".spec")
+        timing["hit"] = artifact is not None
+    if artifact is None:
+        try:
+            spectrum = await spectrum_executor.run(calculate_spectrum, payload, "nm")
+            file_name_spec = spectrum.get_name()
+            file_name = f"{file_name_spec}.spec"
+        # returning the error response
+        except ExecutorBusyError as exc:
+            return busy_response(exc)
+        except radis.misc.warning.EmptyDatabaseError:
+            return {"error": "No line in the specified wavenumber range"}
+        except Exception as exc:
+            print("Error", exc)
+            return {"error": str(exc)}
+
+        def store(path):
+            write_export(spectrum, payload, "spec", path)
+
+        # compression is CPU-bound, keep it off the event loop
+        artifact = await run_in_threadpool(artifact_cache.put, key, ".spec", file_name, store)
     else:
-        spectrum.store(file_path, compress=True, if_exists_then="replace")
-        # running as a background task to delete the .spec file after giving the file response back
-        background_tasks.add_task(delete_spec, file_path)
-        return FileResponse(
-            file_path, media_type="application/octet-stream", filename=file_name
-        )
\ No newline at end of file
+        print(" >> .spec file served from cache")
+
+    if if_none_match is not None and artifact.etag in if_none_match:
+        return Response(status_code=304, headers={"ETag": artifact.etag})
+    return FileResponse(
+        artifact.path,
+        media_type="application/octet-stream",
+        filename=artifact.filename,
+        headers={"ETag": artifact.etag},
+    )
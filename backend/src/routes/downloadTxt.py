@@ -1,12 +1,11 @@
 import radis
-from fastapi import APIRouter
+from urllib.parse import quote
+from fastapi import APIRouter, Query
 from src.models.payload import calcPayload as Payload
-from fastapi import BackgroundTasks
-from fastapi.responses import FileResponse
-from src.helpers.deleteDownloadDirectory import delete_spec
+from fastapi.responses import StreamingResponse
 from src.helpers.calculateSpectrum import calculate_spectrum
-from src.constants.constants import DOWNLOADED_TXT_DIRECTORY
-from src.helpers.createDownloadDirectory import create_download_directory
+from src.helpers.csvExport import spectrum_csv, gzip_chunks
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
 
 router = APIRouter()
 
@@ -16,29 +15,29 @@ router = APIRouter()
     description="""
 Download a calculated molecular spectrum as a CSV (Comma-Separated Values) file.
 
-This endpoint calculates a molecular spectrum using the specified parameters and returns it as a 
-CSV file containing wavelength/intensity data. The file is automatically deleted from the server 
-after download to conserve storage space.
+This endpoint calculates a molecular spectrum using the specified parameters and streams it as a 
+CSV file containing wavelength/intensity data. Nothing is written to disk on the server.
 
 ## Key Features:
 - **CSV Format**: Downloads spectrum in standard CSV format
 - **Flexible Units**: Supports both cm-1 and nm wavelength units
-- **Automatic Cleanup**: Files are automatically deleted after download
-- **Background Processing**: File deletion happens in background
+- **Streaming**: Rows are formatted in chunks of 64k and sent as they are produced
+- **Compression**: `?gzip=true` returns a gzip-compressed `.csv.gz`, compressed on the fly
 - **Slit Function**: Optional slit function application before download
 
 ## File Format:
 - **Extension**: .csv
-- **Format**: Comma-separated values
+- **Format**: Space-separated values, as written by `Spectrum.savetxt`
 - **Columns**: Wavelength/Intensity pairs
 - **Compatibility**: Can be opened in Excel, Python, or any CSV reader
 
 ## CSV Structure:
+The layout of radis' `Spectrum.savetxt`: a commented header and space-separated columns, which
+`Spectrum.from_txt` (and so `/fit-spectrum`) reads back.
 ```csv
-wavelength,intensity
-2000.0,0.001
-2000.1,0.002
-2000.2,0.003
+# Wavenumber (cm-1)	absorbance ()
+2.000000000000000000e+03 1.000000000000000021e-03
+2.000100000000000000e+03 2.000000000000000042e-03
 ...
 ```
 
@@ -46,15 +45,12 @@ wavelength,intensity
 1. Validates input parameters
 2. Calculates spectrum using RADIS library
 3. Applies slit function if requested
-4. Converts spectrum to CSV format
-5. Saves to temporary CSV file
-6. Returns file for download
-7. Deletes temporary file in background
+4. Streams the spectrum as CSV, optionally gzip-compressed
 
 ## Performance Notes:
 - Calculation time depends on spectral range and database size
 - File size depends on spectral resolution
-- Temporary files are automatically cleaned up
+- Memory use of the download is constant, whatever the number of rows
 - CSV format is human-readable and widely compatible
     """,
     responses={
@@ -66,33 +62,39 @@ wavelength,intensity
                         "type": "string",
                         "format": "binary"
                     }
+                },
+                "application/gzip": {
+                    "schema": {
+                        "type": "string",
+                        "format": "binary"
+                    }
                 }
             }
         }
     }
 )
-async def download_txt(payload: Payload, background_tasks: BackgroundTasks):
+async def download_txt(
+    payload: Payload,
+    compress: bool = Query(False, alias="gzip", description="Compress the CSV with gzip"),
+):
     """
     Download calculated spectrum as a CSV file.
     
     Args:
         payload: Payload object containing calculation parameters
-        background_tasks: FastAPI background tasks for file cleanup
+        compress: whether to gzip the CSV on the fly
         
     Returns:
-        FileResponse containing the CSV file for download
+        StreamingResponse streaming the CSV file for download
         
     """
     try:
-        create_download_directory(DOWNLOADED_TXT_DIRECTORY)
-        spectrum = calculate_spectrum(payload)
+        spectrum = await spectrum_executor.run(calculate_spectrum, payload, "nm")
         file_name_txt = spectrum.get_name()
         file_name = f"{file_name_txt}.csv"
-        file_path = f"{DOWNLOADED_TXT_DIRECTORY}/{file_name}"
-        if payload.use_simulate_slit is True:
-            print(" >> Applying simulate slit")
-            spectrum.apply_slit(payload.simulate_slit, "nm")
     # returning the error response
+    except ExecutorBusyError as exc:
+        return busy_response(exc)
     except radis.misc.warning.EmptyDatabaseError:
         return {"error": "No line in the specified wavenumber range"}
     except Exception as exc:
@@ -105,10 +107,21 @@ async def download_txt(payload: Payload, background_tasks: BackgroundTasks):
             wunit="cm-1"
         else:
             wunit="nm"
-        iunit = "default"
-        spectrum.savetxt(file_path,payload.mode,wunit=wunit,Iunit=iunit)
-        # running as a background task to delete the .spec file after giving the file response back
-        background_tasks.add_task(delete_spec, file_path)
-        return FileResponse(
-            file_path, media_type="application/octet-stream", filename=file_name
-        )
\ No newline at end of file
+        chunks = spectrum_csv(spectrum, payload.mode, wunit)
+        media_type = "application/octet-stream"
+        if compress:
+            chunks = gzip_chunks(chunks)
+            file_name = f"{file_name}.gz"
+            media_type = "application/gzip"
+        # a sync generator: starlette formats the chunks in its threadpool, off the event loop
+        return StreamingResponse(
+            chunks, media_type=media_type, headers={"Content-Disposition": attachment(file_name)}
+        )
+
+
+def attachment(file_name):
+    """Content-Disposition of a download, encoded like FileResponse does."""
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
\ No newline at end of file
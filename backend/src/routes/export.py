@@ -0,0 +1,111 @@
+import radis
+from typing import Literal, Optional
+from fastapi import APIRouter, Header, Query
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response
+from src.models.payload import calcPayload as Payload
+from src.helpers.calculateSpectrum import calculate_spectrum
+from src.helpers.artifactCache import artifact_cache, artifact_key
+from src.helpers.exportSpectrum import EXPORT_FORMATS, ExportFormatError, check_export_format, write_export
+from src.helpers.timing import span
+from src.helpers.metrics import count_calculation
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
+
+router = APIRouter()
+
+
+@router.post(
+    "/export",
+    summary="Export Spectrum",
+    description="""
+Calculate a molecular spectrum (or reuse the cached one) and download it in any format.
+
+The spectrum is calculated once: every format is written from the same cached spectrum that
+`/calculate-spectrum` and the other downloads use, and each exported file is itself cached under
+the hash of the payload, so exporting the same spectrum again is a cache read.
+
+## Formats (`?format=`):
+- `json`: `{"data": {"x", "y", "units"}}` of the selected mode, at full resolution
+- `csv`: the selected mode, as `/download-txt`
+- `spec`: compressed RADIS .spec file with every quantity, as `/download-spectrum`
+- `hdf5`: one dataset per quantity (x axis included) with its `unit` attribute, conditions as JSON in the file attributes
+- `parquet`: one column per quantity, units and conditions in the schema metadata (if pyarrow is installed)
+
+The columnar formats (`hdf5`, `parquet`) hold every quantity of the spectrum, e.g.
+`pd.read_parquet(file)` or `h5py.File(file)` in a notebook.
+
+Responses carry `ETag` and `Content-Length`; send the `ETag` back in `If-None-Match` to get `304 Not Modified`.
+    """,
+    responses={
+        200: {
+            "description": "Exported spectrum file",
+            "content": {
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for _, media_type in EXPORT_FORMATS.values()
+            },
+        },
+        400: {"description": "Format not available on this server"},
+    },
+)
+async def export_spectrum(
+    payload: Payload,
+    export_format: Literal["json", "csv", "spec", "hdf5", "parquet"] = Query(
+        "spec", alias="format", description="Format of the exported file"
+    ),
+    if_none_match: Optional[str] = Header(default=None, description="ETag of a previous export"),
+):
+    """
+    Export a calculated spectrum.
+
+    Args:
+        payload: Payload object containing calculation parameters
+        export_format: format of the exported file
+        if_none_match: ETag of a previously exported file
+
+    Returns:
+        FileResponse containing the exported file
+    """
+    try:
+        check_export_format(export_format)
+    except ExportFormatError as exc:
+        return JSONResponse(status_code=400, content={"error": str(exc)})
+
+    if(payload.wavelength_units=="1/u.cm"):
+        slit_unit="cm-1"
+    else:
+        slit_unit="nm"
+
+    extension, media_type = EXPORT_FORMATS[export_format]
+    key = artifact_key(payload, extension, slit_unit)
+    count_calculation(payload)
+    with span("artifact_cache") as timing:
+        artifact = artifact_cache.get(key, extension)
+        timing["hit"] = artifact is not None
+    if artifact is None:
+        try:
+            spectrum = await spectrum_executor.run(calculate_spectrum, payload, slit_unit)
+            file_name = f"{spectrum.get_name()}{extension}"
+        except ExecutorBusyError as exc:
+            return busy_response(exc)
+        except radis.misc.warning.EmptyDatabaseError:
+            return {"error": "No line in the specified wavenumber range"}
+        except Exception as exc:
+            print("Error", exc)
+            return {"error": str(exc)}
+
+        def write(path):
+            write_export(spectrum, payload, export_format, path)
+
+        # serialization and compression are CPU-bound, keep them off the event loop
+        artifact = await run_in_threadpool(artifact_cache.put, key, extension, file_name, write)
+    else:
+        print(f" >> {export_format} export served from cache")
+
+    if if_none_match is not None and artifact.etag in if_none_match:
+        return Response(status_code=304, headers={"ETag": artifact.etag})
+    return FileResponse(
+        artifact.path,
+        media_type=media_type,
+        filename=artifact.filename,
+        headers={"ETag": artifact.etag},
+    )
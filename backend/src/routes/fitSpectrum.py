@@ -1,11 +1,12 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Header, Depends
 from src.models.payload import fitPayload as Payload
-from src.helpers.fitSpectrum import fit_spectrum
-import astropy.units as u
+from src.helpers.fitSpectrum import fit_spectrum, normalize_fit_var, get_fit_data
+from src.helpers.wireFormat import encode_response
+from src.models.responseOptions import ResponseOptions
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
 from json import loads
-import numpy as np
 import radis
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 router = APIRouter()
 
@@ -40,6 +41,11 @@ the difference between experimental and theoretical spectra.
 - **.txt**: Text files with wavelength/intensity data
 - **.csv**: Comma-separated values with spectral data
 
+## Binary Format:
+With `Accept: application/octet-stream` the four spectrum arrays are returned as raw
+little-endian buffers behind a JSON header (see `/calculate-spectrum`); fit values and units are
+in the `X-Spectrum-Meta` response header.
+
 ## Performance Notes:
 - Fitting time depends on spectral complexity and parameter ranges
 - Large spectra are automatically resampled to reduce processing time
@@ -79,7 +85,9 @@ the difference between experimental and theoretical spectra.
 )
 async def fit_spectrum_route(
     data: str = Form(..., description="JSON string containing fitting parameters"),
-    file: UploadFile = File(..., description="Experimental spectrum file (.spec, .txt, or .csv)")
+    file: UploadFile = File(..., description="Experimental spectrum file (.spec, .txt, or .csv)"),
+    accept: Optional[str] = Header(default=None, description="Response format: JSON or application/octet-stream"),
+    options: ResponseOptions = Depends(),
 ):
     """
     Fit experimental spectrum to theoretical models.
@@ -87,69 +95,31 @@ async def fit_spectrum_route(
     Args:
         data: JSON string containing fitting parameters (fitPayload model)
         file: Uploaded experimental spectrum file
+        accept: Accept header selecting JSON or the raw binary format
+        options: Downsampling and x axis encoding of the returned arrays
         
     Returns:
         Dictionary containing fitted spectrum, experimental spectrum, and fitting statistics
         
     """
-    payload = Payload(**loads(data)) 
-
-    # cause radiance_noslit and transmittance_noslit are not supported by fit_spectrum function
-    if payload.fit_properties.fit_var == 'radiance_noslit':
-        payload.fit_properties.fit_var = 'radiance'
-    elif payload.fit_properties.fit_var == 'transmittance_noslit':
-        payload.fit_properties.fit_var = 'transmittance'
+    payload = normalize_fit_var(Payload(**loads(data)))
 
     if not file.filename.endswith((".spec", ".txt", ".csv")):
         return {"error": "File must have a .spec, .txt, or .csv extension"}
 
     try:
-        s_experimental, s_best, result, log = await fit_spectrum(payload, file)
+        content = await file.read()
+        s_experimental, s_best, log = await spectrum_executor.run(
+            fit_spectrum, payload, content, file.filename
+        )
 
+    except ExecutorBusyError as exc:
+        return busy_response(exc)
     except radis.misc.warning.EmptyDatabaseError:
         return {"error": "No line in the specified wavenumber range"}
     except Exception as exc:
         print("Error", exc)
         return {"error": str(exc)}
     else:
-        experimental_spectrum = get_spectrum(s_experimental, payload)
-        best_spectrum = get_spectrum(s_best, payload)
-
-        return {
-            "data": {
-                "experimental_spectrum": experimental_spectrum,
-                "best_spectrum": best_spectrum,
-                "units": s_experimental.units[payload.fit_properties.fit_var],
-                "fit_vals": log["fit_vals"],
-                "residual": log["residual"],
-                "time_fitting": log["time_fitting"],
-            },
-        }
-
-def get_spectrum(s_experimental, payload):
-    wunit = s_experimental.get_waveunit()
-    iunit = "default"
-    xNan, yNan = s_experimental.get(payload.fit_properties.fit_var, wunit=wunit, Iunit=iunit)
-    # if the specified units were nm, convert the spectrum range (cm-1 by default) to nm
-    if (payload.experimental_conditions.wavelength_units == 'u.nm'):
-        xNan = 1e7 / xNan
-        xNan = np.sort(xNan)
-    # to remove the nan values from x and y
-    x = xNan[~np.isnan(xNan)]
-    y = yNan[~np.isnan(yNan)]
-    # Reduce payload size
-    threshold = 5e7
-    if len(s_experimental) * 8 * 2 > threshold:
-        print("Reducing the payload size")
-        # Setting return payload size limit of 50 MB
-        # one float is about 8 bytes
-        # we return 2 arrays (w, I)
-        #     (note: we could avoid returning the full w-range, and recompute it on the client
-        #     from the x min, max and step --> less data transfer. TODO )
-        resample = int(len(s_experimental) * 8 * 2 // threshold)
-        x, y = x[::resample], y[::resample]
-    return {
-        "x": list(x),
-        "y": list(y),
-        "units": s_experimental.units[payload.fit_properties.fit_var],
-    }
\ No newline at end of file
+        data = get_fit_data(payload, s_experimental, s_best, log, options)
+        return encode_response(data, accept)
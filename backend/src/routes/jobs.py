@@ -0,0 +1,193 @@
+import os
+from json import loads
+from typing import Dict, Any, Literal
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, Query
+from fastapi.responses import FileResponse, JSONResponse
+from src.models.payload import calcPayload, fitPayload
+from src.helpers.fitSpectrum import normalize_fit_var
+from src.helpers.metrics import count_calculation
+from src.helpers.executor import spectrum_executor, ExecutorBusyError, busy_response
+from src.helpers.jobs import (
+    job_manager,
+    public_job,
+    run_calculation_job,
+    run_fit_job,
+    export_csv,
+    DONE,
+)
+
+router = APIRouter()
+
+
+def job_not_found():
+    return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+
+@router.post(
+    "/jobs/calculate",
+    status_code=202,
+    response_model=Dict[str, Any],
+    summary="Submit a Spectrum Calculation Job",
+    description="""
+Submit a spectrum calculation and return immediately with a job id.
+
+Use this instead of `/calculate-spectrum` for large calculations (e.g. wide HITEMP CO2/H2O ranges)
+that would otherwise hold the HTTP connection open for minutes.
+
+## Workflow:
+1. `POST /jobs/calculate` with the same payload as `/calculate-spectrum`
+2. Poll `GET /jobs/{job_id}` until `status` is `done` or `failed`
+3. Fetch the result with `GET /jobs/{job_id}/result?format=json|spec|csv`
+
+The JSON, .spec and CSV results are all produced from the same stored calculation.
+    """,
+)
+async def submit_calculation(payload: calcPayload, background_tasks: BackgroundTasks):
+    """
+    Submit an asynchronous spectrum calculation.
+
+    Args:
+        payload: Payload object containing calculation parameters
+        background_tasks: FastAPI background tasks running the job
+
+    Returns:
+        Dictionary containing the job status
+    """
+    count_calculation(payload)
+    if(payload.wavelength_units=="1/u.cm"):
+        slit_unit="cm-1"
+    else:
+        slit_unit="nm"
+
+    job = job_manager.create(
+        "calculate",
+        meta={"mode": payload.mode, "wavelength_units": payload.wavelength_units},
+    )
+    background_tasks.add_task(
+        job_manager.run,
+        job["id"],
+        run_calculation_job,
+        payload,
+        slit_unit,
+        job_manager.result_path(job["id"], ".spec"),
+        job_manager.result_path(job["id"], ".json"),
+    )
+    return {"data": public_job(job)}
+
+
+@router.post(
+    "/jobs/fit",
+    status_code=202,
+    response_model=Dict[str, Any],
+    summary="Submit a Spectrum Fitting Job",
+    description="""
+Submit a spectrum fit and return immediately with a job id.
+
+Takes the same form fields as `/fit-spectrum`. The JSON result has the same content as the
+`/fit-spectrum` response data; the .spec and CSV results contain the best fitted spectrum.
+    """,
+)
+async def submit_fit(
+    background_tasks: BackgroundTasks,
+    data: str = Form(..., description="JSON string containing fitting parameters"),
+    file: UploadFile = File(..., description="Experimental spectrum file (.spec, .txt, or .csv)"),
+):
+    """
+    Submit an asynchronous spectrum fit.
+
+    Args:
+        background_tasks: FastAPI background tasks running the job
+        data: JSON string containing fitting parameters (fitPayload model)
+        file: Uploaded experimental spectrum file
+
+    Returns:
+        Dictionary containing the job status
+    """
+    payload = normalize_fit_var(fitPayload(**loads(data)))
+
+    if not file.filename.endswith((".spec", ".txt", ".csv")):
+        return {"error": "File must have a .spec, .txt, or .csv extension"}
+
+    content = await file.read()
+    job = job_manager.create(
+        "fit",
+        meta={
+            "mode": payload.fit_properties.fit_var,
+            "wavelength_units": payload.experimental_conditions.wavelength_units,
+        },
+    )
+    background_tasks.add_task(
+        job_manager.run,
+        job["id"],
+        run_fit_job,
+        payload,
+        content,
+        file.filename,
+        job_manager.result_path(job["id"], ".spec"),
+        job_manager.result_path(job["id"], ".json"),
+    )
+    return {"data": public_job(job)}
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=Dict[str, Any],
+    summary="Get Job Status",
+    description="Report the status (`queued`, `running`, `done`, `failed`) and progress of a job.",
+)
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return job_not_found()
+    return {"data": public_job(job)}
+
+
+@router.get(
+    "/jobs/{job_id}/result",
+    summary="Get Job Result",
+    description="""
+Download the result of a finished job.
+
+## Formats:
+- **json**: same data as the synchronous endpoint
+- **spec**: RADIS .spec file
+- **csv**: CSV file of the spectral quantity
+    """,
+)
+async def get_job_result(
+    job_id: str,
+    result_format: Literal["json", "spec", "csv"] = Query("json", alias="format"),
+):
+    job = job_manager.get(job_id)
+    if job is None:
+        return job_not_found()
+    if job["status"] != DONE:
+        return JSONResponse(
+            status_code=409,
+            content={"error": job["error"] or f"Job is {job['status']}"},
+        )
+
+    name = job["meta"].get("name", job_id)
+    if result_format == "json":
+        return FileResponse(job_manager.result_path(job_id, ".json"), media_type="application/json")
+    if result_format == "spec":
+        return FileResponse(
+            job_manager.result_path(job_id, ".spec"),
+            media_type="application/octet-stream",
+            filename=f"{name}.spec",
+        )
+
+    csv_path = job_manager.result_path(job_id, ".csv")
+    if not os.path.exists(csv_path):
+        wunit = "cm-1" if job["meta"]["wavelength_units"] == "1/u.cm" else "nm"
+        try:
+            await spectrum_executor.run(
+                export_csv,
+                job_manager.result_path(job_id, ".spec"),
+                csv_path,
+                job["meta"]["mode"],
+                wunit,
+            )
+        except ExecutorBusyError as exc:
+            return busy_response(exc)
+    return FileResponse(csv_path, media_type="application/octet-stream", filename=f"{name}.csv")
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from src.helpers.metrics import registry, CONTENT_TYPE
+
+router = APIRouter()
+
+@router.get(
+    "/metrics",
+    summary="Prometheus Metrics",
+    response_class=Response,
+    description="""
+Metrics of this server process in the Prometheus text format, for a Prometheus server to scrape.
+
+## Metrics:
+- `http_request_duration_seconds` (histogram): latency by method, route template and status,
+  until the whole body is sent (streamed responses such as `/calculate-spectrum/batch` included)
+- `http_requests_in_flight`: requests being answered, by method and route template
+- `radis_calculation_requests_total`: calculations requested, by database and molecule
+- `radis_phase_duration_seconds` (histogram): time of each Server-Timing phase (queue, fetch_databank, eq_spectrum...)
+- `radis_lines_loaded`, `radis_lines_calculated`, `radis_grid_points` (histograms): line counts and grid sizes, by molecule
+- `radis_cache_lookups_total` and `radis_cache_hit_ratio`: spectrum cache, lookup tables, factory pool and export artifacts
+- `radis_executor_in_flight`, `radis_executor_queue_depth`, `radis_executor_capacity`, `radis_executor_rejected_total`
+- `process_resident_memory_bytes` and `radis_worker_resident_memory_bytes` (per worker process, Linux only)
+
+Calculation metrics are recorded in the server process from the timings returned by the workers.
+With several server processes (e.g. `uvicorn --workers`), each one reports its own metrics.
+    """,
+)
+async def metrics_handler():
+    """
+    Render the metrics of this process.
+
+    Returns:
+        Response with the metrics in the Prometheus text exposition format
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,97 @@
+from typing import Dict, Any, Literal, Optional
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from src.helpers.profiling import is_admin, list_profiles, profile_artifacts, get_artifact_path, pstats_text
+
+router = APIRouter()
+
+
+def forbidden():
+    return JSONResponse(status_code=403, content={"error": "Admin token required"})
+
+
+def profile_not_found():
+    return JSONResponse(status_code=404, content={"error": "Profile not found"})
+
+
+@router.get(
+    "/profiles",
+    response_model=Dict[str, Any],
+    summary="List Request Profiles",
+    description="""
+List the stored profiles, most recent first. Admin only: send the `X-Admin-Token` header.
+
+## Profiling a Request:
+Profiling is disabled unless `PROFILE_ADMIN_TOKEN` is set. Send any calculation or fitting request
+with the `X-Admin-Token` header and `X-Profile: cprofile` or `X-Profile: sampling` (or the query
+parameter `?profile=cprofile|sampling`). Its worker calls (`calculate_spectrum`, `fit_spectrum`...)
+then run under the profiler and the response gets an `X-Profile-Id` header.
+
+- **cprofile**: deterministic profile of every function call, saved as a pstats `.prof` file
+  (open it with `snakeviz` or `python -m pstats`); slows the calculation down
+- **sampling**: the stack is sampled every `PROFILE_SAMPLE_INTERVAL` seconds, saved as a
+  `.speedscope.json` file for https://www.speedscope.app; little overhead
+
+Each worker call of the request gives one artifact (a batch or sweep gives several).
+    """,
+)
+async def get_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    if not is_admin(x_admin_token):
+        return forbidden()
+    return {"data": list_profiles()}
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_model=Dict[str, Any],
+    summary="Get Request Profile",
+    description="List the artifacts of a profile. Admin only: send the `X-Admin-Token` header.",
+)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(default=None)):
+    if not is_admin(x_admin_token):
+        return forbidden()
+    artifacts = profile_artifacts(profile_id)
+    if artifacts is None:
+        return profile_not_found()
+    return {"data": {"id": profile_id, "artifacts": artifacts}}
+
+
+@router.get(
+    "/profiles/{profile_id}/{artifact}",
+    summary="Download Profile Artifact",
+    description="""
+Download one artifact of a profile. Admin only: send the `X-Admin-Token` header.
+
+With `?format=text`, a `.prof` artifact is returned as the pstats report of its 50 most
+expensive functions (by cumulative time) instead of the binary file.
+    """,
+)
+async def download_profile_artifact(
+    profile_id: str,
+    artifact: str,
+    artifact_format: Literal["raw", "text"] = Query("raw", alias="format"),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """
+    Download a profile artifact.
+
+    Args:
+        profile_id: id returned in the X-Profile-Id header of the profiled request
+        artifact: artifact file name, as listed by GET /profiles/{profile_id}
+        artifact_format: raw file, or pstats text report of a .prof file
+        x_admin_token: admin token (PROFILE_ADMIN_TOKEN)
+
+    Returns:
+        The artifact file, or its text report
+    """
+    if not is_admin(x_admin_token):
+        return forbidden()
+    path = get_artifact_path(profile_id, artifact)
+    if path is None:
+        return profile_not_found()
+    if artifact_format == "text":
+        if not artifact.endswith(".prof"):
+            return JSONResponse(status_code=400, content={"error": "Only .prof artifacts have a text report"})
+        return PlainTextResponse(pstats_text(path))
+    media_type = "application/json" if artifact.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}-{artifact}")
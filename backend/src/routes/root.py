@@ -1,7 +1,19 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from src.helpers.prefetch import warm_up_state
 
 router = APIRouter()
 
 @router.get("/")
 async def root_handler():
-    return {"message": "Hello World"}
\ No newline at end of file
+    return {"message": "Hello World"}
+
+@router.get("/ready", summary="Readiness")
+async def ready_handler():
+    """
+    Readiness probe: 503 while the startup prefetch and worker warm-up run
+    (see PREFETCH_ON_STARTUP), 200 afterwards.
+    """
+    if not warm_up_state["ready"]:
+        return JSONResponse(status_code=503, content=warm_up_state)
+    return warm_up_state
@@ -0,0 +1,75 @@
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import JSONResponse
+from src.helpers.spectrumPyramid import pyramid_store, pyramid_view
+from src.helpers.wireFormat import encode_response
+
+router = APIRouter()
+
+
+@router.get(
+    "/spectra/{spectrum_id}/view",
+    response_model=Dict[str, Any],
+    summary="View a Calculated Spectrum",
+    description="""
+Return the part of a calculated spectrum shown in a plot viewport.
+
+`spectrum_id` is the `id` returned by `/calculate-spectrum`. The answer comes from a min/max zoom
+pyramid built once after the calculation, so panning and zooming never recompute the spectrum
+or transfer more than about 2 points per pixel, and narrow lines stay visible at every zoom level.
+
+## Parameters:
+- `wmin`, `wmax`: viewport, in the wavelength units of the calculation
+- `pixels`: plot width in pixels
+
+The response has the same `{x, y, units}` layout (and `Accept` formats) as `/calculate-spectrum`,
+plus the pyramid `level` it was read from (0 is full resolution).
+Unknown or expired ids return 404: calculate the spectrum again.
+    """,
+    responses={
+        200: {
+            "description": "Viewport of the spectrum",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "data": {
+                            "x": [2000.0, 2000.1, 2000.2, 2000.3, 2000.4],
+                            "y": [0.001, 0.002, 0.003, 0.002, 0.001],
+                            "units": "default",
+                            "level": 0
+                        }
+                    }
+                }
+            }
+        },
+        404: {"description": "Spectrum not found"},
+    },
+)
+def view_spectrum(
+    spectrum_id: str,
+    wmin: float = Query(..., description="Start of the viewport"),
+    wmax: float = Query(..., description="End of the viewport"),
+    pixels: int = Query(1000, ge=1, le=100000, description="Width of the plot in pixels"),
+    accept: Optional[str] = Header(default=None, description="Response format, see /calculate-spectrum"),
+):
+    """
+    Return a viewport of a calculated spectrum.
+
+    Args:
+        spectrum_id: id returned by /calculate-spectrum
+        wmin: start of the viewport
+        wmax: end of the viewport
+        pixels: width of the plot in pixels
+        accept: Accept header selecting JSON or a binary format
+
+    Returns:
+        Dictionary containing the x, y coordinates, units and pyramid level
+    """
+    if wmin >= wmax:
+        return JSONResponse(status_code=400, content={"error": "wmin must be smaller than wmax"})
+    pyramid = pyramid_store.load(spectrum_id)
+    if pyramid is None:
+        return JSONResponse(status_code=404, content={"error": "Spectrum not found"})
+    levels, units = pyramid
+    x, y, level = pyramid_view(levels, wmin, wmax, pixels)
+    return encode_response({"x": x, "y": y, "units": units, "level": level}, accept)